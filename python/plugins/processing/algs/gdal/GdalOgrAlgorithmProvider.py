@@ -101,6 +101,9 @@ class GdalOgrAlgorithmProvider(AlgorithmProvider):
     def getName(self):
         return 'gdalogr'
 
+    def isThreadSafe(self):
+        return True
+
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../../images/gdal.png')
 
@@ -26,11 +26,11 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 import platform
 from PyQt4.QtCore import *
 from qgis.core import QgsApplication
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner, gdalParser
 
 try:
     from osgeo import gdal
@@ -69,16 +69,9 @@ class GdalUtils:
         loglines = []
         loglines.append('GDAL execution console output')
         fused_command = ''.join(['%s ' % c for c in commands])
-        proc = subprocess.Popen(
-            fused_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=False,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
+        loglines += ProcessRunner.run(fused_command, progress, gdalParser,
+                                      universal_newlines=False,
+                                      separator='...')
         ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
         GdalUtils.consoleOutput = loglines
 
@@ -220,14 +220,25 @@ class GrassAlgorithm(GeoAlgorithm):
 
         commands = []
         self.exportedLayers = {}
+        self.layerStamps = {}
         outputCommands = []
+        pendingOutputs = {}
 
         # If GRASS session has been created outside of this algorithm then
         # get the list of layers loaded in GRASS otherwise start a new
         # session
         existingSession = GrassUtils.sessionRunning
+        if existingSession and not self.matchesSessionProjection():
+            # Layers in the session cannot be used with the ones in
+            # this algorithm, so start a new one. Layers that were only
+            # kept in the session are written to their files first, so
+            # the algorithms using them can import them again.
+            GrassUtils.exportPendingOutputs(progress)
+            GrassUtils.endGrassSession()
+            GrassUtils.startGrassSession()
         if existingSession:
             self.exportedLayers = GrassUtils.getSessionLayers()
+            self.layerStamps = dict(GrassUtils.sessionStamps)
         else:
             GrassUtils.startGrassSession()
 
@@ -241,7 +252,7 @@ class GrassAlgorithm(GeoAlgorithm):
 
                 # Check if the layer hasn't already been exported in, for
                 # example, previous GRASS calls in this session
-                if value in self.exportedLayers.keys():
+                if self.isInSession(value):
                     continue
                 else:
                     self.setSessionProjectionFromLayer(value, commands)
@@ -250,7 +261,7 @@ class GrassAlgorithm(GeoAlgorithm):
                 if param.value is None:
                     continue
                 value = param.value
-                if value in self.exportedLayers.keys():
+                if self.isInSession(value):
                     continue
                 else:
                     self.setSessionProjectionFromLayer(value, commands)
@@ -265,14 +276,14 @@ class GrassAlgorithm(GeoAlgorithm):
                     continue
                 if param.datatype == ParameterMultipleInput.TYPE_RASTER:
                     for layer in layers:
-                        if layer in self.exportedLayers.keys():
+                        if self.isInSession(layer):
                             continue
                         else:
                             self.setSessionProjectionFromLayer(layer, commands)
                             commands.append(self.exportRasterLayer(layer))
                 elif param.datatype == ParameterMultipleInput.TYPE_VECTOR_ANY:
                     for layer in layers:
-                        if layer in self.exportedLayers.keys():
+                        if self.isInSession(layer):
                             continue
                         else:
                             self.setSessionProjectionFromLayer(layer, commands)
@@ -401,6 +412,12 @@ class GrassAlgorithm(GeoAlgorithm):
                 outtype = ('auto' if typeidx
                            is None else self.OUTPUT_TYPES[typeidx])
                 command += ' type=' + outtype
+                if existingSession and out.name in self.sessionOutputs:
+                    # Only used by other GRASS algorithms in the
+                    # session, so it is kept just in GRASS, unless the
+                    # session has to be ended before they are run
+                    pendingOutputs[out.value] = [command]
+                    continue
                 commands.append(command)
                 outputCommands.append(command)
 
@@ -420,7 +437,12 @@ class GrassAlgorithm(GeoAlgorithm):
         # If the session has been created outside of this algorithm, add
         # the new GRASS layers to it otherwise finish the session
         if existingSession:
-            GrassUtils.addSessionLayers(self.exportedLayers)
+            for out in self.outputs:
+                if out.value in self.exportedLayers:
+                    self.layerStamps[out.value] = \
+                            GrassUtils.layerStamp(out.value)
+            GrassUtils.addSessionLayers(self.exportedLayers, self.layerStamps,
+                                    pendingOutputs)
         else:
             GrassUtils.endGrassSession()
 
@@ -456,6 +478,7 @@ class GrassAlgorithm(GeoAlgorithm):
                 filename = orgFilename
         destFilename = self.getTempFilename()
         self.exportedLayers[orgFilename] = destFilename
+        self.layerStamps[orgFilename] = GrassUtils.layerStamp(orgFilename)
         command = 'v.in.ogr'
         min_area = self.getParameterValue(self.GRASS_MIN_AREA_PARAMETER)
         command += ' min_area=' + str(min_area)
@@ -467,6 +490,40 @@ class GrassAlgorithm(GeoAlgorithm):
         command += ' --overwrite -o'
         return command
 
+    def isInSession(self, layer):
+        """Returns True if the layer has already been imported, in
+        this or in previous GRASS calls in the session, and has not
+        changed since then.
+        """
+        return layer in self.exportedLayers \
+            and self.layerStamps.get(layer) == GrassUtils.layerStamp(layer)
+
+    def getInputLayers(self):
+        layers = []
+        for param in self.parameters:
+            if param.value is None:
+                continue
+            if isinstance(param, (ParameterRaster, ParameterVector)):
+                layers.append(param.value)
+            elif isinstance(param, ParameterMultipleInput) \
+                    and param.datatype in (ParameterMultipleInput.TYPE_RASTER,
+                        ParameterMultipleInput.TYPE_VECTOR_ANY):
+                layers.extend(param.value.split(';'))
+        return layers
+
+    def matchesSessionProjection(self):
+        """Returns False if any of the input layers has a projection
+        different from the one of the current session.
+        """
+        if GrassUtils.sessionProj4 is None:
+            return True
+        for layer in self.getInputLayers():
+            qGisLayer = dataobjects.getObjectFromUri(layer)
+            if qGisLayer and str(qGisLayer.crs().toProj4()) \
+                    != GrassUtils.sessionProj4:
+                return False
+        return True
+
     def setSessionProjectionFromProject(self, commands):
         if not GrassUtils.projectionSet:
             proj4 = iface.mapCanvas().mapRenderer().destinationCrs().toProj4()
@@ -475,6 +532,7 @@ class GrassAlgorithm(GeoAlgorithm):
             command += ' proj4="' + proj4 + '"'
             commands.append(command)
             GrassUtils.projectionSet = True
+            GrassUtils.sessionProj4 = proj4
 
     def setSessionProjectionFromLayer(self, layer, commands):
         if not GrassUtils.projectionSet:
@@ -486,10 +544,12 @@ class GrassAlgorithm(GeoAlgorithm):
                 command += ' proj4="' + proj4 + '"'
                 commands.append(command)
                 GrassUtils.projectionSet = True
+                GrassUtils.sessionProj4 = proj4
 
     def exportRasterLayer(self, layer):
         destFilename = self.getTempFilename()
         self.exportedLayers[layer] = destFilename
+        self.layerStamps[layer] = GrassUtils.layerStamp(layer)
         command = 'r.external'
         command += ' input="' + layer + '"'
         command += ' band=1'
@@ -30,6 +30,7 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.AlgorithmProvider import AlgorithmProvider
+from processing.core.DescriptionCache import DescriptionCache
 from processing.core.ProcessingLog import ProcessingLog
 from GrassUtils import GrassUtils
 from GrassAlgorithm import GrassAlgorithm
@@ -41,7 +42,9 @@ class GrassAlgorithmProvider(AlgorithmProvider):
 
     def __init__(self):
         AlgorithmProvider.__init__(self)
-        self.createAlgsList()  # Preloading algorithms to speed up
+        self.preloadedAlgs = None
+        self.sessionLevel = 0
+        self.ownsSession = False
 
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
@@ -68,14 +71,20 @@ class GrassAlgorithmProvider(AlgorithmProvider):
         ProcessingConfig.removeSetting(GrassUtils.GRASS_LOG_CONSOLE)
 
     def createAlgsList(self):
-        self.preloadedAlgs = []
         folder = GrassUtils.grassDescriptionPath()
+        self.preloadedAlgs = DescriptionCache.loadAlgorithms(
+                self.getName(), folder,
+                lambda: self.createAlgsFromFolder(folder))
+        self.preloadedAlgs.append(nviz())
+
+    def createAlgsFromFolder(self, folder):
+        algs = []
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 try:
                     alg = GrassAlgorithm(os.path.join(folder, descriptionFile))
                     if alg.name.strip() != '':
-                        self.preloadedAlgs.append(alg)
+                        algs.append(alg)
                     else:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                                 'Could not open GRASS algorithm: '
@@ -84,9 +93,25 @@ class GrassAlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open GRASS algorithm: '
                             + descriptionFile)
-        self.preloadedAlgs.append(nviz())
+        return algs
+
+    def startSession(self):
+        # The mapset and the layers imported into it are kept until
+        # the outermost session ends, unless the session was started
+        # somewhere else
+        if self.sessionLevel == 0:
+            self.ownsSession = not GrassUtils.sessionRunning
+            GrassUtils.startGrassSession()
+        self.sessionLevel += 1
+
+    def endSession(self):
+        self.sessionLevel -= 1
+        if self.sessionLevel == 0 and self.ownsSession:
+            GrassUtils.endGrassSession()
 
     def _loadAlgorithms(self):
+        if self.preloadedAlgs is None:
+            self.createAlgsList()
         self.algs = self.preloadedAlgs
 
     def getDescription(self):
@@ -28,12 +28,13 @@ __revision__ = '$Format:%H$'
 import stat
 import shutil
 import codecs
-import subprocess
-from qgis.core import QgsApplication
+from qgis.core import QgsApplication, QgsVectorLayer
 from PyQt4.QtCore import *
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner, grassParser
 from processing.tools.system import *
+from processing.tools import dataobjects
 from processing.tests.TestData import points
 
 
@@ -51,6 +52,9 @@ class GrassUtils:
 
     sessionRunning = False
     sessionLayers = {}
+    sessionStamps = {}
+    sessionPendingOutputs = {}
+    sessionProj4 = None
     projectionSet = False
 
     isGrassInstalled = False
@@ -264,28 +268,11 @@ class GrassUtils:
     def executeGrass(commands, progress, outputCommands=None):
         loglines = []
         loglines.append('GRASS execution console output')
-        grassOutDone = False
         command = GrassUtils.prepareGrassExecution(commands)
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            if 'GRASS_INFO_PERCENT' in line:
-                try:
-                    progress.setPercentage(int(line[len('GRASS_INFO_PERCENT')
-                            + 2:]))
-                except:
-                    pass
-            else:
-                if 'r.out' in line or 'v.out' in line:
-                    grassOutDone = True
-                loglines.append(line)
-                progress.setConsoleInfo(line)
+        lines = ProcessRunner.run(command, progress, grassParser)
+        loglines += lines
+        grassOutDone = len([line for line in lines
+                            if 'r.out' in line or 'v.out' in line]) > 0
 
         # Some GRASS scripts, like r.mapcalculator or r.fillnulls, call
         # other GRASS scripts during execution. This may override any
@@ -295,24 +282,7 @@ class GrassUtils:
 
         if not grassOutDone and outputCommands:
             command = GrassUtils.prepareGrassExecution(outputCommands)
-            proc = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                ).stdout
-            for line in iter(proc.readline, ''):
-                if 'GRASS_INFO_PERCENT' in line:
-                    try:
-                        progress.setPercentage(int(
-                            line[len('GRASS_INFO_PERCENT') + 2:]))
-                    except:
-                        pass
-                else:
-                    loglines.append(line)
-                    progress.setConsoleInfo(line)
+            loglines += ProcessRunner.run(command, progress, grassParser)
 
         if ProcessingConfig.getSetting(GrassUtils.GRASS_LOG_CONSOLE):
             ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -337,6 +307,9 @@ class GrassUtils:
         shutil.rmtree(GrassUtils.grassMapsetFolder(), True)
         GrassUtils.sessionRunning = False
         GrassUtils.sessionLayers = {}
+        GrassUtils.sessionStamps = {}
+        GrassUtils.sessionPendingOutputs = {}
+        GrassUtils.sessionProj4 = None
         GrassUtils.projectionSet = False
 
     @staticmethod
@@ -344,9 +317,48 @@ class GrassUtils:
         return GrassUtils.sessionLayers
 
     @staticmethod
-    def addSessionLayers(exportedLayers):
+    def addSessionLayers(exportedLayers, stamps={}, pendingOutputs={}):
         GrassUtils.sessionLayers = dict(GrassUtils.sessionLayers.items()
                 + exportedLayers.items())
+        GrassUtils.sessionStamps = dict(GrassUtils.sessionStamps.items()
+                + stamps.items())
+        GrassUtils.sessionPendingOutputs = dict(
+                GrassUtils.sessionPendingOutputs.items()
+                + pendingOutputs.items())
+
+    @staticmethod
+    def exportPendingOutputs(progress):
+        """Writes to their files the layers that have been kept only
+        in the session, to be used by other GRASS algorithms.
+
+        This has to be done before ending a session that is still
+        needed, so those algorithms can import the layers again in a
+        new one.
+        """
+        commands = []
+        for outputCommands in GrassUtils.sessionPendingOutputs.values():
+            commands.extend(outputCommands)
+        GrassUtils.sessionPendingOutputs = {}
+        if commands:
+            GrassUtils.executeGrass(commands, progress, commands)
+
+    @staticmethod
+    def layerStamp(uri):
+        """Returns a value that changes when the content of a layer
+        changes, so layers already in the session can be imported
+        again if needed.
+        """
+        stamp = None
+        path = uri.split('|')[0]
+        if os.path.isfile(path):
+            stamp = (os.path.getmtime(path), os.path.getsize(path))
+        selection = None
+        if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED):
+            layer = dataobjects.getObjectFromUri(uri, False)
+            if isinstance(layer, QgsVectorLayer) \
+                    and layer.selectedFeatureCount() != 0:
+                selection = hash(tuple(sorted(layer.selectedFeaturesIds())))
+        return (stamp, selection)
 
     @staticmethod
     def checkGrassIsInstalled(ignorePreviousState=False):
@@ -221,14 +221,25 @@ class Grass7Algorithm(GeoAlgorithm):
 
         commands = []
         self.exportedLayers = {}
+        self.layerStamps = {}
         outputCommands = []
+        pendingOutputs = {}
 
         # If GRASS session has been created outside of this algorithm then
         # get the list of layers loaded in GRASS otherwise start a new
         # session
         existingSession = Grass7Utils.sessionRunning
+        if existingSession and not self.matchesSessionProjection():
+            # Layers in the session cannot be used with the ones in
+            # this algorithm, so start a new one. Layers that were only
+            # kept in the session are written to their files first, so
+            # the algorithms using them can import them again.
+            Grass7Utils.exportPendingOutputs(progress)
+            Grass7Utils.endGrass7Session()
+            Grass7Utils.startGrass7Session()
         if existingSession:
             self.exportedLayers = Grass7Utils.getSessionLayers()
+            self.layerStamps = dict(Grass7Utils.sessionStamps)
         else:
             Grass7Utils.startGrass7Session()
 
@@ -242,7 +253,7 @@ class Grass7Algorithm(GeoAlgorithm):
 
                 # Check if the layer hasn't already been exported in, for
                 # example, previous GRASS calls in this session
-                if value in self.exportedLayers.keys():
+                if self.isInSession(value):
                     continue
                 else:
                     self.setSessionProjectionFromLayer(value, commands)
@@ -251,7 +262,7 @@ class Grass7Algorithm(GeoAlgorithm):
                 if param.value is None:
                     continue
                 value = param.value
-                if value in self.exportedLayers.keys():
+                if self.isInSession(value):
                     continue
                 else:
                     self.setSessionProjectionFromLayer(value, commands)
@@ -266,14 +277,14 @@ class Grass7Algorithm(GeoAlgorithm):
                     continue
                 if param.datatype == ParameterMultipleInput.TYPE_RASTER:
                     for layer in layers:
-                        if layer in self.exportedLayers.keys():
+                        if self.isInSession(layer):
                             continue
                         else:
                             self.setSessionProjectionFromLayer(layer, commands)
                             commands.append(self.exportRasterLayer(layer))
                 elif param.datatype == ParameterMultipleInput.TYPE_VECTOR_ANY:
                     for layer in layers:
-                        if layer in self.exportedLayers.keys():
+                        if self.isInSession(layer):
                             continue
                         else:
                             self.setSessionProjectionFromLayer(layer, commands)
@@ -403,6 +414,12 @@ class Grass7Algorithm(GeoAlgorithm):
                 outtype = ('auto' if typeidx
                            is None else self.OUTPUT_TYPES[typeidx])
                 command += ' type=' + outtype
+                if existingSession and out.name in self.sessionOutputs:
+                    # Only used by other GRASS algorithms in the
+                    # session, so it is kept just in GRASS, unless the
+                    # session has to be ended before they are run
+                    pendingOutputs[out.value] = [command]
+                    continue
                 commands.append(command)
                 outputCommands.append(command)
 
@@ -422,7 +439,12 @@ class Grass7Algorithm(GeoAlgorithm):
         # If the session has been created outside of this algorithm, add
         # the new GRASS GIS 7 layers to it otherwise finish the session
         if existingSession:
-            Grass7Utils.addSessionLayers(self.exportedLayers)
+            for out in self.outputs:
+                if out.value in self.exportedLayers:
+                    self.layerStamps[out.value] = \
+                            Grass7Utils.layerStamp(out.value)
+            Grass7Utils.addSessionLayers(self.exportedLayers,
+                                         self.layerStamps, pendingOutputs)
         else:
             Grass7Utils.endGrass7Session()
 
@@ -458,6 +480,7 @@ class Grass7Algorithm(GeoAlgorithm):
                 filename = orgFilename
         destFilename = self.getTempFilename()
         self.exportedLayers[orgFilename] = destFilename
+        self.layerStamps[orgFilename] = Grass7Utils.layerStamp(orgFilename)
         command = 'v.in.ogr'
         min_area = self.getParameterValue(self.GRASS_MIN_AREA_PARAMETER)
         command += ' min_area=' + str(min_area)
@@ -469,6 +492,40 @@ class Grass7Algorithm(GeoAlgorithm):
         command += ' --overwrite -o'
         return command
 
+    def isInSession(self, layer):
+        """Returns True if the layer has already been imported, in
+        this or in previous GRASS calls in the session, and has not
+        changed since then.
+        """
+        return layer in self.exportedLayers \
+            and self.layerStamps.get(layer) == Grass7Utils.layerStamp(layer)
+
+    def getInputLayers(self):
+        layers = []
+        for param in self.parameters:
+            if param.value is None:
+                continue
+            if isinstance(param, (ParameterRaster, ParameterVector)):
+                layers.append(param.value)
+            elif isinstance(param, ParameterMultipleInput) \
+                    and param.datatype in (ParameterMultipleInput.TYPE_RASTER,
+                        ParameterMultipleInput.TYPE_VECTOR_ANY):
+                layers.extend(param.value.split(';'))
+        return layers
+
+    def matchesSessionProjection(self):
+        """Returns False if any of the input layers has a projection
+        different from the one of the current session.
+        """
+        if Grass7Utils.sessionProj4 is None:
+            return True
+        for layer in self.getInputLayers():
+            qGisLayer = dataobjects.getObjectFromUri(layer)
+            if qGisLayer and str(qGisLayer.crs().toProj4()) \
+                    != Grass7Utils.sessionProj4:
+                return False
+        return True
+
     def setSessionProjectionFromProject(self, commands):
         if not Grass7Utils.projectionSet:
             proj4 = iface.mapCanvas().mapRenderer().destinationCrs().toProj4()
@@ -477,6 +534,7 @@ class Grass7Algorithm(GeoAlgorithm):
             command += ' proj4="' + proj4 + '"'
             commands.append(command)
             Grass7Utils.projectionSet = True
+            Grass7Utils.sessionProj4 = proj4
 
     def setSessionProjectionFromLayer(self, layer, commands):
         if not Grass7Utils.projectionSet:
@@ -488,10 +546,12 @@ class Grass7Algorithm(GeoAlgorithm):
                 command += ' proj4="' + proj4 + '"'
                 commands.append(command)
                 Grass7Utils.projectionSet = True
+                Grass7Utils.sessionProj4 = proj4
 
     def exportRasterLayer(self, layer):
         destFilename = self.getTempFilename()
         self.exportedLayers[layer] = destFilename
+        self.layerStamps[layer] = Grass7Utils.layerStamp(layer)
         command = 'r.external'
         command += ' input="' + layer + '"'
         command += ' band=1'
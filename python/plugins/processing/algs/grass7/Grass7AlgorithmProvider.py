@@ -32,6 +32,7 @@ from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.AlgorithmProvider import AlgorithmProvider
+from processing.core.DescriptionCache import DescriptionCache
 from processing.core.ProcessingLog import ProcessingLog
 from Grass7Utils import Grass7Utils
 from Grass7Algorithm import Grass7Algorithm
@@ -42,7 +43,9 @@ class Grass7AlgorithmProvider(AlgorithmProvider):
 
     def __init__(self):
         AlgorithmProvider.__init__(self)
-        self.createAlgsList()  # Preloading algorithms to speed up
+        self.preloadedAlgs = None
+        self.sessionLevel = 0
+        self.ownsSession = False
 
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
@@ -69,14 +72,20 @@ class Grass7AlgorithmProvider(AlgorithmProvider):
         ProcessingConfig.removeSetting(Grass7Utils.GRASS_LOG_CONSOLE)
 
     def createAlgsList(self):
-        self.preloadedAlgs = []
         folder = Grass7Utils.grassDescriptionPath()
+        self.preloadedAlgs = DescriptionCache.loadAlgorithms(
+                self.getName(), folder,
+                lambda: self.createAlgsFromFolder(folder))
+        self.preloadedAlgs.append(nviz7())
+
+    def createAlgsFromFolder(self, folder):
+        algs = []
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 try:
                     alg = Grass7Algorithm(os.path.join(folder, descriptionFile))
                     if alg.name.strip() != '':
-                        self.preloadedAlgs.append(alg)
+                        algs.append(alg)
                     else:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                                 'Could not open GRASS GIS 7 algorithm: '
@@ -85,9 +94,25 @@ class Grass7AlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open GRASS GIS 7 algorithm: '
                             + descriptionFile)
-        self.preloadedAlgs.append(nviz7())
+        return algs
+
+    def startSession(self):
+        # The mapset and the layers imported into it are kept until
+        # the outermost session ends, unless the session was started
+        # somewhere else
+        if self.sessionLevel == 0:
+            self.ownsSession = not Grass7Utils.sessionRunning
+            Grass7Utils.startGrass7Session()
+        self.sessionLevel += 1
+
+    def endSession(self):
+        self.sessionLevel -= 1
+        if self.sessionLevel == 0 and self.ownsSession:
+            Grass7Utils.endGrass7Session()
 
     def _loadAlgorithms(self):
+        if self.preloadedAlgs is None:
+            self.createAlgsList()
         self.algs = self.preloadedAlgs
 
     def getDescription(self):
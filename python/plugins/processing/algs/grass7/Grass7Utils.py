@@ -27,12 +27,13 @@ __revision__ = '$Format:%H$'
 
 import stat
 import shutil
-import subprocess
-from qgis.core import QgsApplication
+from qgis.core import QgsApplication, QgsVectorLayer
 from PyQt4.QtCore import *
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner, grassParser
 from processing.tools.system import *
+from processing.tools import dataobjects
 from processing.tests.TestData import points
 
 
@@ -50,6 +51,9 @@ class Grass7Utils:
 
     sessionRunning = False
     sessionLayers = {}
+    sessionStamps = {}
+    sessionPendingOutputs = {}
+    sessionProj4 = None
     projectionSet = False
 
     isGrass7Installed = False
@@ -266,28 +270,11 @@ class Grass7Utils:
     def executeGrass7(commands, progress, outputCommands=None):
         loglines = []
         loglines.append('GRASS GIS 7 execution console output')
-        grassOutDone = False
         command = Grass7Utils.prepareGrass7Execution(commands)
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            if 'GRASS_INFO_PERCENT' in line:
-                try:
-                    progress.setPercentage(int(line[len('GRASS_INFO_PERCENT')
-                            + 2:]))
-                except:
-                    pass
-            else:
-                if 'r.out' in line or 'v.out' in line:
-                    grassOutDone = True
-                loglines.append(line)
-                progress.setConsoleInfo(line)
+        lines = ProcessRunner.run(command, progress, grassParser)
+        loglines += lines
+        grassOutDone = len([line for line in lines
+                            if 'r.out' in line or 'v.out' in line]) > 0
 
         # Some GRASS scripts, like r.mapcalculator or r.fillnulls, call
         # other GRASS scripts during execution. This may override any
@@ -297,24 +284,7 @@ class Grass7Utils:
 
         if not grassOutDone and outputCommands:
             command = Grass7Utils.prepareGrass7Execution(outputCommands)
-            proc = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                ).stdout
-            for line in iter(proc.readline, ''):
-                if 'GRASS_INFO_PERCENT' in line:
-                    try:
-                        progress.setPercentage(int(
-                            line[len('GRASS_INFO_PERCENT') + 2:]))
-                    except:
-                        pass
-                else:
-                    loglines.append(line)
-                    progress.setConsoleInfo(line)
+            loglines += ProcessRunner.run(command, progress, grassParser)
 
         if ProcessingConfig.getSetting(Grass7Utils.GRASS_LOG_CONSOLE):
             ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -339,6 +309,9 @@ class Grass7Utils:
         shutil.rmtree(Grass7Utils.grassMapsetFolder(), True)
         Grass7Utils.sessionRunning = False
         Grass7Utils.sessionLayers = {}
+        Grass7Utils.sessionStamps = {}
+        Grass7Utils.sessionPendingOutputs = {}
+        Grass7Utils.sessionProj4 = None
         Grass7Utils.projectionSet = False
 
     @staticmethod
@@ -346,9 +319,48 @@ class Grass7Utils:
         return Grass7Utils.sessionLayers
 
     @staticmethod
-    def addSessionLayers(exportedLayers):
+    def addSessionLayers(exportedLayers, stamps={}, pendingOutputs={}):
         Grass7Utils.sessionLayers = dict(Grass7Utils.sessionLayers.items()
                 + exportedLayers.items())
+        Grass7Utils.sessionStamps = dict(Grass7Utils.sessionStamps.items()
+                + stamps.items())
+        Grass7Utils.sessionPendingOutputs = dict(
+                Grass7Utils.sessionPendingOutputs.items()
+                + pendingOutputs.items())
+
+    @staticmethod
+    def exportPendingOutputs(progress):
+        """Writes to their files the layers that have been kept only
+        in the session, to be used by other GRASS GIS 7 algorithms.
+
+        This has to be done before ending a session that is still
+        needed, so those algorithms can import the layers again in a
+        new one.
+        """
+        commands = []
+        for outputCommands in Grass7Utils.sessionPendingOutputs.values():
+            commands.extend(outputCommands)
+        Grass7Utils.sessionPendingOutputs = {}
+        if commands:
+            Grass7Utils.executeGrass7(commands, progress, commands)
+
+    @staticmethod
+    def layerStamp(uri):
+        """Returns a value that changes when the content of a layer
+        changes, so layers already in the session can be imported
+        again if needed.
+        """
+        stamp = None
+        path = uri.split('|')[0]
+        if os.path.isfile(path):
+            stamp = (os.path.getmtime(path), os.path.getsize(path))
+        selection = None
+        if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED):
+            layer = dataobjects.getObjectFromUri(uri, False)
+            if isinstance(layer, QgsVectorLayer) \
+                    and layer.selectedFeatureCount() != 0:
+                selection = hash(tuple(sorted(layer.selectedFeaturesIds())))
+        return (stamp, selection)
 
     @staticmethod
     def checkGrass7IsInstalled(ignorePreviousState=False):
@@ -26,7 +26,6 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from processing.parameters.ParameterFile import ParameterFile
 from processing.parameters.ParameterExtent import ParameterExtent
 from processing.parameters.ParameterSelection import ParameterSelection
@@ -74,5 +73,4 @@ class ClipData(FusionAlgorithm):
         commands = [os.path.join(FusionUtils.FusionPath(), 'LDA2LAS.exe')]
         commands.append(outFile)
         commands.append(self.getOutputValue(self.OUTPUT))
-        p = subprocess.Popen(commands, shell=True)
-        p.wait()
+        FusionUtils.runFusion(commands, progress)
@@ -26,7 +26,6 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from processing.parameters.ParameterFile import ParameterFile
 from processing.parameters.ParameterNumber import ParameterNumber
 from processing.outputs.OutputFile import OutputFile
@@ -72,5 +71,4 @@ class FilterData(FusionAlgorithm):
         commands = [os.path.join(FusionUtils.FusionPath(), 'LDA2LAS.exe')]
         commands.append(outFile)
         commands.append(self.getOutputValue(self.OUTPUT))
-        p = subprocess.Popen(commands, shell=True)
-        p.wait()
+        FusionUtils.runFusion(commands, progress)
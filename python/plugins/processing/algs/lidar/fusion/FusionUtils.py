@@ -26,10 +26,10 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import os
-import subprocess
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.tools.system import userFolder
 
@@ -63,14 +63,6 @@ class FusionUtils:
     def runFusion(commands, progress):
         loglines = []
         loglines.append('Fusion execution console output')
-        proc = subprocess.Popen(
-            commands,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=False,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
+        loglines += ProcessRunner.run(commands, progress,
+                                      universal_newlines=False)
         ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -23,8 +23,8 @@ __copyright__ = '(C) 2012, Victor Olaya'
 # This will get replaced with a git SHA1 when you do a git archive
 __revision__ = '$Format:%H$'
 
-import subprocess
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.core.ProcessingConfig import ProcessingConfig
 
 class LAStoolsUtils:
@@ -46,8 +46,6 @@ class LAStoolsUtils:
         loglines = []
         loglines.append("LAStools console output")
         commandline = " ".join(commands)
-        proc = subprocess.Popen(commandline, shell=True, stdout=subprocess.PIPE, stdin=subprocess.PIPE,
-                                stderr=subprocess.STDOUT, universal_newlines=False).stdout
-        for line in iter(proc.readline, ""):
-            loglines.append(line)
+        loglines += ProcessRunner.run(commandline, progress,
+                                      universal_newlines=False)
         ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -31,6 +31,7 @@ __revision__ = '$Format:%H$'
 import os
 import PyQt4.QtGui
 from processing.core.AlgorithmProvider import AlgorithmProvider
+from processing.core.DescriptionCache import DescriptionCache
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from OTBUtils import OTBUtils
 from OTBAlgorithm import OTBAlgorithm
@@ -41,7 +42,7 @@ class OTBAlgorithmProvider(AlgorithmProvider):
     def __init__(self):
         AlgorithmProvider.__init__(self)
         self.activate = True
-        self.createAlgsList()
+        self.preloadedAlgs = None
 
 
     def getDescription(self):
@@ -50,27 +51,37 @@ class OTBAlgorithmProvider(AlgorithmProvider):
     def getName(self):
         return "otb"
 
+    def isThreadSafe(self):
+        return True
+
     def getIcon(self):
         return PyQt4.QtGui.QIcon(os.path.dirname(__file__) + "/../../images/otb.png")
 
     def _loadAlgorithms(self):
+        if self.preloadedAlgs is None:
+            self.createAlgsList()
         self.algs = self.preloadedAlgs
 
     def createAlgsList(self):
-        self.preloadedAlgs = []
         folder = OTBUtils.otbDescriptionPath()
+        self.preloadedAlgs = DescriptionCache.loadAlgorithms(
+                self.getName(), folder,
+                lambda: self.createAlgsFromFolder(folder))
+
+    def createAlgsFromFolder(self, folder):
+        algs = []
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith("xml"):
                 try:
                     alg = OTBAlgorithm(os.path.join(folder, descriptionFile))
 
                     if alg.name.strip() != "":
-                        self.preloadedAlgs.append(alg)
+                        algs.append(alg)
                     else:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, "Could not open OTB algorithm: " + descriptionFile)
                 except Exception,e:
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, "Could not open OTB algorithm: " + descriptionFile)
-
+        return algs
 
     def initializeSettings(self):
         AlgorithmProvider.initializeSettings(self)
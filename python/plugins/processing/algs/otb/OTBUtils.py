@@ -30,9 +30,9 @@ __revision__ = '$Format:%H$'
 
 import os
 from qgis.core import QgsApplication
-import subprocess
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner, otbParser
 from processing.tools.system import *
 import logging
 import xml.etree.ElementTree as ET
@@ -131,16 +131,7 @@ class OTBUtils:
         loglines.append("OTB execution console output")
         os.putenv('ITK_AUTOLOAD_PATH', OTBUtils.otbLibPath())
         fused_command = ''.join(['"%s" ' % c for c in commands])
-        proc = subprocess.Popen(fused_command, shell=True, stdout=subprocess.PIPE, stdin=subprocess.PIPE,stderr=subprocess.STDOUT, universal_newlines=True).stdout
-        for line in iter(proc.readline, ""):
-            if "[*" in line:
-                idx = line.find("[*")
-                perc = int(line[idx-4:idx-2].strip(" "))
-                if perc != 0:
-                    progress.setPercentage(perc)
-            else:
-                loglines.append(line)
-                progress.setConsoleInfo(line)
+        loglines += ProcessRunner.run(fused_command, progress, otbParser)
 
         ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
 
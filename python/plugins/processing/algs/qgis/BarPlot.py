@@ -50,15 +50,16 @@ class BarPlot(GeoAlgorithm):
         namefieldname = self.getParameterValue(self.NAME_FIELD)
         valuefieldname = self.getParameterValue(self.VALUE_FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, namefieldname,
-                                           valuefieldname)
+        cols = vector.columns(layer, namefieldname, valuefieldname)
+        names = cols[namefieldname].tolist()
+        values = cols[valuefieldname].array(np.float64)[0]
         plt.close()
 
-        ind = np.arange(len(values[namefieldname]))
+        ind = np.arange(len(names))
         width = 0.8
-        plt.bar(ind, values[valuefieldname], width, color='r')
+        plt.bar(ind, values, width, color='r')
 
-        plt.xticks(ind, values[namefieldname], rotation=45)
+        plt.xticks(ind, names, rotation=45)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -25,17 +25,19 @@ __copyright__ = '(C) 2014, Piotr Pociask'
 
 __revision__ = '$Format:%H$'
 
+import time
+
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
 from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterNumber import ParameterNumber
 from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.outputs.OutputVector import OutputVector
-from processing.tools import dataobjects
-import processing
-from math import sqrt
+from processing.tools import dataobjects, vector, triangulation
 
 class ConcaveHull(GeoAlgorithm):
 
@@ -63,70 +65,67 @@ class ConcaveHull(GeoAlgorithm):
         alpha = self.getParameterValue(self.ALPHA)
         holes = self.getParameterValue(self.HOLES)
         no_multigeom = self.getParameterValue(self.NO_MULTIGEOMETRY)
+        self.timings = {}
         #Delaunay triangulation from input point layer
+        t0 = time.time()
         progress.setText('Creating Delaunay triangles ...')
-        delone_triangles = processing.runalg("qgis:delaunaytriangulation", layer, None)['OUTPUT']
-        delaunay_layer = processing.getObject(delone_triangles)
+        (points, fids) = vector.layerPoints(layer)
+        (points, ids) = triangulation.uniquePoints(points)
+        triangles = triangulation.delaunay(points)
+        if len(triangles) == 0:
+            raise GeoAlgorithmExecutionException(
+                    'Input layer should contain at least 3 non-collinear '
+                    'points')
+        t0 = self.stageFinished('triangulation', t0, progress, 25)
         #get max edge length from Delaunay triangles
         progress.setText('Computing edges max length ...')
-        features = delaunay_layer.getFeatures()
-        counter = 50./delaunay_layer.featureCount()
-        lengths = []
-        edges = {}
-        for feat in features:
-            line = feat.geometry().asPolygon()[0]
-            for i in range(len(line)-1):
-                lengths.append(sqrt(line[i].sqrDist(line[i+1])))
-            edges[feat.id()] = max(lengths[-3:])
-            progress.setPercentage(feat.id()*counter)
-        max_length = max(lengths)
-        #get features with longest edge longer than alpha*max_length
-        progress.setText('Removing features ...')
-        counter = 50./len(edges)
-        i = 0
-        ids = []
-        for id, max_len in edges.iteritems():
-            if max_len > alpha*max_length:
-                ids.append(id)
-            progress.setPercentage(50+i*counter)
-            i += 1
-        #remove features
-        delaunay_layer.setSelectedFeatures(ids)
-        delaunay_layer.startEditing()
-        delaunay_layer.deleteSelectedFeatures()
-        delaunay_layer.commitChanges()
+        edges = triangulation.edgeLengths(points, triangles).max(axis=1)
+        max_length = edges.max()
+        #remove triangles with longest edge longer than alpha*max_length
+        triangles = triangles[edges <= alpha*max_length]
+        t0 = self.stageFinished('filter', t0, progress, 30)
         #dissolve all Delaunay triangles
         progress.setText('Dissolving Delaunay triangles ...')
-        dissolved = processing.runalg("qgis:dissolve", delaunay_layer,
-                                      True, '', None)['OUTPUT']
-        dissolved_layer = processing.getObject(dissolved)
+        geometries = []
+        for triangle in points[triangles].tolist():
+            polygon = [QgsPoint(x, y) for (x, y) in triangle]
+            polygon.append(polygon[0])
+            geometries.append(QgsGeometry.fromPolygon([polygon]))
+        geom = vector.unionGeometries(geometries)
+        t0 = self.stageFinished('union', t0, progress, 90)
         #save result
         progress.setText('Saving data ...')
-        feat = QgsFeature()
-        dissolved_layer.getFeatures(QgsFeatureRequest().setFilterFid(0)).nextFeature(feat)
         writer = self.getOutputFromName(
                 self.OUTPUT).getVectorWriter(layer.pendingFields().toList(),
                                              QGis.WKBPolygon, layer.crs())
-        geom = feat.geometry()
-        if no_multigeom and geom.isMultipart():
+        if geom is None:
+            geom_list = []
+        elif no_multigeom and geom.isMultipart():
             #only singlepart geometries are allowed
-            geom_list = geom.asMultiPolygon()
-            for single_geom_list in geom_list:
-                single_feature = QgsFeature()
-                single_geom = QgsGeometry.fromPolygon(single_geom_list)
-                if not holes:
-                    #delete holes
-                    deleted = True
-                    while deleted:
-                        deleted = single_geom.deleteRing(1)
-                single_feature.setGeometry(single_geom)
-                writer.addFeature(single_feature)
+            geom_list = [QgsGeometry.fromPolygon(single_geom_list)
+                         for single_geom_list in geom.asMultiPolygon()]
         else:
             #multipart geometries are allowed
+            geom_list = [geom]
+        for single_geom in geom_list:
             if not holes:
                 #delete holes
                 deleted = True
                 while deleted:
-                    deleted = geom.deleteRing(1)
+                    deleted = single_geom.deleteRing(1)
+            feat = QgsFeature()
+            feat.setGeometry(single_geom)
             writer.addFeature(feat)
         del writer
+        self.stageFinished('output', t0, progress, 100)
+
+    def stageFinished(self, stage, t0, progress, percentage):
+        """Records the time taken by a stage of the algorithm, reports
+        it and returns the current time, when the next stage starts.
+        """
+        t = time.time()
+        self.timings[stage] = t - t0
+        progress.setInfo('%s took %0.3f ms' % (stage.capitalize(),
+                                               (t - t0) * 1000))
+        progress.setPercentage(percentage)
+        return t
@@ -53,18 +53,21 @@ class MeanAndStdDevPlot(GeoAlgorithm):
         meanfieldname = self.getParameterValue(self.MEAN_FIELD)
         stddevfieldname = self.getParameterValue(self.STDDEV_FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, namefieldname,
-                meanfieldname, stddevfieldname)
+        cols = vector.columns(layer, namefieldname, meanfieldname,
+                              stddevfieldname)
+        names = cols[namefieldname].tolist()
+        means = cols[meanfieldname].array(np.float64)[0]
+        stddevs = cols[stddevfieldname].array(np.float64)[0]
         plt.close()
 
-        ind = np.arange(len(values[namefieldname]))
+        ind = np.arange(len(names))
         width = 0.8
-        plt.bar(ind, values[meanfieldname], width, color='r',
-                yerr=values[stddevfieldname],
+        plt.bar(ind, means, width, color='r',
+                yerr=stddevs,
                 error_kw=dict(ecolor='yellow'),
                )
 
-        plt.xticks(ind, values[namefieldname], rotation=45)
+        plt.xticks(ind, names, rotation=45)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
@@ -52,15 +52,15 @@ class PolarPlot(GeoAlgorithm):
         namefieldname = self.getParameterValue(self.NAME_FIELD)
         valuefieldname = self.getParameterValue(self.VALUE_FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, namefieldname,
-                valuefieldname)
+        values = vector.columns(layer, valuefieldname)[
+                valuefieldname].array(np.float64)[0]
         plt.close()
 
         fig = figure(figsize=(8, 8))
         ax = fig.add_axes([0.1, 0.1, 0.8, 0.8], polar=True)
-        N = len(values[valuefieldname])
+        N = len(values)
         theta = np.arange(0.0, 2 * np.pi, 2 * np.pi / N)
-        radii = values[valuefieldname]
+        radii = values
         width = 2 * np.pi / N
         ax.bar(theta, radii, width=width, bottom=0.0)
         plotFilename = output + '.png'
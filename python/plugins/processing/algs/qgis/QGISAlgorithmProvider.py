@@ -185,5 +185,9 @@ class QGISAlgorithmProvider(AlgorithmProvider):
     def _loadAlgorithms(self):
         self.algs = self.alglist
 
+    def getSupportedOutputTableExtensions(self):
+        # Tables are written with TableWriter, which supports both
+        return ['csv', 'csv.gz']
+
     def supportsNonFileBasedOutput(self):
         return True
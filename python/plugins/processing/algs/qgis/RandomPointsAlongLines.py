@@ -59,6 +59,9 @@ class RandomPointsAlongLines(GeoAlgorithm):
             self.MIN_DISTANCE, 'Minimum distance', 0.0, 9999999.0, 0.0))
         self.addOutput(OutputVector(self.OUTPUT, 'Random points'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         layer = dataobjects.getObjectFromUri(
             self.getParameterValue(self.VECTOR))
@@ -76,8 +79,7 @@ class RandomPointsAlongLines(GeoAlgorithm):
         featureCount = layer.featureCount()
         total = 100.0 / pointCount
 
-        index = QgsSpatialIndex()
-        points = dict()
+        index = vector.PointIndex()
 
         da = QgsDistanceArea()
         request = QgsFeatureRequest()
@@ -116,15 +118,14 @@ class RandomPointsAlongLines(GeoAlgorithm):
                 # generate random point
                 pnt = QgsPoint(rx, ry)
                 geom = QgsGeometry.fromPoint(pnt)
-                if vector.checkMinDistance(pnt, index, minDistance, points):
+                if vector.checkMinDistance(pnt, index, minDistance):
                     f = QgsFeature(nPoints)
                     f.initAttributes(1)
                     f.setFields(fields)
                     f.setAttribute('id', nPoints)
                     f.setGeometry(geom)
                     writer.addFeature(f)
-                    index.insertFeature(f)
-                    points[nPoints] = pnt
+                    index.addPoint(pnt.x(), pnt.y())
                     nPoints += 1
                     progress.setPercentage(int(nPoints * total))
             nIterations += 1
@@ -57,6 +57,9 @@ class RandomPointsExtent(GeoAlgorithm):
             self.MIN_DISTANCE, 'Minimum distance', 0.0, 9999999, 0.0))
         self.addOutput(OutputVector(self.OUTPUT, 'Random points'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         pointCount = int(self.getParameterValue(self.POINT_NUMBER))
         minDistance = float(self.getParameterValue(self.MIN_DISTANCE))
@@ -80,8 +83,7 @@ class RandomPointsExtent(GeoAlgorithm):
         maxIterations = pointCount * 200
         total = 100.0 / pointCount
 
-        index = QgsSpatialIndex()
-        points = dict()
+        index = vector.PointIndex()
 
         random.seed()
 
@@ -92,15 +94,14 @@ class RandomPointsExtent(GeoAlgorithm):
             pnt = QgsPoint(rx, ry)
             geom = QgsGeometry.fromPoint(pnt)
             if geom.within(extent) and \
-                    vector.checkMinDistance(pnt, index, minDistance, points):
+                    vector.checkMinDistance(pnt, index, minDistance):
                 f = QgsFeature(nPoints)
                 f.initAttributes(1)
                 f.setFields(fields)
                 f.setAttribute('id', nPoints)
                 f.setGeometry(geom)
                 writer.addFeature(f)
-                index.insertFeature(f)
-                points[nPoints] = pnt
+                index.addPoint(pnt.x(), pnt.y())
                 nPoints += 1
                 progress.setPercentage(int(nPoints * total))
             nIterations += 1
@@ -58,6 +58,9 @@ class RandomPointsLayer(GeoAlgorithm):
             self.MIN_DISTANCE, 'Minimum distance', 0.0, 9999999, 0.0))
         self.addOutput(OutputVector(self.OUTPUT, 'Random points'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         layer = dataobjects.getObjectFromUri(
             self.getParameterValue(self.VECTOR))
@@ -78,8 +81,7 @@ class RandomPointsLayer(GeoAlgorithm):
         maxIterations = pointCount * 200
         total = 100.0 / pointCount
 
-        index = QgsSpatialIndex()
-        points = dict()
+        index = vector.PointIndex()
 
         request = QgsFeatureRequest()
 
@@ -93,7 +95,7 @@ class RandomPointsLayer(GeoAlgorithm):
             geom = QgsGeometry.fromPoint(pnt)
             ids = idxLayer.intersects(geom.buffer(5, 5).boundingBox())
             if len(ids) > 0 and \
-                    vector.checkMinDistance(pnt, index, minDistance, points):
+                    vector.checkMinDistance(pnt, index, minDistance):
                 for i in ids:
                     f = layer.getFeatures(request.setFilterFid(i)).next()
                     tmpGeom = QgsGeometry(f.geometry())
@@ -104,8 +106,7 @@ class RandomPointsLayer(GeoAlgorithm):
                         f.setAttribute('id', nPoints)
                         f.setGeometry(geom)
                         writer.addFeature(f)
-                        index.insertFeature(f)
-                        points[nPoints] = pnt
+                        index.addPoint(pnt.x(), pnt.y())
                         nPoints += 1
                         progress.setPercentage(int(nPoints * total))
             nIterations += 1
@@ -68,6 +68,9 @@ class RandomPointsPolygonsVariable(GeoAlgorithm):
             self.MIN_DISTANCE, 'Minimum distance', 0.0, 9999999, 0.0))
         self.addOutput(OutputVector(self.OUTPUT, 'Random points'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         layer = dataobjects.getObjectFromUri(
             self.getParameterValue(self.VECTOR))
@@ -92,8 +95,7 @@ class RandomPointsPolygonsVariable(GeoAlgorithm):
             else:
                 pointCount = int(round(f[fieldName] * da.measure(fGeom)))
 
-            index = QgsSpatialIndex()
-            points = dict()
+            index = vector.PointIndex()
 
             nPoints = 0
             nIterations = 0
@@ -109,15 +111,14 @@ class RandomPointsPolygonsVariable(GeoAlgorithm):
                 pnt = QgsPoint(rx, ry)
                 geom = QgsGeometry.fromPoint(pnt)
                 if geom.within(fGeom) and \
-                        vector.checkMinDistance(pnt, index, minDistance, points):
+                        vector.checkMinDistance(pnt, index, minDistance):
                     f = QgsFeature(nPoints)
                     f.initAttributes(1)
                     f.setFields(fields)
                     f.setAttribute('id', nPoints)
                     f.setGeometry(geom)
                     writer.addFeature(f)
-                    index.insertFeature(f)
-                    points[nPoints] = pnt
+                    index.addPoint(pnt.x(), pnt.y())
                     nPoints += 1
                     progress.setPercentage(int(nPoints * total))
                 nIterations += 1
@@ -30,6 +30,8 @@ import matplotlib.pylab as lab
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
 from processing.parameters.ParameterNumber import ParameterNumber
 from processing.parameters.ParameterRaster import ParameterRaster
 from processing.outputs.OutputTable import OutputTable
@@ -50,21 +52,29 @@ class RasterLayerHistogram(GeoAlgorithm):
         layer = dataobjects.getObjectFromUri(uri)
         outputplot = self.getOutputValue(self.PLOT)
         outputtable = self.getOutputFromName(self.TABLE)
-        values = raster.scanraster(layer, progress)
         nbins = self.getParameterValue(self.BINS)
 
-        # ALERT: this is potentially blocking if the layer is too big
+        # First pass to get the range of values, and second one to fill
+        # the bins, so memory use does not depend on the layer size
+        stats = raster.RasterStatistics()
+        for (x, y, block) in raster.scanrasterblocks(layer, progress):
+            stats.update(block)
+        if stats.count == 0:
+            raise GeoAlgorithmExecutionException(
+                    'The input layer contains no valid values')
+        histogram = raster.RasterHistogram(nbins, stats.min, stats.max)
+        for (x, y, block) in raster.scanrasterblocks(layer, progress):
+            histogram.update(block)
+        n = histogram.counts
+        bins = histogram.edges
+
         plt.close()
-        valueslist = []
-        for v in values:
-            if v is not None:
-                valueslist.append(v)
-        (n, bins, values) = plt.hist(valueslist, nbins)
+        plt.hist(bins[:-1], bins, weights=n)
         fields = [QgsField('CENTER_VALUE', QVariant.Double),
                   QgsField('NUM_ELEM', QVariant.Double)]
-        writer = outputtable.getTableWriter(fields)
-        for i in xrange(len(values)):
-            writer.addRecord([str(bins[i]) + '-' + str(bins[i + 1]), n[i]])
+        with outputtable.getTableWriter(fields) as writer:
+            writer.addRecords([str(bins[i]) + '-' + str(bins[i + 1]), n[i]]
+                              for i in xrange(len(n)))
         plotFilename = outputplot + '.png'
         lab.savefig(plotFilename)
         f = open(outputplot, 'w')
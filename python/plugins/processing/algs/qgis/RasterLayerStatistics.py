@@ -53,34 +53,21 @@ class RasterLayerStatistics(GeoAlgorithm):
         outputFile = self.getOutputValue(self.OUTPUT_HTML_FILE)
         uri = self.getParameterValue(self.INPUT)
         layer = dataobjects.getObjectFromUri(uri)
-        values = raster.scanraster(layer, progress)
-
-        n = 0
-        nodata = 0
-        mean = 0
-        M2 = 0
-        sum = 0
-        minvalue = None
-        maxvalue = None
-
-        for v in values:
-            if v is not None:
-                sum += v
-                n = n + 1
-                delta = v - mean
-                mean = mean + delta / n
-                M2 = M2 + delta * (v - mean)
-                if minvalue is None:
-                    minvalue = v
-                    maxvalue = v
-                else:
-                    minvalue = min(v, minvalue)
-                    maxvalue = max(v, maxvalue)
-            else:
-                nodata += 1
-
-        variance = M2 / (n - 1)
-        stddev = math.sqrt(variance)
+        stats = raster.RasterStatistics()
+        for (x, y, block) in raster.scanrasterblocks(layer, progress):
+            stats.update(block)
+
+        n = stats.count
+        nodata = stats.nodata
+        sum = stats.sum
+        mean = stats.mean
+        minvalue = stats.min
+        maxvalue = stats.max
+        variance = stats.variance()
+        if variance is None:
+            stddev = 0
+        else:
+            stddev = math.sqrt(variance)
 
         data = []
         data.append('Valid cells: ' + unicode(n))
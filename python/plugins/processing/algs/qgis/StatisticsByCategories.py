@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import math
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.outputs.OutputTable import OutputTable
@@ -67,58 +68,37 @@ class StatisticsByCategories(GeoAlgorithm):
                 self.CATEGORIES_FIELD_NAME)
 
         output = self.getOutputFromName(self.OUTPUT)
-        valuesField = layer.fieldNameIndex(valuesFieldName)
-        categoriesField = layer.fieldNameIndex(categoriesFieldName)
-
-        features = vector.features(layer)
-        nFeats = len(features)
-        values = {}
-        nFeat = 0
-        for feat in features:
-            nFeat += 1
-            progress.setPercentage(int(100 * nFeats / nFeat))
-            attrs = feat.attributes()
-            try:
-                value = float(attrs[valuesField])
-                cat = unicode(attrs[categoriesField])
-                if cat not in values:
-                    values[cat] = []
-                values[cat].append(value)
-            except:
-                pass
+        cols = vector.columns(layer, valuesFieldName, categoriesFieldName)
+        (values, invalid) = cols[valuesFieldName].array(numpy.float64)
+        categories = cols[categoriesFieldName]
+        valid = ~invalid
+        values = values[valid]
+        codes = categories.codes[valid]
+        progress.setPercentage(50)
+
+        # Sort values by category, so the stats of each one can be
+        # computed at once on a contiguous slice
+        order = numpy.argsort(codes, kind='mergesort')
+        values = values[order]
+        codes = codes[order]
+        starts = numpy.flatnonzero(numpy.r_[True, codes[1:] != codes[:-1]])
+        ends = numpy.r_[starts[1:], len(values)]
 
         fields = ['category', 'min', 'max', 'mean', 'stddev', 'count']
-        writer = output.getTableWriter(fields)
-        for (cat, v) in values.items():
-            (min, max, mean, stddev) = calculateStats(v)
-            record = [cat, min, max, mean, stddev, len(v)]
-            writer.addRecord(record)
-
-
-def calculateStats(values):
-    n = 0
-    sum = 0
-    mean = 0
-    M2 = 0
-    minvalue = None
-    maxvalue = None
-
-    for v in values:
-        sum += v
-        n = n + 1
-        delta = v - mean
-        mean = mean + delta / n
-        M2 = M2 + delta * (v - mean)
-        if minvalue is None:
-            minvalue = v
-            maxvalue = v
-        else:
-            minvalue = min(v, minvalue)
-            maxvalue = max(v, maxvalue)
-
-    if n > 1:
-        variance = M2 / (n - 1)
-    else:
-        variance = 0
-    stddev = math.sqrt(variance)
-    return (minvalue, maxvalue, mean, stddev)
+        with output.getTableWriter(fields) as writer:
+            for (start, end) in zip(starts[:len(values)], ends):
+                code = codes[start]
+                if code < 0:
+                    cat = unicode(categories.null)
+                else:
+                    cat = unicode(categories.categories[code])
+                v = values[start:end]
+                n = len(v)
+                mean = v.mean()
+                if n > 1:
+                    stddev = math.sqrt(((v - mean) ** 2).sum() / (n - 1))
+                else:
+                    stddev = 0
+                record = [cat, float(v.min()), float(v.max()), float(mean),
+                          stddev, n]
+                writer.addRecord(record)
@@ -27,6 +27,7 @@ __revision__ = '$Format:%H$'
 
 import matplotlib.pyplot as plt
 import matplotlib.pylab as lab
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -49,10 +50,11 @@ class VectorLayerHistogram(GeoAlgorithm):
         layer = getObjectFromUri(uri)
         fieldname = self.getParameterValue(self.FIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, fieldname)
+        (values, invalid) = vector.columns(layer, fieldname)[fieldname].array(
+                numpy.float64)
         plt.close()
         bins = self.getParameterValue(self.BINS)
-        plt.hist(values[fieldname], bins)
+        plt.hist(values[~invalid], bins)
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
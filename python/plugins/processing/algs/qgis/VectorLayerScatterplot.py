@@ -27,6 +27,7 @@ __revision__ = '$Format:%H$'
 
 import matplotlib.pyplot as plt
 import matplotlib.pylab as lab
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -50,10 +51,13 @@ class VectorLayerScatterplot(GeoAlgorithm):
         xfieldname = self.getParameterValue(self.YFIELD)
         yfieldname = self.getParameterValue(self.XFIELD)
         output = self.getOutputValue(self.OUTPUT)
-        values = vector.getAttributeValues(layer, xfieldname, yfieldname)
+        cols = vector.columns(layer, xfieldname, yfieldname)
+        (xvalues, xinvalid) = cols[xfieldname].array(numpy.float64)
+        (yvalues, yinvalid) = cols[yfieldname].array(numpy.float64)
+        valid = ~(xinvalid | yinvalid)
         plt.close()
 
-        plt.scatter(values[xfieldname], values[yfieldname])
+        plt.scatter(xvalues[valid], yvalues[valid])
         plotFilename = output + '.png'
         lab.savefig(plotFilename)
         f = open(output, 'w')
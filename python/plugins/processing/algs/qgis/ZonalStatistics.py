@@ -37,7 +37,7 @@ from processing.parameters.ParameterNumber import ParameterNumber
 from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.outputs.OutputVector import OutputVector
 from processing.tools.raster import mapToPixel
-from processing.tools import dataobjects, vector
+from processing.tools import dataobjects, vector, raster
 
 
 class ZonalStatistics(GeoAlgorithm):
@@ -49,6 +49,9 @@ class ZonalStatistics(GeoAlgorithm):
     GLOBAL_EXTENT = 'GLOBAL_EXTENT'
     OUTPUT_LAYER = 'OUTPUT_LAYER'
 
+    # Statistics of zones with no valid cells
+    EMPTY_STATISTICS = [None, None, None, 0, None, None, 0, None, None]
+
     def defineCharacteristics(self):
         self.name = 'Zonal Statistics'
         self.group = 'Raster tools'
@@ -77,7 +80,6 @@ class ZonalStatistics(GeoAlgorithm):
         rasterDS = gdal.Open(rasterPath, gdal.GA_ReadOnly)
         geoTransform = rasterDS.GetGeoTransform()
         rasterBand = rasterDS.GetRasterBand(bandNumber)
-        noData = rasterBand.GetNoDataValue()
 
         cellXSize = abs(geoTransform[1])
         cellYSize = abs(geoTransform[5])
@@ -88,38 +90,9 @@ class ZonalStatistics(GeoAlgorithm):
                                   * rasterYSize, geoTransform[0] + cellXSize
                                   * rasterXSize, geoTransform[3])
 
-        rasterGeom = QgsGeometry.fromRect(rasterBBox)
-
         crs = osr.SpatialReference()
         crs.ImportFromProj4(str(layer.crs().toProj4()))
 
-        if useGlobalExtent:
-            xMin = rasterBBox.xMinimum()
-            xMax = rasterBBox.xMaximum()
-            yMin = rasterBBox.yMinimum()
-            yMax = rasterBBox.yMaximum()
-
-            (startColumn, startRow) = mapToPixel(xMin, yMax, geoTransform)
-            (endColumn, endRow) = mapToPixel(xMax, yMin, geoTransform)
-
-            width = endColumn - startColumn
-            height = endRow - startRow
-
-            srcOffset = (startColumn, startRow, width, height)
-            srcArray = rasterBand.ReadAsArray(*srcOffset)
-
-            newGeoTransform = (
-                geoTransform[0] + srcOffset[0] * geoTransform[1],
-                geoTransform[1],
-                0.0,
-                geoTransform[3] + srcOffset[1] * geoTransform[5],
-                0.0,
-                geoTransform[5],
-                )
-
-        memVectorDriver = ogr.GetDriverByName('Memory')
-        memRasterDriver = gdal.GetDriverByName('MEM')
-
         fields = layer.pendingFields()
         (idxMin, fields) = vector.findOrCreateField(layer, fields,
                 columnPrefix + 'min', 21, 6)
@@ -143,17 +116,211 @@ class ZonalStatistics(GeoAlgorithm):
         # idxMedian, fields = ftools_utils.findOrCreateField(layer, fields,
         #        columnPrefix + "median", 21, 6)
 
+        self.statisticsIndexes = [idxMin, idxMax, idxSum, idxCount, idxMean,
+                                  idxStd, idxUnique, idxRange, idxCV]
+
         writer = self.getOutputFromName(
                 self.OUTPUT_LAYER).getVectorWriter(fields.toList(),
                         layer.dataProvider().geometryType(), layer.crs())
 
+        features = vector.features(layer)
+        if self.zonesOverlap(layer):
+            progress.setInfo('Zones overlap, computing statistics '
+                             'polygon by polygon')
+            self.polygonStatistics(features, rasterBand, geoTransform,
+                    rasterBBox, crs, useGlobalExtent, writer, fields,
+                    progress)
+        else:
+            self.zoneRasterStatistics(features, rasterBand, geoTransform,
+                    rasterBBox, crs, useGlobalExtent, writer, fields,
+                    progress)
+
+        rasterDS = None
+
+        del writer
+
+    def zonesOverlap(self, layer):
+        """Returns True if any pair of zones in the layer overlap, so
+        they cannot be burnt together in a single zone raster.
+
+        Zones that just touch each other do not overlap.
+        """
+        index = vector.IndexedFeatureSource(layer)
+        for f in vector.features(layer):
+            geom = f.geometry()
+            for other in index.intersectingFeatures(geom.boundingBox()):
+                if other.id() <= f.id():
+                    continue
+                otherGeom = other.geometry()
+                if geom.intersects(otherGeom) \
+                        and not geom.touches(otherGeom):
+                    return True
+        return False
+
+    def zoneRasterStatistics(self, features, rasterBand, geoTransform,
+                             rasterBBox, crs, useGlobalExtent, writer,
+                             fields, progress):
+        """Computes statistics for all zones at once.
+
+        All zones are burnt, tile by tile, into an int32 raster aligned
+        with the value raster, where each cell holds the id of the zone
+        it belongs to, and statistics are computed for all zones at the
+        same time with grouped NumPy reductions. Zone ids start at 1,
+        with 0 used for cells outside all zones. Only the part of the
+        raster covered by the extent of the zones is read, in a single
+        tile if useGlobalExtent is True.
+
+        This is only valid if zones do not overlap.
+        """
+        noData = rasterBand.GetNoDataValue()
+
+        memVectorDriver = ogr.GetDriverByName('Memory')
+        memRasterDriver = gdal.GetDriverByName('MEM')
+        memVDS = memVectorDriver.CreateDataSource('out')
+        memLayer = memVDS.CreateLayer('zones', crs, ogr.wkbPolygon)
+        memLayer.CreateField(ogr.FieldDefn('ZONE', ogr.OFTInteger))
+
+        feats = []
+        extent = None
+        for f in features:
+            feats.append(f)
+            if extent is None:
+                extent = QgsRectangle(f.geometry().boundingBox())
+            else:
+                extent.combineExtentWith(f.geometry().boundingBox())
+            ft = ogr.Feature(memLayer.GetLayerDefn())
+            ft.SetField('ZONE', len(feats))
+            ft.SetGeometry(ogr.CreateGeometryFromWkb(f.geometry().asWkb()))
+            memLayer.CreateFeature(ft)
+            ft.Destroy()
+
+        stats = raster.GroupedStatistics(len(feats) + 1)
+
+        # Window of the raster covered by the zones
+        (startColumn, startRow, endColumn, endRow) = (0, 0, 0, 0)
+        if extent is not None and extent.intersects(rasterBBox):
+            extent = extent.intersect(rasterBBox)
+            (startColumn, startRow) = mapToPixel(extent.xMinimum(),
+                    extent.yMaximum(), geoTransform)
+            (endColumn, endRow) = mapToPixel(extent.xMaximum(),
+                    extent.yMinimum(), geoTransform)
+            startColumn = max(0, startColumn)
+            startRow = max(0, startRow)
+            endColumn = min(rasterBand.XSize, endColumn + 1)
+            endRow = min(rasterBand.YSize, endRow + 1)
+        xSize = max(0, endColumn - startColumn)
+        ySize = max(0, endRow - startRow) if xSize > 0 else 0
+
+        (blockXSize, blockYSize) = rasterBand.GetBlockSize()
+        if useGlobalExtent:
+            rowsPerTile = max(1, ySize)
+        else:
+            rowsPerTile = blockYSize * max(1, raster.MIN_BLOCK_CELLS
+                                           // (max(1, xSize) * blockYSize))
+        for row in xrange(startRow, startRow + ySize, rowsPerTile):
+            progress.setPercentage(int((row - startRow) * 100.0 / ySize))
+            rows = min(rowsPerTile, startRow + ySize - row)
+
+            tileGeoTransform = (
+                geoTransform[0] + startColumn * geoTransform[1]
+                    + row * geoTransform[2],
+                geoTransform[1],
+                geoTransform[2],
+                geoTransform[3] + startColumn * geoTransform[4]
+                    + row * geoTransform[5],
+                geoTransform[4],
+                geoTransform[5],
+                )
+            xMin = tileGeoTransform[0]
+            xMax = xMin + xSize * geoTransform[1]
+            yMax = tileGeoTransform[3]
+            yMin = yMax + rows * geoTransform[5]
+            memLayer.SetSpatialFilterRect(min(xMin, xMax), min(yMin, yMax),
+                    max(xMin, xMax), max(yMin, yMax))
+
+            zoneDS = memRasterDriver.Create('', xSize, rows, 1,
+                                            gdal.GDT_Int32)
+            zoneDS.SetGeoTransform(tileGeoTransform)
+            gdal.RasterizeLayer(zoneDS, [1], memLayer,
+                                options=['ATTRIBUTE=ZONE'])
+            zoneArray = zoneDS.ReadAsArray()
+            zoneDS = None
+
+            srcArray = numpy.nan_to_num(
+                    rasterBand.ReadAsArray(startColumn, row, xSize, rows))
+            valid = zoneArray > 0
+            if noData is not None:
+                valid &= srcArray != noData
+            stats.update(zoneArray[valid], srcArray[valid])
+
+        memLayer.SetSpatialFilter(None)
+        memVDS = None
+
+        unique = stats.unique()
+        std = stats.std()
+        variance = stats.variance()
+        outFeat = QgsFeature()
+        outFeat.initAttributes(len(fields))
+        outFeat.setFields(fields)
+        for (i, f) in enumerate(feats):
+            zone = i + 1
+            outFeat.setGeometry(f.geometry())
+            attrs = f.attributes()
+            if stats.count[zone] == 0:
+                values = self.EMPTY_STATISTICS
+            else:
+                values = [float(stats.min[zone]), float(stats.max[zone]),
+                          float(stats.sum[zone]), int(stats.count[zone]),
+                          float(stats.mean[zone]), float(std[zone]),
+                          int(unique[zone]),
+                          float(stats.max[zone]) - float(stats.min[zone]),
+                          float(variance[zone])]
+            self.insertStatistics(attrs, values)
+            outFeat.setAttributes(attrs)
+            writer.addFeature(outFeat)
+
+    def polygonStatistics(self, features, rasterBand, geoTransform,
+                          rasterBBox, crs, useGlobalExtent, writer, fields,
+                          progress):
+        """Computes statistics rasterizing each zone separately, which
+        also works for overlapping zones.
+        """
+        noData = rasterBand.GetNoDataValue()
+        rasterGeom = QgsGeometry.fromRect(rasterBBox)
+
+        if useGlobalExtent:
+            xMin = rasterBBox.xMinimum()
+            xMax = rasterBBox.xMaximum()
+            yMin = rasterBBox.yMinimum()
+            yMax = rasterBBox.yMaximum()
+
+            (startColumn, startRow) = mapToPixel(xMin, yMax, geoTransform)
+            (endColumn, endRow) = mapToPixel(xMax, yMin, geoTransform)
+
+            width = endColumn - startColumn
+            height = endRow - startRow
+
+            srcOffset = (startColumn, startRow, width, height)
+            srcArray = rasterBand.ReadAsArray(*srcOffset)
+
+            newGeoTransform = (
+                geoTransform[0] + srcOffset[0] * geoTransform[1],
+                geoTransform[1],
+                0.0,
+                geoTransform[3] + srcOffset[1] * geoTransform[5],
+                0.0,
+                geoTransform[5],
+                )
+
+        memVectorDriver = ogr.GetDriverByName('Memory')
+        memRasterDriver = gdal.GetDriverByName('MEM')
+
         outFeat = QgsFeature()
 
         outFeat.initAttributes(len(fields))
         outFeat.setFields(fields)
 
         current = 0
-        features = vector.features(layer)
         total = 100.0 / len(features)
         for f in features:
             geom = f.geometry()
@@ -175,7 +342,15 @@ class ZonalStatistics(GeoAlgorithm):
                 width = endColumn - startColumn
                 height = endRow - startRow
 
-                if width == 0 or height == 0:
+                if width <= 0 or height <= 0:
+                    # The zone does not cover any cell of the raster
+                    outFeat.setGeometry(geom)
+                    attrs = f.attributes()
+                    self.insertStatistics(attrs, self.EMPTY_STATISTICS)
+                    outFeat.setAttributes(attrs)
+                    writer.addFeature(outFeat)
+                    current += 1
+                    progress.setPercentage(int(current * total))
                     continue
 
                 srcOffset = (startColumn, startRow, width, height)
@@ -214,15 +389,16 @@ class ZonalStatistics(GeoAlgorithm):
             outFeat.setGeometry(geom)
 
             attrs = f.attributes()
-            attrs.insert(idxMin, float(masked.min()))
-            attrs.insert(idxMax, float(masked.max()))
-            attrs.insert(idxSum, float(masked.sum()))
-            attrs.insert(idxCount, int(masked.count()))
-            attrs.insert(idxMean, float(masked.mean()))
-            attrs.insert(idxStd, float(masked.std()))
-            attrs.insert(idxUnique, numpy.unique(masked.compressed()).size)
-            attrs.insert(idxRange, float(masked.max()) - float(masked.min()))
-            attrs.insert(idxCV, float(masked.var()))
+            if masked.count() == 0:
+                self.insertStatistics(attrs, self.EMPTY_STATISTICS)
+            else:
+                self.insertStatistics(attrs, [float(masked.min()),
+                        float(masked.max()), float(masked.sum()),
+                        int(masked.count()), float(masked.mean()),
+                        float(masked.std()),
+                        numpy.unique(masked.compressed()).size,
+                        float(masked.max()) - float(masked.min()),
+                        float(masked.var())])
             # attrs.insert(idxMedian, float(masked.median()))
 
             outFeat.setAttributes(attrs)
@@ -234,6 +410,10 @@ class ZonalStatistics(GeoAlgorithm):
             current += 1
             progress.setPercentage(int(current * total))
 
-        rasterDS = None
-
-        del writer
+    def insertStatistics(self, attrs, values):
+        """Inserts the values of the statistics (min, max, sum, count,
+        mean, std, unique, range and cv, in that order) in the list of
+        attributes of a zone.
+        """
+        for (idx, value) in zip(self.statisticsIndexes, values):
+            attrs.insert(idx, value)
@@ -25,7 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import math
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -86,8 +86,6 @@ class BasicStatisticsNumbers(GeoAlgorithm):
 
         outputFile = self.getOutputValue(self.OUTPUT_HTML_FILE)
 
-        index = layer.fieldNameIndex(fieldName)
-
         cvValue = 0
         minValue = 0
         maxValue = 0
@@ -96,52 +94,24 @@ class BasicStatisticsNumbers(GeoAlgorithm):
         medianValue = 0
         stdDevValue = 0
 
-        isFirst = True
-        values = []
-
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(count)
-        current = 0
-        for ft in features:
-            value = float(ft.attributes()[index])
-            if isFirst:
-                minValue = value
-                maxValue = value
-                isFirst = False
-            else:
-                if value < minValue:
-                    minValue = value
-                if value > maxValue:
-                    maxValue = value
-
-            values.append(value)
-            sumValue += value
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        # Calculate additional values
-        rValue = maxValue - minValue
-        uniqueValue = vector.getUniqueValuesCount(layer, index)
+        column = vector.columns(layer, fieldName)[fieldName]
+        (values, invalid) = column.array(numpy.float64)
+        values = values[~invalid]
+        progress.setPercentage(50)
 
+        count = len(values)
+        uniqueValue = len(numpy.unique(values))
         if count > 0:
+            minValue = float(values.min())
+            maxValue = float(values.max())
+            sumValue = float(values.sum())
             meanValue = sumValue / count
+            stdDevValue = float(numpy.sqrt(((values - meanValue) ** 2).sum()
+                                           / count))
             if meanValue != 0.00:
-                for v in values:
-                    stdDevValue += (v - meanValue) * (v - meanValue)
-                stdDevValue = math.sqrt(stdDevValue / count)
                 cvValue = stdDevValue / meanValue
-
-        if count > 1:
-            tmp = values
-            tmp.sort()
-
-            # Calculate median
-            if count % 2 == 0:
-                medianValue = 0.5 * (tmp[(count - 1) / 2] + tmp[count / 2])
-            else:
-                medianValue = tmp[(count + 1) / 2 - 1]
+            medianValue = float(numpy.median(values))
+        rValue = maxValue - minValue
 
         data = []
         data.append('Count: ' + unicode(count))
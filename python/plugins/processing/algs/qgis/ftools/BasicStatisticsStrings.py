@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import codecs
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -80,51 +81,26 @@ class BasicStatisticsStrings(GeoAlgorithm):
 
         outputFile = self.getOutputValue(self.OUTPUT_HTML_FILE)
 
-        index = layer.fieldNameIndex(fieldName)
-
-        sumValue = 0
         minValue = 0
         maxValue = 0
         meanValue = 0
-        countEmpty = 0
-        countFilled = 0
-
-        isFirst = True
-        values = []
-
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(count)
-        current = 0
-        for ft in features:
-            length = float(len(ft.attributes()[index]))
-
-            if isFirst:
-                minValue = length
-                maxValue = length
-                isFirst = False
-            else:
-                if length < minValue:
-                    minValue = length
-                if length > maxValue:
-                    maxValue = length
-
-            if length != 0.00:
-                countFilled += 1
-            else:
-                countEmpty += 1
-
-            values.append(length)
-            sumValue += length
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        n = float(len(values))
-        if n > 0:
-            meanValue = sumValue / n
-
-        uniqueValues = vector.getUniqueValuesCount(layer, index)
+
+        column = vector.columns(layer, fieldName)[fieldName]
+        # Null values are counted as empty strings
+        lengths = numpy.array([len(unicode(v)) for v in column.categories]
+                              + [0], numpy.float64)[column.codes]
+        progress.setPercentage(50)
+
+        count = len(lengths)
+        countFilled = int(numpy.count_nonzero(lengths))
+        countEmpty = count - countFilled
+        if count > 0:
+            minValue = float(lengths.min())
+            maxValue = float(lengths.max())
+            meanValue = float(lengths.mean())
+
+        # Null values are counted as a distinct value
+        uniqueValues = len(column.unique()) + int(column.nulls.any())
 
         data = []
         data.append('Minimum length: ' + unicode(minValue))
@@ -47,28 +47,20 @@ def buffering(progress, writer, distance, field, useField, layer, dissolve,
 
     # With dissolve
     if dissolve:
-        first = True
-        for inFeat in features:
-            attrs = inFeat.attributes()
+        def bufferedGeometry(feat):
             if useField:
-                value = attrs[field]
+                value = feat.attributes()[field]
             else:
                 value = distance
+            return QgsGeometry(feat.geometry()).buffer(float(value), segments)
 
-            inGeom = QgsGeometry(inFeat.geometry())
-            outGeom = inGeom.buffer(float(value), segments)
-            if first:
-                tempGeom = QgsGeometry(outGeom)
-                first = False
-            else:
-                tempGeom = tempGeom.combine(outGeom)
-
-            current += 1
-            progress.setPercentage(int(current * total))
-
-        outFeat.setGeometry(tempGeom)
-        outFeat.setAttributes(attrs)
-        writer.addFeature(outFeat)
+        dissolved = vector.dissolveFeatures(features,
+                geometry=bufferedGeometry, progress=progress)
+        if dissolved:
+            (attrs, tempGeom) = dissolved[0]
+            outFeat.setGeometry(tempGeom)
+            outFeat.setAttributes(attrs)
+            writer.addFeature(outFeat)
     else:
         # Without dissolve
         for inFeat in features:
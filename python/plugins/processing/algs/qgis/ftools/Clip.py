@@ -32,6 +32,7 @@ from processing.core.ProcessingLog import ProcessingLog
 from processing.parameters.ParameterVector import ParameterVector
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class Clip(GeoAlgorithm):
@@ -64,9 +65,11 @@ class Clip(GeoAlgorithm):
         inFeatB = QgsFeature()
         outFeat = QgsFeature()
 
-        index = vector.spatialindex(layerB)
+        index = vector.IndexedFeatureSource(layerB)
 
-        selectionA = vector.features(layerA)
+        # Features of layer A outside the extent of layer B cannot
+        # intersect it, so they are not even fetched
+        selectionA = vector.features(layerA, filterRect=index.extent())
 
         current = 0
         total = 100.0 / float(len(selectionA))
@@ -78,29 +81,27 @@ class Clip(GeoAlgorithm):
             first = True
             found = False
             if len(intersects) > 0:
-                for i in intersects:
-                    layerB.getFeatures(
-                            QgsFeatureRequest().setFilterFid(i)).nextFeature(
-                                    inFeatB)
+                prepared = PreparedGeometry(geom)
+                for inFeatB in prepared.filter(index.features(intersects),
+                                               'intersects'):
                     tmpGeom = QgsGeometry(inFeatB.geometry())
-                    if tmpGeom.intersects(geom):
-                        found = True
-                        if first:
-                            outFeat.setGeometry(QgsGeometry(tmpGeom))
-                            first = False
-                        else:
-                            try:
-                                cur_geom = QgsGeometry(outFeat.geometry())
-                                new_geom = QgsGeometry(
-                                        cur_geom.combine(tmpGeom))
-                                outFeat.setGeometry(QgsGeometry(new_geom))
-                            except:
-                                ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
-                                        'GEOS geoprocessing error: One or \
-                                        more input features have invalid \
-                                        geometry.'
-                                        )
-                                break
+                    found = True
+                    if first:
+                        outFeat.setGeometry(QgsGeometry(tmpGeom))
+                        first = False
+                    else:
+                        try:
+                            cur_geom = QgsGeometry(outFeat.geometry())
+                            new_geom = QgsGeometry(
+                                    cur_geom.combine(tmpGeom))
+                            outFeat.setGeometry(QgsGeometry(new_geom))
+                        except:
+                            ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
+                                    'GEOS geoprocessing error: One or \
+                                    more input features have invalid \
+                                    geometry.'
+                                    )
+                            break
                 if found:
                     try:
                         cur_geom = QgsGeometry(outFeat.geometry())
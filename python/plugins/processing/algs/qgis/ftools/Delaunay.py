@@ -25,16 +25,14 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-from sets import Set
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
-from processing.tools import dataobjects, vector
+from processing.tools import dataobjects, vector, triangulation
 from processing.parameters.ParameterVector import ParameterVector
 from processing.outputs.OutputVector import OutputVector
-import voronoi
 
 
 class Delaunay(GeoAlgorithm):
@@ -62,54 +60,30 @@ class Delaunay(GeoAlgorithm):
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fields,
                 QGis.WKBPolygon, layer.crs())
 
-        pts = []
-        ptDict = {}
-        ptNdx = -1
-        c = voronoi.Context()
-        features = vector.features(layer)
-        for inFeat in features:
-            geom = QgsGeometry(inFeat.geometry())
-            point = geom.asPoint()
-            x = point.x()
-            y = point.y()
-            pts.append((x, y))
-            ptNdx += 1
-            ptDict[ptNdx] = inFeat.id()
-
+        (pts, fids) = vector.layerPoints(layer)
         if len(pts) < 3:
             raise GeoAlgorithmExecutionException(
                     'Input file should contain at least 3 points. Choose \
                     another file and try again.')
 
-        uniqueSet = Set(item for item in pts)
-        ids = [pts.index(item) for item in uniqueSet]
-        sl = voronoi.SiteList([voronoi.Site(*i) for i in uniqueSet])
-        c.triangulate = True
-        voronoi.voronoi(sl, c)
-        triangles = c.triangles
+        (uniquePts, ids) = triangulation.uniquePoints(pts)
+        triangles = triangulation.delaunay(uniquePts)
+        if len(triangles) == 0:
+            raise GeoAlgorithmExecutionException(
+                    'Input points are collinear, so they cannot be \
+                    triangulated. Choose another file and try again.')
+        vertices = [QgsPoint(x, y) for (x, y) in uniquePts.tolist()]
+        ids = ids.tolist()
         feat = QgsFeature()
 
         current = 0
         total = 100.0 / float(len(triangles))
 
-        for triangle in triangles:
-            indicies = list(triangle)
-            indicies.append(indicies[0])
-            polygon = []
-            attrs = []
-            step = 0
-            for index in indicies:
-                request = QgsFeatureRequest().setFilterFid(ptDict[ids[index]])
-                inFeat = layer.getFeatures(request).next()
-                geom = QgsGeometry(inFeat.geometry())
-                point = QgsPoint(geom.asPoint())
-                polygon.append(point)
-                if step <= 3:
-                    attrs.append(ids[index])
-                step += 1
-            feat.setAttributes(attrs)
-            geometry = QgsGeometry().fromPolygon([polygon])
-            feat.setGeometry(geometry)
+        for triangle in triangles.tolist():
+            polygon = [vertices[index] for index in triangle]
+            polygon.append(polygon[0])
+            feat.setAttributes([ids[index] for index in triangle])
+            feat.setGeometry(QgsGeometry.fromPolygon([polygon]))
             writer.addFeature(feat)
             current += 1
             progress.setPercentage(int(current * total))
@@ -74,7 +74,7 @@ class Difference(GeoAlgorithm):
         inFeatB = QgsFeature()
         outFeat = QgsFeature()
 
-        index = vector.spatialindex(layerB)
+        index = vector.IndexedFeatureSource(layerB)
 
         selectionA = vector.features(layerA)
 
@@ -87,9 +87,7 @@ class Difference(GeoAlgorithm):
             diff_geom = QgsGeometry(geom)
             attrs = inFeatA.attributes()
             intersections = index.intersects(geom.boundingBox())
-            for i in intersections:
-                request = QgsFeatureRequest().setFilterFid(i)
-                inFeatB = layerB.getFeatures(request).next()
+            for inFeatB in index.features(intersections):
                 tmpGeom = QgsGeometry(inFeatB.geometry())
                 try:
                     if diff_geom.intersects(tmpGeom):
@@ -32,6 +32,7 @@ from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class ExtractByLocation(GeoAlgorithm):
@@ -46,7 +47,9 @@ class ExtractByLocation(GeoAlgorithm):
     METHODS = ['creating new selection', 'adding to current selection',
                'removing from current selection']
     opFlags = 0
-    operators = {'TOUCHES':1,'OVERLAPS':2,'WITHIN':4}
+    operators = {'TOUCHES': PreparedGeometry.TOUCHES,
+                 'OVERLAPS': PreparedGeometry.OVERLAPS,
+                 'WITHIN': PreparedGeometry.WITHIN}
 
     def defineCharacteristics(self):
         self.name = 'Extract by location'
@@ -72,31 +75,7 @@ class ExtractByLocation(GeoAlgorithm):
         layer = dataobjects.getObjectFromUri(filename)
         filename = self.getParameterValue(self.INTERSECT)
         selectLayer = dataobjects.getObjectFromUri(filename)
-        index = vector.spatialindex(layer)
-
-        def _points_op(geomA,geomB):
-            return geomA.intersects(geomB)
-
-        def _poly_lines_op(geomA,geomB):
-            if geomA.disjoint(geomB):
-                return False
-            intersects = False
-            if self.opFlags & self.operators['TOUCHES']:
-                intersects |= geomA.touches(geomB)
-            if not intersects and (self.opFlags & self.operators['OVERLAPS']):
-                if geomB.type() == QGis.Line or geomA.type() == QGis.Line:
-                    intersects |= geomA.crosses(geomB)
-                else:
-                    intersects |= geomA.overlaps(geomB)
-            if not intersects and (self.opFlags & self.operators['WITHIN']):
-                intersects |= geomA.contains(geomB)
-            return intersects
-
-        def _sp_operator():
-            if layer.geometryType() == QGis.Point:
-                return _points_op
-            else:
-                return _poly_lines_op
+        index = vector.IndexedFeatureSource(layer)
 
         self.opFlags = 0
         if self.getParameterValue(self.TOUCHES):
@@ -106,31 +85,24 @@ class ExtractByLocation(GeoAlgorithm):
         if self.getParameterValue(self.WITHIN):
             self.opFlags |= self.operators['WITHIN']
 
-        sp_operator = _sp_operator()
-
         output = self.getOutputFromName(self.OUTPUT)
         writer = output.getVectorWriter(layer.pendingFields(),
                 layer.dataProvider().geometryType(), layer.crs())
 
-        geom = QgsGeometry()
-        selectedSet = []
+        selectedSet = set()
         current = 0
-        features = vector.features(selectLayer)
-        featureCount = len(features)
+        # Features outside the extent of the input layer cannot select
+        # any of its features, so they are not even fetched
+        features = vector.features(selectLayer, filterRect=index.extent())
         total = 100.0 / float(len(features))
         for current,f in enumerate(features):
-            geom = QgsGeometry(f.geometry())
-            intersects = index.intersects(geom.boundingBox())
-            for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                feat = layer.getFeatures(request).next()
-                tmpGeom = QgsGeometry(feat.geometry())
-                if sp_operator(geom,tmpGeom):
-                    selectedSet.append(feat.id())
+            geom = PreparedGeometry(f.geometry())
+            intersects = index.intersects(geom.rect)
+            for feat in geom.filter(index.features(intersects), 'matches',
+                                    self.opFlags):
+                selectedSet.add(feat.id())
             progress.setPercentage(int(current * total))
 
-        for i, f in enumerate(vector.features(layer)):
-            if f.id() in selectedSet:
-                writer.addFeature(f)
-            progress.setPercentage(100 * i / float(featureCount))
+        for f in index.features(sorted(selectedSet)):
+            writer.addFeature(f)
         del writer
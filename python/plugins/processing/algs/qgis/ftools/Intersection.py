@@ -62,9 +62,11 @@ class Intersection(GeoAlgorithm):
         inFeatA = QgsFeature()
         inFeatB = QgsFeature()
         outFeat = QgsFeature()
-        index = vector.spatialindex(vlayerB)
+        index = vector.IndexedFeatureSource(vlayerB)
         nElement = 0
-        selectionA = vector.features(vlayerA)
+        # Features of layer A outside the extent of layer B cannot
+        # intersect it, so they are not even fetched
+        selectionA = vector.features(vlayerA, filterRect=index.extent())
         nFeat = len(selectionA)
         for inFeatA in selectionA:
             nElement += 1
@@ -72,9 +74,7 @@ class Intersection(GeoAlgorithm):
             geom = QgsGeometry(inFeatA.geometry())
             atMapA = inFeatA.attributes()
             intersects = index.intersects(geom.boundingBox())
-            for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                inFeatB = vlayerB.getFeatures(request).next()
+            for inFeatB in index.features(intersects):
                 tmpGeom = QgsGeometry(inFeatB.geometry())
                 try:
                     if geom.intersects(tmpGeom):
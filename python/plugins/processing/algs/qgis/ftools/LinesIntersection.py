@@ -75,7 +75,7 @@ class LinesIntersection(GeoAlgorithm):
         writer = self.getOutputFromName(self.OUTPUT).getVectorWriter(fieldList,
                 QGis.WKBPoint, layerA.dataProvider().crs())
 
-        spatialIndex = vector.spatialindex(layerB)
+        spatialIndex = vector.IndexedFeatureSource(layerB)
 
         inFeatA = QgsFeature()
         inFeatB = QgsFeature()
@@ -98,9 +98,7 @@ class LinesIntersection(GeoAlgorithm):
                 hasIntersections = True
 
             if hasIntersections:
-                for i in lines:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    inFeatB = layerB.getFeatures(request).next()
+                for inFeatB in spatialIndex.features(lines):
                     tmpGeom = QgsGeometry(inFeatB.geometry())
 
                     points = []
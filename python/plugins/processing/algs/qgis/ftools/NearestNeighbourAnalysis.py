@@ -26,6 +26,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import math
+import numpy
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.parameters.ParameterVector import ParameterVector
@@ -46,6 +47,9 @@ class NearestNeighbourAnalysis(GeoAlgorithm):
     POINT_COUNT = 'POINT_COUNT'
     Z_SCORE = 'Z_SCORE'
 
+    # Number of points whose neighbours are searched at once
+    CHUNK_SIZE = 10000
+
     # =========================================================================
     # def getIcon(self):
     #    return QIcon(os.path.dirname(__file__) + "/icons/neighbour.png")
@@ -73,29 +77,22 @@ class NearestNeighbourAnalysis(GeoAlgorithm):
                 self.getParameterValue(self.POINTS))
         output = self.getOutputValue(self.OUTPUT)
 
-        spatialIndex = vector.spatialindex(layer)
-
-        neighbour = QgsFeature()
-        distance = QgsDistanceArea()
+        (points, ids) = vector.layerPoints(layer)
+        index = vector.PointIndex(points)
 
         sumDist = 0.00
         A = layer.extent()
         A = float(A.width() * A.height())
 
-        current = 0
-        features = vector.features(layer)
-        count = len(features)
-        total = 100.0 / float(len(features))
-        for feat in features:
-            neighbourID = spatialIndex.nearestNeighbor(
-                    feat.geometry().asPoint(), 2)[1]
-            request = QgsFeatureRequest().setFilterFid(neighbourID)
-            neighbour = layer.getFeatures(request).next()
-            sumDist += distance.measureLine(neighbour.geometry().asPoint(),
-                    feat.geometry().asPoint())
-
-            current += 1
-            progress.setPercentage(int(current * total))
+        count = len(points)
+        for start in xrange(0, count, self.CHUNK_SIZE):
+            end = min(start + self.CHUNK_SIZE, count)
+            (dists, neighbours) = index.nearest(points[start:end], 2)
+            # The nearest point is usually the query point itself
+            isSelf = neighbours[:, 0] == numpy.arange(start, end)
+            sumDist += float(numpy.where(isSelf, dists[:, 1],
+                                         dists[:, 0]).sum())
+            progress.setPercentage(int(100.0 * end / count))
 
         do = float(sumDist) / count
         de = float(0.5 / math.sqrt(count / A))
@@ -25,7 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
-import math
+import numpy
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
 from processing.parameters.ParameterNumber import ParameterNumber
@@ -50,6 +50,9 @@ class PointDistance(GeoAlgorithm):
                  'Standard (N x T) distance matrix',
                  'Summary distance matrix (mean, std. dev., min, max)']
 
+    # Number of input points whose neighbours are searched at once
+    CHUNK_SIZE = 10000
+
     def defineCharacteristics(self):
         self.name = 'Distance matrix'
         self.group = 'Vector analysis tools'
@@ -103,6 +106,8 @@ class PointDistance(GeoAlgorithm):
             self.linearMatrix(inLayer, inField, targetLayer, targetField,
                 matType, nPoints, progress)
 
+        self.writer.close()
+
     def linearMatrix(self, inLayer, inField, targetLayer, targetField,
                      matType, nPoints, progress):
         if matType == 0:
@@ -110,89 +115,78 @@ class PointDistance(GeoAlgorithm):
         else:
             self.writer.addRecord(['InputID', 'MEAN', 'STDDEV', 'MIN', 'MAX'])
 
-        index = vector.spatialindex(targetLayer)
-
         inIdx = inLayer.fieldNameIndex(inField)
-        outIdx = targetLayer.fieldNameIndex(inField)
-
-        outFeat = QgsFeature()
-        inGeom = QgsGeometry()
-        outGeom = QgsGeometry()
-        distArea = QgsDistanceArea()
-
-        features = vector.features(inLayer)
-        current = 0
-        total = 100.0 / float(len(features))
-        for inFeat in features:
-            inGeom = inFeat.geometry()
-            inID = inFeat.attributes()[inIdx]
-            featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-            distList = []
-            vari = 0.0
-            for i in featList:
-                request = QgsFeatureRequest().setFilterFid(i)
-                outFeat = targetLayer.getFeatures(request).next()
-                outID = outFeat.attributes()[outIdx]
-                outGeom = outFeat.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                                            outGeom.asPoint())
-                if matType == 0:
-                    self.writer.addRecord([unicode(inID), unicode(outID),
-                                           unicode(dist)])
-                else:
-                    distList.append(float(dist))
-
-            if matType == 2:
-                mean = sum(distList) / len(distList)
-                for i in distList:
-                    vari += (i - mean) * (i - mean)
-                vari = math.sqrt(vari / len(distList))
-                self.writer.addRecord([unicode(inID), unicode(mean),
-                                      unicode(vari), unicode(min(distList)),
-                                      unicode(max(distList))])
-
-            current += 1
-            progress.setPercentage(int(current * total))
+        outIdx = targetLayer.fieldNameIndex(targetField)
+
+        (targetPoints, targetIds) = vector.layerPoints(targetLayer, outIdx)
+        index = vector.PointIndex(targetPoints)
+        (inPoints, inIds) = vector.layerPoints(inLayer, inIdx)
+        nPoints = min(int(nPoints), len(index))
+
+        count = len(inPoints)
+        if nPoints == 0:
+            # No target points, so there are no distances, and the
+            # summary statistics of every input point are empty
+            if matType != 0:
+                self.writer.addRecords([unicode(inID), '', '', '', '']
+                                       for inID in inIds)
+            return
+
+        for start in xrange(0, count, self.CHUNK_SIZE):
+            end = min(start + self.CHUNK_SIZE, count)
+            (dists, neighbours) = index.nearest(inPoints[start:end], nPoints)
+            inChunkIds = [unicode(inID) for inID in inIds[start:end]]
+            if matType == 0:
+                self.writer.addRecords([inID, unicode(targetIds[outID]),
+                                        unicode(dist)]
+                        for (inID, outIDs, distList)
+                        in zip(inChunkIds, neighbours.tolist(),
+                               dists.tolist())
+                        for (outID, dist) in zip(outIDs, distList))
+            else:
+                mean = dists.mean(1)
+                vari = numpy.sqrt(((dists - mean[:, None]) ** 2).mean(1))
+                self.writer.addRecords([inID] + [unicode(v) for v in values]
+                        for (inID, values)
+                        in zip(inChunkIds, zip(mean.tolist(), vari.tolist(),
+                               dists.min(1).tolist(), dists.max(1).tolist())))
+
+            progress.setPercentage(int(100.0 * end / count))
 
     def regularMatrix(self, inLayer, inField, targetLayer, targetField,
                       nPoints, progress):
-        index = vector.spatialindex(targetLayer)
-
         inIdx = inLayer.fieldNameIndex(inField)
-        outIdx = targetLayer.fieldNameIndex(inField)
-
-        outFeat = QgsFeature()
-        inGeom = QgsGeometry()
-        outGeom = QgsGeometry()
-        distArea = QgsDistanceArea()
-
-        first = True
-        current = 0
-        features = vector.features(inLayer)
-        total = 100.0 / float(len(features))
-
-        for inFeat in features:
-            inGeom = inFeat.geometry()
-            inID = inFeat.attributes()[inIdx]
-            if first:
-                featList = index.nearestNeighbor(inGeom.asPoint(), nPoints)
-                first = False
-                data = ['ID']
-                for i in featList:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    outFeat = targetLayer.getFeatures(request).next()
-                    data.append(unicode(outFeat.attributes[outIdx]))
-                self.writer.addRecord(data)
-
-            data = [unicode(inID)]
-            for i in featList:
-                request = QgsFeatureRequest().setFilterFid(i)
-                outFeat = targetLayer.getFeatures(request).next()
-                outGeom = outFeat.geometry()
-                dist = distArea.measureLine(inGeom.asPoint(),
-                                            outGeom.asPoint())
-                data.append(unicode(float(dist)))
-            self.writer.addRecord(data)
-
-            current += 1
-            progress.setPercentage(int(current * total))
+        outIdx = targetLayer.fieldNameIndex(targetField)
+
+        (targetPoints, targetIds) = vector.layerPoints(targetLayer, outIdx)
+        index = vector.PointIndex(targetPoints)
+        (inPoints, inIds) = vector.layerPoints(inLayer, inIdx)
+        nPoints = min(int(nPoints), len(index))
+
+        count = len(inPoints)
+        if count == 0:
+            return
+        if nPoints == 0:
+            # No target points, so the matrix has no columns
+            self.writer.addRecord(['ID'])
+            self.writer.addRecords([unicode(inID)] for inID in inIds)
+            return
+
+        # The nearest target points of the first input point are used as
+        # columns for all of them
+        columns = index.nearest(inPoints[:1], nPoints)[1][0]
+        self.writer.addRecord(['ID'] + [unicode(targetIds[outID])
+                                        for outID in columns.tolist()])
+        targets = targetPoints[columns]
+
+        for start in xrange(0, count, self.CHUNK_SIZE):
+            end = min(start + self.CHUNK_SIZE, count)
+            points = inPoints[start:end]
+            dists = numpy.hypot(points[:, 0, None] - targets[:, 0],
+                                points[:, 1, None] - targets[:, 1])
+            self.writer.addRecords([unicode(inID)]
+                    + [unicode(dist) for dist in distList]
+                    for (inID, distList)
+                    in zip(inIds[start:end], dists.tolist()))
+
+            progress.setPercentage(int(100.0 * end / count))
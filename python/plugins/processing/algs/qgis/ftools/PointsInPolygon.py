@@ -32,6 +32,7 @@ from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterString import ParameterString
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class PointsInPolygon(GeoAlgorithm):
@@ -75,7 +76,14 @@ class PointsInPolygon(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        # Single points are loaded into arrays and classified all at
+        # once for every polygon. Other geometries, such as multipoints,
+        # are tested one by one.
+        bulk = pointLayer.wkbType() in (QGis.WKBPoint, QGis.WKBPoint25D)
+        if bulk:
+            pointIndex = vector.PointIndex(vector.layerPoints(pointLayer)[0])
+        else:
+            spatialIndex = vector.IndexedFeatureSource(pointLayer)
 
         ftPoly = QgsFeature()
         ftPoint = QgsFeature()
@@ -83,7 +91,6 @@ class PointsInPolygon(GeoAlgorithm):
         geom = QgsGeometry()
 
         current = 0
-        hasIntersections = False
 
         features = vector.features(polyLayer)
         total = 100.0 / float(len(features))
@@ -92,18 +99,14 @@ class PointsInPolygon(GeoAlgorithm):
             attrs = ftPoly.attributes()
 
             count = 0
-            hasIntersections = False
-            points = spatialIndex.intersects(geom.boundingBox())
-            if len(points) > 0:
-                hasIntersections = True
-
-            if hasIntersections:
-                for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
-                    if geom.contains(tmpGeom):
-                        count += 1
+            if bulk:
+                count = len(pointIndex.pointsInPolygon(geom))
+            else:
+                points = spatialIndex.intersects(geom.boundingBox())
+                if len(points) > 0:
+                    prepared = PreparedGeometry(geom)
+                    count = len(prepared.filter(
+                            spatialIndex.features(points), 'contains'))
 
             outFeat.setGeometry(geom)
             if idxCount == len(attrs):
@@ -25,6 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -33,6 +34,7 @@ from processing.parameters.ParameterString import ParameterString
 from processing.parameters.ParameterTableField import ParameterTableField
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class PointsInPolygonUnique(GeoAlgorithm):
@@ -80,14 +82,27 @@ class PointsInPolygonUnique(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        # Single points are loaded into arrays and classified all at
+        # once for every polygon. Other geometries, such as multipoints,
+        # are tested one by one.
+        bulk = pointLayer.wkbType() in (QGis.WKBPoint, QGis.WKBPoint25D)
+        if bulk:
+            (coords, values) = vector.layerPoints(pointLayer, classFieldIndex)
+            pointIndex = vector.PointIndex(coords)
+            # Classes are encoded as integers, so the ones found in each
+            # polygon can be counted with NumPy
+            classes = {}
+            codes = numpy.array([classes.setdefault(
+                    None if isinstance(v, QPyNullVariant) else v,
+                    len(classes)) for v in values], dtype=numpy.intp)
+        else:
+            spatialIndex = vector.IndexedFeatureSource(pointLayer)
 
         ftPoint = QgsFeature()
         outFeat = QgsFeature()
         geom = QgsGeometry()
 
         current = 0
-        hasIntersections = False
 
         features = vector.features(polyLayer)
         total = 100.0 / float(len(features))
@@ -95,27 +110,27 @@ class PointsInPolygonUnique(GeoAlgorithm):
             geom = ftPoly.geometry()
             attrs = ftPoly.attributes()
 
-            classes = []
-            hasIntersections = False
-            points = spatialIndex.intersects(geom.boundingBox())
-            if len(points) > 0:
-                hasIntersections = True
-
-            if hasIntersections:
-                for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
-                    if geom.contains(tmpGeom):
+            count = 0
+            if bulk:
+                count = len(numpy.unique(
+                        codes[pointIndex.pointsInPolygon(geom)]))
+            else:
+                points = spatialIndex.intersects(geom.boundingBox())
+                if len(points) > 0:
+                    prepared = PreparedGeometry(geom)
+                    found = []
+                    for ftPoint in prepared.filter(
+                            spatialIndex.features(points), 'contains'):
                         clazz = ftPoint.attributes()[classFieldIndex]
-                        if not clazz in classes:
-                            classes.append(clazz)
+                        if not clazz in found:
+                            found.append(clazz)
+                    count = len(found)
 
             outFeat.setGeometry(geom)
             if idxCount == len(attrs):
-                attrs.append(len(classes))
+                attrs.append(count)
             else:
-                attrs[idxCount] = len(classes)
+                attrs[idxCount] = count
             outFeat.setAttributes(attrs)
             writer.addFeature(outFeat)
 
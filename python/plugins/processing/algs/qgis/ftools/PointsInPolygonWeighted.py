@@ -25,6 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import numpy
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
@@ -33,6 +34,7 @@ from processing.parameters.ParameterString import ParameterString
 from processing.parameters.ParameterTableField import ParameterTableField
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class PointsInPolygonWeighted(GeoAlgorithm):
@@ -82,14 +84,28 @@ class PointsInPolygonWeighted(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(pointLayer)
+        # Single points are loaded into arrays and classified all at
+        # once for every polygon. Other geometries, such as multipoints,
+        # are tested one by one.
+        bulk = pointLayer.wkbType() in (QGis.WKBPoint, QGis.WKBPoint25D)
+        if bulk:
+            (coords, values) = vector.layerPoints(pointLayer, fieldIdx)
+            pointIndex = vector.PointIndex(coords)
+            # Fields with non-numeric values are ignored
+            weights = numpy.zeros(len(values))
+            for (i, value) in enumerate(values):
+                try:
+                    weights[i] = float(value)
+                except (TypeError, ValueError):
+                    pass
+        else:
+            spatialIndex = vector.IndexedFeatureSource(pointLayer)
 
         ftPoint = QgsFeature()
         outFeat = QgsFeature()
         geom = QgsGeometry()
 
         current = 0
-        hasIntersections = False
 
         features = vector.features(polyLayer)
         total = 100.0 / float(len(features))
@@ -98,18 +114,14 @@ class PointsInPolygonWeighted(GeoAlgorithm):
             attrs = ftPoly.attributes()
 
             count = 0
-            hasIntersections = False
-            points = spatialIndex.intersects(geom.boundingBox())
-            if len(points) > 0:
-                hasIntersections = True
-
-            if hasIntersections:
-                progress.setText(str(len(points)))
-                for i in points:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftPoint = pointLayer.getFeatures(request).next()
-                    tmpGeom = QgsGeometry(ftPoint.geometry())
-                    if geom.contains(tmpGeom):
+            if bulk:
+                count = float(weights[pointIndex.pointsInPolygon(geom)].sum())
+            else:
+                points = spatialIndex.intersects(geom.boundingBox())
+                if len(points) > 0:
+                    prepared = PreparedGeometry(geom)
+                    for ftPoint in prepared.filter(
+                            spatialIndex.features(points), 'contains'):
                         weight = str(ftPoint.attributes()[fieldIdx])
                         try:
                             count += float(weight)
@@ -62,6 +62,9 @@ class RandomExtract(GeoAlgorithm):
                           10))
         self.addOutput(OutputVector(self.OUTPUT, 'Selection'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         filename = self.getParameterValue(self.INPUT)
         layer = dataobjects.getObjectFromUri(filename)
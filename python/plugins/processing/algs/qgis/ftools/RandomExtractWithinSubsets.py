@@ -66,6 +66,9 @@ class RandomExtractWithinSubsets(GeoAlgorithm):
 
         self.addOutput(OutputVector(self.OUTPUT, 'Selection'))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         filename = self.getParameterValue(self.INPUT)
 
@@ -63,6 +63,9 @@ class RandomSelection(GeoAlgorithm):
                           10))
         self.addOutput(OutputVector(self.OUTPUT, 'Selection', True))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         filename = self.getParameterValue(self.INPUT)
         layer = dataobjects.getObjectFromUri(filename)
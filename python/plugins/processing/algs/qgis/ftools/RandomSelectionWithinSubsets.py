@@ -67,6 +67,9 @@ class RandomSelectionWithinSubsets(GeoAlgorithm):
 
         self.addOutput(OutputVector(self.OUTPUT, 'Selection', True))
 
+    def isCacheable(self):
+        return False
+
     def processAlgorithm(self, progress):
         filename = self.getParameterValue(self.INPUT)
 
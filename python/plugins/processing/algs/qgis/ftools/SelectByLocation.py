@@ -33,6 +33,7 @@ from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterBoolean import ParameterBoolean
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import dataobjects, vector
+from processing.tools.predicates import PreparedGeometry
 
 
 class SelectByLocation(GeoAlgorithm):
@@ -48,7 +49,9 @@ class SelectByLocation(GeoAlgorithm):
     METHODS = ['creating new selection', 'adding to current selection',
                'removing from current selection']
     opFlags = 0
-    operators = {'TOUCHES':1,'OVERLAPS':2,'WITHIN':4}
+    operators = {'TOUCHES': PreparedGeometry.TOUCHES,
+                 'OVERLAPS': PreparedGeometry.OVERLAPS,
+                 'WITHIN': PreparedGeometry.WITHIN}
 
 
     def defineCharacteristics(self):
@@ -80,31 +83,7 @@ class SelectByLocation(GeoAlgorithm):
         selectLayer = dataobjects.getObjectFromUri(filename)
 
         oldSelection = set(inputLayer.selectedFeaturesIds())
-        index = vector.spatialindex(inputLayer)
-
-        def _points_op(geomA,geomB):
-            return geomA.intersects(geomB)
-
-        def _poly_lines_op(geomA,geomB):
-            if geomA.disjoint(geomB):
-                return False
-            intersects = False
-            if self.opFlags & self.operators['TOUCHES']:
-                intersects |= geomA.touches(geomB)
-            if not intersects and (self.opFlags & self.operators['OVERLAPS']):
-                if geomB.type() == QGis.Line or geomA.type() == QGis.Line:
-                    intersects |= geomA.crosses(geomB)
-                else:
-                    intersects |= geomA.overlaps(geomB)
-            if not intersects and (self.opFlags & self.operators['WITHIN']):
-                intersects |= geomA.contains(geomB)
-            return intersects
-
-        def _sp_operator():
-            if inputLayer.geometryType() == QGis.Point:
-                return _points_op
-            else:
-                return _poly_lines_op
+        index = vector.IndexedFeatureSource(inputLayer)
 
         self.opFlags = 0
         if self.getParameterValue(self.TOUCHES):
@@ -114,29 +93,25 @@ class SelectByLocation(GeoAlgorithm):
         if self.getParameterValue(self.WITHIN):
             self.opFlags |= self.operators['WITHIN']
 
-        sp_operator = _sp_operator()
-
-        geom = QgsGeometry()
-        selectedSet = []
+        selectedSet = set()
         current = 0
-        features = vector.features(selectLayer)
+        # Features outside the extent of the input layer cannot select
+        # any of its features, so they are not even fetched
+        features = vector.features(selectLayer, filterRect=index.extent())
         total = 100.0 / float(len(features))
         for f in features:
-            geom = QgsGeometry(f.geometry())
-            intersects = index.intersects(geom.boundingBox())
-            for i in intersects:
-                request = QgsFeatureRequest().setFilterFid(i)
-                feat = inputLayer.getFeatures(request).next()
-                tmpGeom = QgsGeometry(feat.geometry())
-                if sp_operator(geom,tmpGeom):
-                    selectedSet.append(feat.id())
+            geom = PreparedGeometry(f.geometry())
+            intersects = index.intersects(geom.rect)
+            for feat in geom.filter(index.features(intersects), 'matches',
+                                    self.opFlags):
+                selectedSet.add(feat.id())
             current += 1
             progress.setPercentage(int(current * total))
 
         if method == 1:
-            selectedSet = list(oldSelection.union(selectedSet))
+            selectedSet = oldSelection.union(selectedSet)
         elif method == 2:
-            selectedSet = list(oldSelection.difference(selectedSet))
+            selectedSet = oldSelection.difference(selectedSet)
 
-        inputLayer.setSelectedFeatures(selectedSet)
+        inputLayer.setSelectedFeatures(list(selectedSet))
         self.setOutputValue(self.OUTPUT, filename)
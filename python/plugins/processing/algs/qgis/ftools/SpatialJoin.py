@@ -33,6 +33,7 @@ from processing.parameters.ParameterString import ParameterString
 from processing.tools import dataobjects
 from processing.outputs.OutputVector import OutputVector
 from processing.tools import vector
+from processing.tools.predicates import PreparedGeometry
 from processing.core.ProcessingLog import ProcessingLog
 import os
 
@@ -168,7 +169,7 @@ class SpatialJoin(GeoAlgorithm):
         add = 85.00 / provider1.featureCount()
 
         progress.setText('Creating spatial index...')
-        index = vector.spatialindex(layer2)
+        index = vector.IndexedFeatureSource(layer2)
         progress.setText('Processing spatial join...')
         fit1 = provider1.getFeatures()
         while fit1.nextFeature(inFeat):
@@ -189,9 +190,9 @@ class SpatialJoin(GeoAlgorithm):
             if check == 0:
                 count = 0
                 multi_feature = []
-                for i in joinList:
-                    provider2.getFeatures( QgsFeatureRequest().setFilterFid( int(i) ) ).nextFeature( inFeatB )
-                    if inGeom.intersects(inFeatB.geometry()):
+                prepared = PreparedGeometry(inGeom)
+                for inFeatB in index.features(joinList):
+                    if prepared.intersects(inFeatB.geometry()):
                         count = count + 1
                         atMap2 = inFeatB.attributes()
                         if not summary:
@@ -82,7 +82,7 @@ class SumLines(GeoAlgorithm):
                                              polyProvider.geometryType(),
                                              polyProvider.crs())
 
-        spatialIndex = vector.spatialindex(lineLayer)
+        spatialIndex = vector.IndexedFeatureSource(lineLayer)
 
         ftLine = QgsFeature()
         ftPoly = QgsFeature()
@@ -106,9 +106,7 @@ class SumLines(GeoAlgorithm):
                 hasIntersections = True
 
             if hasIntersections:
-                for i in lines:
-                    request = QgsFeatureRequest().setFilterFid(i)
-                    ftLine = lineLayer.getFeatures(request).next()
+                for ftLine in spatialIndex.features(lines):
                     tmpGeom = QgsGeometry(ftLine.geometry())
                     if inGeom.intersects(tmpGeom):
                         outGeom = inGeom.intersection(tmpGeom)
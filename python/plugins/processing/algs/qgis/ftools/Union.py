@@ -65,8 +65,8 @@ class Union(GeoAlgorithm):
         inFeatA = QgsFeature()
         inFeatB = QgsFeature()
         outFeat = QgsFeature()
-        indexA = vector.spatialindex(vlayerB)
-        indexB = vector.spatialindex(vlayerA)
+        indexA = vector.IndexedFeatureSource(vlayerB)
+        indexB = vector.IndexedFeatureSource(vlayerA)
 
         count = 0
         nElement = 0
@@ -91,10 +91,8 @@ class Union(GeoAlgorithm):
                     raise GeoAlgorithmExecutionException(
                             'Feature exception while computing union')
             else:
-                for id in intersects:
+                for inFeatB in indexA.features(intersects):
                     count += 1
-                    request = QgsFeatureRequest().setFilterFid(id)
-                    inFeatB = vlayerB.getFeatures(request).next()
                     atMapB = inFeatB.attributes()
                     tmpGeom = QgsGeometry(inFeatB.geometry())
 
@@ -182,9 +180,7 @@ class Union(GeoAlgorithm):
                     raise GeoAlgorithmExecutionException(
                             'Feature exception while computing union')
             else:
-                for id in intersects:
-                    request = QgsFeatureRequest().setFilterFid(id)
-                    inFeatB = vlayerA.getFeatures(request).next()
+                for inFeatB in indexB.features(intersects):
                     atMapB = inFeatB.attributes()
                     tmpGeom = QgsGeometry(inFeatB.geometry())
                     try:
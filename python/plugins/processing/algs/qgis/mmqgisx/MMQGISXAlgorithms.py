@@ -765,6 +765,10 @@ class mmqgisx_hub_distance_algorithm(GeoAlgorithm):
     UNITS = 'UNITS'
     SAVENAME = 'SAVENAME'
 
+    # Number of hubs nearest in layer units that are compared by
+    # ellipsoidal distance in geographic CRSs
+    HUB_CANDIDATES = 16
+
     def defineCharacteristics(self):
         self.name = 'Distance to nearest hub'
         self.group = 'Vector analysis tools'
@@ -819,31 +823,43 @@ class mmqgisx_hub_distance_algorithm(GeoAlgorithm):
         output = self.getOutputFromName(self.SAVENAME)
         out = output.getVectorWriter(outfields, outputtype, layersource.crs())
 
-        # Create array of hubs in memory
+        # Create array of hubs in memory, and an index to find the
+        # nearest one to each source point
         hubs = []
         features = vector.features(layerdest)
         for feature in features:
             hubs.append(mmqgisx_hub(feature.geometry().boundingBox().center(),
                         unicode(feature.attributes()[nameindex])))
+        hubindex = vector.PointIndex([(hub.point.x(), hub.point.y())
+                                     for hub in hubs])
+        if not hubs:
+            raise GeoAlgorithmExecutionException('No hubs found in layer '
+                    + layerdest.name())
+
+        distance = QgsDistanceArea()
+        distance.setSourceCrs(layersource.crs().srsid())
+        distance.setEllipsoidalMode(True)
 
         # Scan source points, find nearest hub, and write to output file
         writecount = 0
-        features = vector.features(layersource)
+        features = list(vector.features(layersource))
         featureCount = len(features)
-        for feature in features:
-            source = feature.geometry().boundingBox().center()
-            distance = QgsDistanceArea()
-            distance.setSourceCrs(layersource.crs().srsid())
-            distance.setEllipsoidalMode(True)
-
-            closest = hubs[0]
-            hubdist = distance.measureLine(source, closest.point)
-
-            for hub in hubs:
-                thisdist = distance.measureLine(source, hub.point)
-                if thisdist < hubdist:
-                    closest = hub
-                    hubdist = thisdist
+        sources = [feature.geometry().boundingBox().center()
+                   for feature in features]
+        # Planar distances in degrees do not rank hubs as ellipsoidal
+        # distances do, so in geographic CRSs several candidates are
+        # taken from the index and ranked again with QgsDistanceArea
+        if units != 'Layer Units' and layersource.crs().geographicFlag():
+            k = min(self.HUB_CANDIDATES, len(hubs))
+        else:
+            k = 1
+        candidates = hubindex.nearest([(source.x(), source.y())
+                                       for source in sources], k)[1].tolist()
+        for (feature, source, ids) in zip(features, sources, candidates):
+            dists = [(distance.measureLine(source, hubs[i].point), i)
+                     for i in ids if i >= 0]
+            (hubdist, i) = min(dists)
+            closest = hubs[i]
 
             attributes = feature.attributes()
             attributes.append(closest.name)
@@ -924,6 +940,13 @@ class mmqgisx_hub_lines_algorithm(GeoAlgorithm):
         out = output.getVectorWriter(outfields, QGis.WKBLineString,
                                      spokelayer.crs())
 
+        # Read hub points once, keeping the first hub for each id
+        hubs = {}
+        for hubpoint in vector.features(hublayer):
+            hubid = unicode(hubpoint.attributes()[hubindex])
+            if hubid not in hubs:
+                hubs[hubid] = hubpoint.geometry().boundingBox().center()
+
         # Scan spoke points
         linecount = 0
         spokepoints = vector.features(spokelayer)
@@ -935,26 +958,20 @@ class mmqgisx_hub_lines_algorithm(GeoAlgorithm):
             spokeid = unicode(spokepoint.attributes()[spokeindex])
             progress.setPercentage(float(i) / len(spokepoints) * 100)
 
-            # Scan hub points to find first matching hub
-            hubpoints = vector.features(hublayer)
-            for hubpoint in hubpoints:
-                hubid = unicode(hubpoint.attributes()[hubindex])
-                if hubid == spokeid:
-                    hubx = hubpoint.geometry().boundingBox().center().x()
-                    huby = hubpoint.geometry().boundingBox().center().y()
+            if spokeid in hubs:
+                hub = hubs[spokeid]
 
-                    # Write line to the output file
-                    outfeature = QgsFeature()
-                    outfeature.setAttributes(spokepoint.attributes())
+                # Write line to the output file
+                outfeature = QgsFeature()
+                outfeature.setAttributes(spokepoint.attributes())
 
-                    polyline = []
-                    polyline.append(QgsPoint(spokex, spokey))
-                    polyline.append(QgsPoint(hubx, huby))
-                    geometry = QgsGeometry()
-                    outfeature.setGeometry(geometry.fromPolyline(polyline))
-                    out.addFeature(outfeature)
-                    linecount = linecount + 1
-                    break
+                polyline = []
+                polyline.append(QgsPoint(spokex, spokey))
+                polyline.append(QgsPoint(hub.x(), hub.y()))
+                geometry = QgsGeometry()
+                outfeature.setGeometry(geometry.fromPolyline(polyline))
+                out.addFeature(outfeature)
+                linecount = linecount + 1
 
         del out
 
@@ -29,6 +29,7 @@ import os
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from processing.core.AlgorithmProvider import AlgorithmProvider
+from processing.core.DescriptionCache import DescriptionCache
 from processing.core.ProcessingConfig import ProcessingConfig, Setting
 from processing.core.ProcessingLog import ProcessingLog
 from SagaAlgorithm import SagaAlgorithm
@@ -74,11 +75,19 @@ class SagaAlgorithmProvider(AlgorithmProvider):
 
 
     def _loadAlgorithms(self):
-        self.algs = []
         folder = SagaUtils.sagaDescriptionPath()
+        saga208 = SagaUtils.isSaga208()
+        self.algs = DescriptionCache.loadAlgorithms(self.getName(), folder,
+                lambda: self.createAlgsFromFolder(folder, saga208),
+                key=saga208)
+        self.algs.append(SplitRGBBands())
+        self.algs.append(RasterCalculator())
+
+    def createAlgsFromFolder(self, folder, saga208):
+        algs = []
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
-                if not SagaUtils.isSaga208():
+                if not saga208:
                     if descriptionFile.startswith('2.0.8'):
                         continue
                 else:
@@ -87,7 +96,7 @@ class SagaAlgorithmProvider(AlgorithmProvider):
                 try:
                     alg = SagaAlgorithm(os.path.join(folder, descriptionFile))
                     if alg.name.strip() != '':
-                        self.algs.append(alg)
+                        algs.append(alg)
                     else:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                                 'Could not open SAGA algorithm: '
@@ -96,8 +105,7 @@ class SagaAlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open SAGA algorithm: '
                             + descriptionFile + '\n' + str(e))
-        self.algs.append(SplitRGBBands())
-        self.algs.append(RasterCalculator())
+        return algs
 
     def getDescription(self):
         return 'SAGA'
@@ -105,6 +113,9 @@ class SagaAlgorithmProvider(AlgorithmProvider):
     def getName(self):
         return 'saga'
 
+    def isThreadSafe(self):
+        return True
+
     def getSupportedOutputVectorLayerExtensions(self):
         return ['shp']
 
@@ -28,11 +28,12 @@ __revision__ = '$Format:%H$'
 import os
 import stat
 import traceback
-import subprocess
+import threading
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner, sagaParser
 from processing.tools.system import *
 from processing.tests.TestData import polygons
 
@@ -49,10 +50,17 @@ class SagaUtils:
 
     @staticmethod
     def sagaBatchJobFilename():
+        # Algorithms run outside of the main thread use their own batch
+        # file, so several SAGA algorithms can be run concurrently
+        thread = threading.current_thread()
+        if thread.name == 'MainThread':
+            name = 'saga_batch_job'
+        else:
+            name = 'saga_batch_job_' + str(thread.ident)
         if isWindows():
-            filename = 'saga_batch_job.bat'
+            filename = name + '.bat'
         else:
-            filename = 'saga_batch_job.sh'
+            filename = name + '.sh'
 
         batchfile = userFolder() + os.sep + filename
 
@@ -124,27 +132,7 @@ class SagaUtils:
             command = [SagaUtils.sagaBatchJobFilename()]
         loglines = []
         loglines.append('SAGA execution console output')
-        proc = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            if '%' in line:
-                s = ''.join([x for x in line if x.isdigit()])
-                try:
-                    progress.setPercentage(int(s))
-                except:
-                    pass
-            else:
-                line = line.strip()
-                if line != '/' and line != '-' and line != '\\' and line \
-                    != '|':
-                    loglines.append(line)
-                    progress.setConsoleInfo(line)
+        loglines += ProcessRunner.run(command, progress, sagaParser)
         if ProcessingConfig.getSetting(SagaUtils.SAGA_LOG_CONSOLE):
             ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
 
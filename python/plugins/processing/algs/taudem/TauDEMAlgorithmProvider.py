@@ -30,6 +30,7 @@ import os
 from PyQt4.QtGui import *
 
 from processing.core.AlgorithmProvider import AlgorithmProvider
+from processing.core.DescriptionCache import DescriptionCache
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingConfig import Setting
 from processing.core.ProcessingLog import ProcessingLog
@@ -51,7 +52,7 @@ class TauDEMAlgorithmProvider(AlgorithmProvider):
     def __init__(self):
         AlgorithmProvider.__init__(self)
         self.activate = False
-        self.createAlgsList()
+        self.preloadedAlgs = None
 
     def getDescription(self):
         return 'TauDEM (hydrologic analysis)'
@@ -59,6 +60,9 @@ class TauDEMAlgorithmProvider(AlgorithmProvider):
     def getName(self):
         return 'taudem'
 
+    def isThreadSafe(self):
+        return True
+
     def getIcon(self):
         return QIcon(os.path.dirname(__file__) + '/../../images/taudem.png')
 
@@ -84,18 +88,34 @@ class TauDEMAlgorithmProvider(AlgorithmProvider):
         ProcessingConfig.removeSetting(TauDEMUtils.MPI_PROCESSES)
 
     def _loadAlgorithms(self):
+        if self.preloadedAlgs is None:
+            self.createAlgsList()
         self.algs = self.preloadedAlgs
 
     def createAlgsList(self):
-        self.preloadedAlgs = []
         folder = TauDEMUtils.taudemDescriptionPath()
+        self.preloadedAlgs = DescriptionCache.loadAlgorithms(
+                self.getName(), folder,
+                lambda: self.createAlgsFromFolder(folder))
+        self.preloadedAlgs.append(PeukerDouglas())
+        self.preloadedAlgs.append(SlopeArea())
+        self.preloadedAlgs.append(LengthArea())
+        self.preloadedAlgs.append(DropAnalysis())
+        self.preloadedAlgs.append(DinfDistDown())
+        self.preloadedAlgs.append(DinfDistUp())
+        self.preloadedAlgs.append(GridNet())
+        self.preloadedAlgs.append(DinfTransLimAccum())
+        self.preloadedAlgs.append(DinfTransLimAccum2())
+
+    def createAlgsFromFolder(self, folder):
+        algs = []
         for descriptionFile in os.listdir(folder):
             if descriptionFile.endswith('txt'):
                 try:
                     alg = TauDEMAlgorithm(os.path.join(folder,
                             descriptionFile))
                     if alg.name.strip() != '':
-                        self.preloadedAlgs.append(alg)
+                        algs.append(alg)
                     else:
                         ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                                 'Could not open TauDEM algorithm: '
@@ -104,13 +124,4 @@ class TauDEMAlgorithmProvider(AlgorithmProvider):
                     ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                             'Could not open TauDEM algorithm: '
                             + descriptionFile)
-
-        self.preloadedAlgs.append(PeukerDouglas())
-        self.preloadedAlgs.append(SlopeArea())
-        self.preloadedAlgs.append(LengthArea())
-        self.preloadedAlgs.append(DropAnalysis())
-        self.preloadedAlgs.append(DinfDistDown())
-        self.preloadedAlgs.append(DinfDistUp())
-        self.preloadedAlgs.append(GridNet())
-        self.preloadedAlgs.append(DinfTransLimAccum())
-        self.preloadedAlgs.append(DinfTransLimAccum2())
+        return algs
@@ -27,10 +27,10 @@ __revision__ = '$Format:%H$'
 
 import os
 from qgis.core import QgsApplication
-import subprocess
 
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.ProcessingLog import ProcessingLog
+from processing.core.ProcessRunner import ProcessRunner
 from processing.tools.system import *
 
 
@@ -82,14 +82,5 @@ class TauDEMUtils:
         loglines = []
         loglines.append('TauDEM execution console output')
         fused_command = ''.join(['"%s" ' % c for c in command])
-        proc = subprocess.Popen(
-            fused_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            ).stdout
-        for line in iter(proc.readline, ''):
-            loglines.append(line)
+        loglines += ProcessRunner.run(fused_command, progress)
         ProcessingLog.addToLog(ProcessingLog.LOG_INFO, loglines)
@@ -122,3 +122,28 @@ class AlgorithmProvider:
 
     def supportsNonFileBasedOutput(self):
         return False
+
+    def isThreadSafe(self):
+        """Returns True if the algorithms in this provider can be run
+        outside of the main thread, concurrently with other ones.
+
+        That is the case of providers that call external applications
+        and do most of their work in a separate process. Algorithms
+        based on the QGIS API should be run in the main thread, so this
+        returns False by default.
+        """
+        return False
+
+    def startSession(self):
+        """Called before running several algorithms that might share
+        data, such as the steps of a model or the rows of a batch
+        process, so the provider can keep that data between them
+        instead of preparing it for each algorithm.
+
+        Calls can be nested, and each of them is followed by a call to
+        endSession() once the algorithms have been executed.
+        """
+        pass
+
+    def endSession(self):
+        pass
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    DescriptionCache.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import sys
+import types
+import inspect
+import cPickle
+from processing.core.ProcessingLog import ProcessingLog
+from processing.tools.system import userFolder, mkdir
+
+
+class DescriptionCache:
+    """Stores the algorithms created from a folder of description files
+    in the user folder, so they do not have to be parsed again the next
+    time they are loaded.
+
+    Cached algorithms are only used if the name and modification time
+    of all files in the folder are the same as when they were cached,
+    the cache was written with the current VERSION and version of the
+    plugin, and the modules with the code that parses the files and
+    the classes of the algorithms, parameters and outputs have not
+    been modified since.
+    """
+
+    # Increase this when changes in algorithm classes make algorithms
+    # cached by previous versions invalid
+    VERSION = 1
+
+    @staticmethod
+    def cacheFile(name):
+        folder = os.path.join(userFolder(), 'cache')
+        mkdir(folder)
+        return os.path.join(folder, name + '.pickle')
+
+    @staticmethod
+    def pluginVersion():
+        """Returns the version of the plugin in its metadata file."""
+        metadata = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                'metadata.txt')
+        with open(metadata) as f:
+            for line in f:
+                if line.startswith('version='):
+                    return line.strip()[len('version='):]
+        return None
+
+    @staticmethod
+    def modulesStamp(objects):
+        """Returns a list with the path and modification time of the
+        source files of the modules defining the passed functions, and
+        the classes of the passed objects and their base classes.
+        """
+        names = set()
+        for obj in objects:
+            if isinstance(obj, types.FunctionType):
+                names.add(obj.__module__)
+            else:
+                names.update(cls.__module__
+                             for cls in inspect.getmro(obj.__class__))
+        files = set()
+        for name in names:
+            filename = getattr(sys.modules.get(name), '__file__', None)
+            if filename is not None:
+                files.add(os.path.splitext(filename)[0] + '.py')
+        return DescriptionCache.filesStamp(sorted(files))
+
+    @staticmethod
+    def filesStamp(files):
+        """Returns a list with the passed files and their modification
+        time, or None for the ones that do not exist.
+        """
+        stamp = []
+        for filename in files:
+            try:
+                stamp.append((filename, os.path.getmtime(filename)))
+            except OSError:
+                stamp.append((filename, None))
+        return stamp
+
+    @staticmethod
+    def folderStamp(folder):
+        """Returns a list with the name and modification time of all
+        files in the folder.
+        """
+        stamp = []
+        for filename in sorted(os.listdir(folder)):
+            stamp.append((filename,
+                          os.path.getmtime(os.path.join(folder, filename))))
+        return stamp
+
+    @staticmethod
+    def loadAlgorithms(name, folder, createAlgs, key=None):
+        """Returns the algorithms created by calling createAlgs(),
+        which should parse the description files in the passed folder.
+
+        If the files have not changed since the last time they were
+        parsed, algorithms are taken from the cache. The key can be
+        used to discard the cache when something else that changes the
+        parsed algorithms changes, such as the version of the
+        application they call.
+        """
+        try:
+            stamp = (DescriptionCache.VERSION,
+                     DescriptionCache.pluginVersion(), folder, key,
+                     DescriptionCache.folderStamp(folder))
+            filename = DescriptionCache.cacheFile(name)
+        except (OSError, IOError):
+            return createAlgs()
+
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'rb') as f:
+                    if cPickle.load(f) == stamp:
+                        modules = cPickle.load(f)
+                        if modules == DescriptionCache.filesStamp(
+                                [path for (path, mtime) in modules]):
+                            return cPickle.load(f)
+            except Exception:
+                pass
+
+        algs = createAlgs()
+        try:
+            objects = [createAlgs]
+            for alg in algs:
+                objects.append(alg)
+                objects.extend(alg.parameters)
+                objects.extend(alg.outputs)
+            with open(filename, 'wb') as f:
+                cPickle.dump(stamp, f, cPickle.HIGHEST_PROTOCOL)
+                cPickle.dump(DescriptionCache.modulesStamp(objects), f,
+                             cPickle.HIGHEST_PROTOCOL)
+                cPickle.dump(algs, f, cPickle.HIGHEST_PROTOCOL)
+        except Exception:
+            ProcessingLog.addToLog(ProcessingLog.LOG_WARNING,
+                                   'Could not cache %s algorithms: %s'
+                                   % (name, unicode(sys.exc_info()[1])))
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        return algs
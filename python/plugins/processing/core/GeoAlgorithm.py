@@ -90,6 +90,12 @@ class GeoAlgorithm:
         # when running as part of a model
         self.model = None
 
+        # Names of outputs that are only used by other algorithms from
+        # the same provider, run in the same session. The provider can
+        # skip writing them to their files (see
+        # AlgorithmProvider.startSession())
+        self.sessionOutputs = set()
+
         self.defineCharacteristics()
 
     def getCopy(self):
@@ -184,6 +190,23 @@ class GeoAlgorithm:
         """
         return None
 
+    def isThreadSafe(self):
+        """Returns True if this algorithm can be run outside of the main
+        thread, concurrently with other algorithms.
+
+        By default, algorithms are thread safe if their provider is.
+        """
+        return self.provider is not None and self.provider.isThreadSafe()
+
+    def isCacheable(self):
+        """Returns True if running this algorithm again with the same
+        parameters and inputs produces the same result, so the result
+        of a previous run can be reused instead.
+
+        Algorithms with random results should return False.
+        """
+        return True
+
     def checkParameterValuesBeforeExecuting(self):
         """If there is any check to do before launching the execution
         of the algorithm, it should be done here.
@@ -209,12 +232,16 @@ class GeoAlgorithm:
         wrong.
         """
         self.model = model
+        dataobjects.startExecution()
         try:
             self.setOutputCRS()
             self.resolveTemporaryOutputs()
             self.checkOutputFileExtensions()
             self.runPreExecutionScript(progress)
             self.processAlgorithm(progress)
+            for out in self.outputs:
+                if isinstance(out, OutputVector):
+                    out.closeWriter()
             progress.setPercentage(100)
             self.convertUnsupportedFormats(progress)
             self.runPostExecutionScript(progress)
@@ -235,6 +262,8 @@ class GeoAlgorithm:
             ProcessingLog.addToLog(ProcessingLog.LOG_ERROR, lines)
             raise GeoAlgorithmExecutionException(str(e)
                     + '\nSee log for more details')
+        finally:
+            dataobjects.endExecution()
 
     def runPostExecutionScript(self, progress):
         scriptFile = ProcessingConfig.getSetting(
@@ -278,9 +307,8 @@ class GeoAlgorithm:
                     provider = layer.dataProvider()
                     writer = out.getVectorWriter(provider.fields(),
                             provider.geometryType(), layer.crs())
-                    features = vector.features(layer)
-                    for feature in features:
-                        writer.addFeature(feature)
+                    writer.addFeatures(vector.features(layer))
+                    writer.close()
             elif isinstance(out, OutputRaster):
                 if out.compatible is not None:
                     layer = dataobjects.getObjectFromUri(out.compatible)
@@ -295,10 +323,8 @@ class GeoAlgorithm:
                 if out.compatible is not None:
                     layer = dataobjects.getObjectFromUri(out.compatible)
                     provider = layer.dataProvider()
-                    writer = out.getTableWriter(provider.fields())
-                    features = vector.features(layer)
-                    for feature in features:
-                        writer.addRecord(feature)
+                    with out.getTableWriter(provider.fields()) as writer:
+                        writer.addRecords(vector.features(layer))
             progress.setPercentage(100 * i / float(len(self.outputs)))
 
     def getFormatShortNameFromFilename(self, filename):
@@ -333,13 +359,10 @@ class GeoAlgorithm:
                     exts = ['html', 'htm']
                 else:
                     continue
-                idx = out.value.rfind('.')
-                if idx == -1:
+                # Some extensions, such as csv.gz, have several parts
+                if not [ext for ext in exts
+                        if out.value.endswith('.' + ext)]:
                     out.value = out.value + '.' + exts[0]
-                else:
-                    ext = out.value[idx + 1:]
-                    if ext not in exts:
-                        out.value = out.value + '.' + exts[0]
 
     def resolveTemporaryOutputs(self):
         """Sets temporary outputs (output.value = None) with a
@@ -349,18 +372,29 @@ class GeoAlgorithm:
             if not out.hidden and out.value is None:
                 setTempOutput(out, self)
 
+    def loadInputLayers(self):
+        """Loads the input layers of the algorithm, so they are
+        created in the calling thread and already available when the
+        algorithm is executed.
+
+        This should be called from the main thread before running the
+        algorithm in a worker thread, since layers should not be
+        created outside of it.
+        """
+        for param in self.parameters:
+            if isinstance(param, (ParameterRaster, ParameterVector,
+                          ParameterMultipleInput)):
+                if param.value:
+                    for inputlayer in param.value.split(';'):
+                        dataobjects.getObjectFromUri(inputlayer)
+
     def setOutputCRS(self):
-        layers = dataobjects.getAllLayers()
         for param in self.parameters:
             if isinstance(param, (ParameterRaster, ParameterVector,
                           ParameterMultipleInput)):
                 if param.value:
                     inputlayers = param.value.split(';')
                     for inputlayer in inputlayers:
-                        for layer in layers:
-                            if layer.source() == inputlayer:
-                                self.crs = layer.crs()
-                                return
                         p = dataobjects.getObjectFromUri(inputlayer)
                         if p is not None:
                             self.crs = p.crs()
@@ -378,20 +412,20 @@ class GeoAlgorithm:
         returns True. False otherwise.
         """
         crs = None
-        layers = dataobjects.getAllLayers()
         for param in self.parameters:
             if isinstance(param, (ParameterRaster, ParameterVector,
                           ParameterMultipleInput)):
                 if param.value:
                     inputlayers = param.value.split(';')
                     for inputlayer in inputlayers:
-                        for layer in layers:
-                            if layer.source() == inputlayer:
-                                if crs is None:
-                                    crs = layer.crs()
-                                else:
-                                    if crs != layer.crs():
-                                        return False
+                        layer = dataobjects.getObjectFromUri(inputlayer,
+                                                             False)
+                        if layer is not None:
+                            if crs is None:
+                                crs = layer.crs()
+                            else:
+                                if crs != layer.crs():
+                                    return False
         return True
 
     def addOutput(self, output):
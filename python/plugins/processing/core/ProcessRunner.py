@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ProcessRunner.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import re
+import sys
+import time
+import Queue
+import signal
+import threading
+import subprocess
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.SilentProgress import SilentProgress
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+from processing.tools.system import isWindows
+
+
+def defaultParser(line):
+    return (None, line)
+
+
+def gdalParser(line):
+    """Parses the '0...10...20...' progress output of GDAL utilities.
+
+    GDAL does not end the line until the process is done, so this
+    should be used with '...' as separator (see ProcessRunner.run()).
+    """
+    if re.match(r'^(\d+\.\.\.)+(\d+)?( - done\.?)?\s*$', line):
+        return (int(re.findall(r'\d+', line)[-1]), line)
+    return (None, line)
+
+
+def sagaParser(line):
+    if '%' in line:
+        s = ''.join([x for x in line if x.isdigit()])
+        try:
+            return (int(s), None)
+        except ValueError:
+            return (None, None)
+    line = line.strip()
+    if line in ('/', '-', '\\', '|'):
+        return (None, None)
+    return (None, line)
+
+
+def grassParser(line):
+    if 'GRASS_INFO_PERCENT' in line:
+        try:
+            return (int(line[len('GRASS_INFO_PERCENT') + 2:]), None)
+        except ValueError:
+            return (None, None)
+    return (None, line)
+
+
+def otbParser(line):
+    if '[*' in line:
+        idx = line.find('[*')
+        try:
+            return (int(line[idx - 4:idx - 2].strip(' ')), None)
+        except ValueError:
+            return (None, None)
+    return (None, line)
+
+
+class ProcessRunner:
+    """Runs the external applications called by algorithm providers.
+
+    Commands are run in a separate process, whose output is read in a
+    separate thread, so the execution can be canceled through the
+    progress object, or stopped when it takes longer than the
+    EXTERNAL_PROCESS_TIMEOUT setting, at any moment. No more than
+    MAX_THREADS processes are run at the same time, from all providers.
+
+    For every run, the command, its return code, and the wall time, CPU
+    time and peak memory used by the process are recorded, and can be
+    retrieved with getStats(). CPU time and memory are only available
+    on Linux and Mac.
+    """
+
+    # Max. number of runs kept in the stats
+    MAX_STATS = 100
+
+    # How often, in seconds, to check if the execution has been
+    # canceled when the process does not write anything
+    POLL_INTERVAL = 0.1
+
+    stats = []
+    running = 0
+    condition = threading.Condition()
+
+    @staticmethod
+    def run(command, progress, parser=defaultParser,
+            universal_newlines=True, timeout=None, separator=None):
+        """Runs a command and returns the lines of its console output.
+
+        Every line written by the process to its standard or error
+        output is passed to parser(line), which returns a tuple with
+        the percentage of the process already done, or None if the line
+        does not report it, and the line to add to the console output,
+        or None if it should be discarded.
+
+        Some applications report their progress without ending the
+        line, as GDAL utilities do. For them, a separator can be given,
+        and the text read up to every occurrence of it is passed to the
+        parser as soon as it is read, just to update the progress. The
+        whole line is still passed to it once it is finished.
+
+        If the execution is canceled or times out, the process and its
+        children are killed and a GeoAlgorithmExecutionException is
+        raised. The timeout is given in seconds, and taken from the
+        EXTERNAL_PROCESS_TIMEOUT setting if it is None.
+        """
+
+        if progress is None:
+            progress = SilentProgress()
+        if timeout is None:
+            timeout = ProcessingConfig.getSetting(
+                    ProcessingConfig.EXTERNAL_PROCESS_TIMEOUT)
+        try:
+            timeout = float(timeout)
+        except (TypeError, ValueError):
+            timeout = 0
+
+        ProcessRunner.acquire(progress)
+        try:
+            return ProcessRunner.execute(command, progress, parser,
+                    universal_newlines, timeout, separator)
+        finally:
+            ProcessRunner.release()
+
+    @staticmethod
+    def execute(command, progress, parser, universal_newlines, timeout,
+                separator):
+        loglines = []
+        t0 = time.time()
+        kwargs = {}
+        if not isWindows():
+            # Run in a new process group, so the shell and all the
+            # processes it starts can be killed at once
+            kwargs['preexec_fn'] = os.setsid
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=universal_newlines,
+            **kwargs
+            )
+        proc.stdin.close()
+
+        lines = Queue.Queue()
+        reader = threading.Thread(target=ProcessRunner.readLines,
+                args=(proc.stdout, lines, universal_newlines, separator))
+        reader.daemon = True
+        reader.start()
+
+        error = None
+        pending = ''
+        while True:
+            try:
+                item = lines.get(True, ProcessRunner.POLL_INTERVAL)
+            except Queue.Empty:
+                item = ('', False)
+            if item is None:
+                break
+            if ProcessRunner.isCanceled(progress):
+                error = 'Execution canceled by the user'
+            elif timeout > 0 and time.time() - t0 > timeout:
+                error = 'Execution of external application timed out ' \
+                        'after %g seconds' % timeout
+            if error is not None:
+                ProcessRunner.kill(proc)
+                break
+            (line, complete) = item
+            if line == '':
+                continue
+            if complete:
+                line = pending + line
+                pending = ''
+                (percentage, line) = parser(line)
+            else:
+                # Part of a line, only used to update the progress
+                pending += line
+                (percentage, line) = (parser(line)[0], None)
+            try:
+                if percentage is not None:
+                    progress.setPercentage(percentage)
+                if line is not None:
+                    loglines.append(line)
+                    progress.setConsoleInfo(line)
+            except GeoAlgorithmExecutionException, e:
+                # Raised by progress objects when the execution is
+                # canceled
+                error = e.msg
+                ProcessRunner.kill(proc)
+                break
+
+        (returncode, cpu, maxrss) = ProcessRunner.wait(proc)
+        ProcessRunner.addStats({
+            'command': command,
+            'returncode': returncode,
+            'wall': time.time() - t0,
+            'cpu': cpu,
+            'maxrss': maxrss,
+            'canceled': error is not None,
+            })
+        if error is not None:
+            raise GeoAlgorithmExecutionException(error)
+        return loglines
+
+    @staticmethod
+    def readLines(stream, lines, universal_newlines=True, separator=None):
+        """Reads the output of a process, putting in the queue a tuple
+        with the text and True for every line, or the text and False
+        for every part of a line ending with the separator. None is put
+        once the output is closed.
+
+        The output is read as it becomes available, instead of line by
+        line, so parts of lines are not delayed until the line ends.
+        """
+        fd = stream.fileno()
+        text = ''
+        while True:
+            data = os.read(fd, 4096)
+            if data:
+                text += data
+            if universal_newlines:
+                # A line ending with '\r' might be followed by '\n'
+                # in the next read
+                keep = data and text.endswith('\r')
+                if keep:
+                    text = text[:-1]
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            else:
+                keep = False
+            while True:
+                end = text.find('\n')
+                if separator is not None:
+                    sep = text.find(separator)
+                    if sep != -1 and (end == -1 or sep < end):
+                        sep += len(separator)
+                        lines.put((text[:sep], False))
+                        text = text[sep:]
+                        continue
+                if end == -1:
+                    break
+                lines.put((text[:end + 1], True))
+                text = text[end + 1:]
+            if keep:
+                text += '\r'
+            if not data:
+                break
+        if text:
+            lines.put((text, True))
+        stream.close()
+        lines.put(None)
+
+    @staticmethod
+    def isCanceled(progress):
+        return hasattr(progress, 'isCanceled') and progress.isCanceled()
+
+    @staticmethod
+    def kill(proc):
+        try:
+            if isWindows():
+                subprocess.call('taskkill /F /T /PID %i' % proc.pid,
+                                shell=True)
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    @staticmethod
+    def wait(proc):
+        """Waits for the process to finish and returns a tuple with its
+        return code, the CPU time it used in seconds, and its peak
+        memory usage in kilobytes.
+        """
+        if not hasattr(os, 'wait4'):
+            return (proc.wait(), None, None)
+        try:
+            (pid, status, rusage) = os.wait4(proc.pid, 0)
+        except OSError:
+            return (proc.wait(), None, None)
+        if os.WIFSIGNALED(status):
+            proc.returncode = -os.WTERMSIG(status)
+        else:
+            proc.returncode = os.WEXITSTATUS(status)
+        maxrss = rusage.ru_maxrss
+        if sys.platform == 'darwin':
+            maxrss /= 1024
+        return (proc.returncode, rusage.ru_utime + rusage.ru_stime, maxrss)
+
+    @staticmethod
+    def acquire(progress):
+        """Waits until there are less than MAX_THREADS processes
+        running.
+        """
+        with ProcessRunner.condition:
+            while True:
+                try:
+                    maxProcesses = max(1, int(ProcessingConfig.getSetting(
+                            ProcessingConfig.MAX_THREADS)))
+                except (TypeError, ValueError):
+                    maxProcesses = 1
+                if ProcessRunner.running < maxProcesses:
+                    break
+                if ProcessRunner.isCanceled(progress):
+                    raise GeoAlgorithmExecutionException(
+                            'Execution canceled by the user')
+                ProcessRunner.condition.wait(ProcessRunner.POLL_INTERVAL)
+            ProcessRunner.running += 1
+
+    @staticmethod
+    def release():
+        with ProcessRunner.condition:
+            ProcessRunner.running -= 1
+            ProcessRunner.condition.notify()
+
+    @staticmethod
+    def addStats(stats):
+        with ProcessRunner.condition:
+            ProcessRunner.stats.append(stats)
+            del ProcessRunner.stats[:-ProcessRunner.MAX_STATS]
+
+    @staticmethod
+    def getStats():
+        """Returns a list of dicts with the stats of the last runs, from
+        the oldest to the newest one. Each of them has the following
+        keys: 'command', 'returncode', 'wall' and 'cpu' (in seconds),
+        'maxrss' (in kilobytes) and 'canceled'.
+        """
+        with ProcessRunner.condition:
+            return [dict(s) for s in ProcessRunner.stats]
@@ -27,6 +27,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import sys
+import time
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from qgis.core import *
@@ -40,8 +41,7 @@ from processing.gui.AlgorithmClassification import AlgorithmDecorator
 from processing.gui.MessageBarProgress import MessageBarProgress
 from processing.gui.RenderingStyles import RenderingStyles
 from processing.gui.Postprocessing import handleAlgorithmResults
-from processing.gui.UnthreadedAlgorithmExecutor import \
-        UnthreadedAlgorithmExecutor
+from processing.gui.AlgorithmExecutor import AlgorithmExecutor
 from processing.modeler.ModelerAlgorithmProvider import \
         ModelerAlgorithmProvider
 from processing.modeler.ModelerOnlyAlgorithmProvider import \
@@ -60,14 +60,66 @@ from processing.algs.taudem.TauDEMAlgorithmProvider import TauDEMAlgorithmProvid
 from processing.tools import dataobjects
 
 
+class ProviderAlgorithms(dict):
+    """A dict with the algorithms of each provider, as dicts with
+    command line names as keys, and provider names as keys.
+
+    The algorithms of a provider are loaded when they are first
+    accessed, so providers that are not used, such as those whose
+    algorithms are never run from scripts or the console, do not slow
+    down the start of QGIS.
+    """
+
+    def __init__(self, providers):
+        dict.__init__(self)
+        self.pending = {}
+        for provider in providers:
+            self.pending[provider.getName()] = provider
+            dict.__setitem__(self, provider.getName(), {})
+
+    def load(self, name):
+        provider = self.pending.pop(name, None)
+        if provider is not None:
+            t0 = time.time()
+            provider.loadAlgorithms()
+            Processing.setProviderTiming(provider, 'loadAlgorithms',
+                                         time.time() - t0)
+            algs = {}
+            for alg in provider.algs:
+                algs[alg.commandLineName()] = alg
+            dict.__setitem__(self, name, algs)
+
+    def __getitem__(self, name):
+        self.load(name)
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def values(self):
+        return [self[name] for name in self.keys()]
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def iteritems(self):
+        return iter(self.items())
+
+
 class Processing:
 
     listeners = []
     providers = []
 
     # A dictionary of algorithms. Keys are names of providers
-    # and values are list with all algorithms from that provider
-    algs = {}
+    # and values are dicts with all algorithms from that provider,
+    # loaded when first accessed (see ProviderAlgorithms)
+    algs = ProviderAlgorithms([])
 
     # Same structure as algs
     actions = {}
@@ -77,20 +129,36 @@ class Processing:
 
     modeler = ModelerAlgorithmProvider()
 
+    # Nesting level of the batch updates started with beginBatchUpdate()
+    # and whether settings and the list of algorithms have to be updated
+    # when the outermost one ends
+    batchUpdateLevel = 0
+    settingsChanged = False
+    algsListChanged = False
+
+    # Time spent by each provider in initializeSettings() and
+    # loadAlgorithms(). See getProviderTimings()
+    providerTimings = {}
+
     @staticmethod
     def addProvider(provider, updateList=False):
         """Use this method to add algorithms from external providers.
+
+        When adding several providers at once, call beginBatchUpdate()
+        before and endBatchUpdate() after adding them, so settings are
+        read and the list of algorithms is updated just once.
         """
 
-        # Note: this might slow down the initialization process if
-        # there are many new providers added. Should think of a
-        # different solution
         try:
+            t0 = time.time()
             provider.initializeSettings()
+            Processing.setProviderTiming(provider, 'initializeSettings',
+                                         time.time() - t0)
             Processing.providers.append(provider)
-            ProcessingConfig.readSettings()
-            if updateList:
-                Processing.updateAlgsList()
+            Processing.settingsChanged = True
+            Processing.algsListChanged = Processing.algsListChanged \
+                    or updateList
+            Processing.flushBatchUpdate()
         except:
             ProcessingLog.addToLog(ProcessingLog.LOG_ERROR,
                                    'Could not load provider:'
@@ -108,8 +176,10 @@ class Processing:
         try:
             provider.unload()
             Processing.providers.remove(provider)
-            ProcessingConfig.readSettings()
-            Processing.updateAlgsList()
+            Processing.providerTimings.pop(provider.getName(), None)
+            Processing.settingsChanged = True
+            Processing.algsListChanged = True
+            Processing.flushBatchUpdate()
         except:
             # This try catch block is here to avoid problems if the
             # plugin with a provider is unloaded after the Processing
@@ -117,6 +187,54 @@ class Processing:
             # before I found out how to properly avoid that.
             pass
 
+    @staticmethod
+    def beginBatchUpdate():
+        """Starts a batch of changes in the registered providers.
+
+        Until the matching call to endBatchUpdate(), adding or removing
+        providers does not read settings or update the list of
+        algorithms. Batches can be nested.
+        """
+        Processing.batchUpdateLevel += 1
+
+    @staticmethod
+    def endBatchUpdate():
+        """Ends a batch of changes started with beginBatchUpdate().
+
+        When the outermost batch ends, settings are read and the list
+        of algorithms is updated, if any of the changes in the batch
+        required it, and listeners are notified once.
+        """
+        Processing.batchUpdateLevel = max(0, Processing.batchUpdateLevel - 1)
+        Processing.flushBatchUpdate()
+
+    @staticmethod
+    def flushBatchUpdate():
+        if Processing.batchUpdateLevel > 0:
+            return
+        if Processing.settingsChanged:
+            Processing.settingsChanged = False
+            ProcessingConfig.readSettings()
+        if Processing.algsListChanged:
+            Processing.algsListChanged = False
+            Processing.updateAlgsList()
+
+    @staticmethod
+    def setProviderTiming(provider, step, seconds):
+        timings = Processing.providerTimings.setdefault(provider.getName(),
+                                                         {})
+        timings[step] = seconds
+
+    @staticmethod
+    def getProviderTimings():
+        """Returns a dict with provider names as keys and, as values,
+        dicts with the time in seconds spent by the last calls to the
+        'initializeSettings' and 'loadAlgorithms' methods of the
+        provider.
+        """
+        return dict((name, dict(timings)) for (name, timings)
+                    in Processing.providerTimings.items())
+
     @staticmethod
     def getProviderFromName(name):
         """Returns the provider with the given name."""
@@ -128,6 +246,20 @@ class Processing:
 
     @staticmethod
     def initialize():
+        # Settings are read just once, when the batch ends
+        Processing.beginBatchUpdate()
+        try:
+            Processing.addProviders()
+            AlgorithmDecorator.loadClassification()
+            ProcessingLog.startLogging()
+            ProcessingConfig.initialize()
+        finally:
+            Processing.endBatchUpdate()
+        RenderingStyles.loadStyles()
+        Processing.loadFromProviders()
+
+    @staticmethod
+    def addProviders():
         # Add the basic providers
         Processing.addProvider(QGISAlgorithmProvider())
         Processing.addProvider(ModelerOnlyAlgorithmProvider())
@@ -143,20 +275,17 @@ class Processing:
         Processing.addProvider(ModelerAlgorithmProvider())
         Processing.modeler.initializeSettings()
 
-        # And initialize
-        AlgorithmDecorator.loadClassification()
-        ProcessingLog.startLogging()
-        ProcessingConfig.initialize()
-        ProcessingConfig.readSettings()
-        RenderingStyles.loadStyles()
-        Processing.loadFromProviders()
-
     @staticmethod
     def updateAlgsList():
         """Call this method when there has been any change that
         requires the list of algorithms to be created again from
         algorithm providers.
+
+        Inside a batch update, it is delayed until the batch ends.
         """
+        if Processing.batchUpdateLevel > 0:
+            Processing.algsListChanged = True
+            return
         Processing.loadFromProviders()
         Processing.fireAlgsListHasChanged()
 
@@ -168,8 +297,11 @@ class Processing:
 
     @staticmethod
     def updateProviders():
-        for provider in Processing.providers:
-            provider.loadAlgorithms()
+        """Loads the algorithms of all providers that have not been
+        loaded yet.
+        """
+        for name in Processing.algs.keys():
+            Processing.algs.load(name)
 
     @staticmethod
     def addAlgListListener(listener):
@@ -188,14 +320,7 @@ class Processing:
 
     @staticmethod
     def loadAlgorithms():
-        Processing.algs = {}
-        Processing.updateProviders()
-        for provider in Processing.providers:
-            providerAlgs = provider.algs
-            algs = {}
-            for alg in providerAlgs:
-                algs[alg.commandLineName()] = alg
-            Processing.algs[provider.getName()] = algs
+        Processing.algs = ProviderAlgorithms(Processing.providers)
 
         provs = {}
         for provider in Processing.providers:
@@ -224,7 +349,13 @@ class Processing:
 
     @staticmethod
     def getAlgorithm(name):
-        for provider in Processing.algs.values():
+        # The provider named in the prefix of the command line name is
+        # checked first, so the algorithms of the rest are not loaded
+        prefix = name.split(':')[0].lower()
+        providerNames = sorted(Processing.algs.keys(),
+                               key=lambda n: n.lower() != prefix)
+        for providerName in providerNames:
+            provider = Processing.algs[providerName]
             if name in provider:
                 return provider[name]
         return None
@@ -326,7 +457,7 @@ class Processing:
         progress = SilentProgress()
         if iface is not None :
             progress = MessageBarProgress()
-        ret = UnthreadedAlgorithmExecutor.runalg(alg, progress)
+        ret = AlgorithmExecutor.runalg(alg, progress)
         if onFinish is not None and ret:
             onFinish(alg, progress)
         QApplication.restoreOverrideCursor()
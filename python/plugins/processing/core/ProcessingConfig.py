@@ -47,6 +47,12 @@ class ProcessingConfig:
     POST_EXECUTION_SCRIPT = 'POST_EXECUTION_SCRIPT'
     SHOW_CRS_DEF = 'SHOW_CRS_DEF'
     WARN_UNMATCHING_CRS = 'WARN_UNMATCHING_CRS'
+    MAX_CACHED_FEATURES = 'MAX_CACHED_FEATURES'
+    MAX_THREADS = 'MAX_THREADS'
+    MAX_EXPORT_CACHE_SIZE = 'MAX_EXPORT_CACHE_SIZE'
+    EXTERNAL_PROCESS_TIMEOUT = 'EXTERNAL_PROCESS_TIMEOUT'
+    MAX_INTERMEDIATE_SIZE = 'MAX_INTERMEDIATE_SIZE'
+    MAX_MODEL_CACHE_SIZE = 'MAX_MODEL_CACHE_SIZE'
 
     settings = {}
     settingIcons = {}
@@ -94,6 +100,30 @@ class ProcessingConfig:
         ProcessingConfig.addSetting(Setting('General',
                 ProcessingConfig.VECTOR_POLYGON_STYLE,
                 'Style for polygon layers', ''))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_CACHED_FEATURES,
+                'Max. features cached by spatial indexes (0 for no limit)',
+                100000))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_THREADS,
+                'Max. number of algorithms to run in parallel',
+                QtCore.QThread.idealThreadCount()))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_EXPORT_CACHE_SIZE,
+                'Max. size of layers exported for external applications '
+                'kept for reuse (MB)', 512))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.EXTERNAL_PROCESS_TIMEOUT,
+                'Max. time for external applications to run (seconds, '
+                '0 for no limit)', 0))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_INTERMEDIATE_SIZE,
+                'Max. size of intermediate results of models kept in '
+                'memory (MB, 0 to always write them to disk)', 64))
+        ProcessingConfig.addSetting(Setting('General',
+                ProcessingConfig.MAX_MODEL_CACHE_SIZE,
+                'Max. size of results of model algorithms kept for reuse '
+                '(MB, 0 to always run all algorithms)', 512))
         ProcessingConfig.addSetting(Setting('General',
                 ProcessingConfig.PRE_EXECUTION_SCRIPT,
                 'Pre-execution script', ''))
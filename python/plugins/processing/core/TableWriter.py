@@ -26,35 +26,72 @@ __copyright__ = '(C) 2012, Victor Olaya'
 __revision__ = '$Format:%H$'
 
 import csv
+import gzip
 import codecs
 import cStringIO
 
 
 class TableWriter:
+    """Writes records to a CSV file.
+
+    The file is kept open until close() is called, so records are
+    buffered instead of reopening the file for each of them. The writer
+    can also be used as a context manager, closing the file on exit.
+
+    If the file name ends with '.gz', the table is written as a
+    gzip-compressed CSV file, which is much smaller for large tables
+    such as distance matrices.
+    """
+
+    # Number of records encoded at once by addRecords()
+    BATCH_SIZE = 1000
 
     def __init__(self, fileName, encoding, fields):
         self.fileName = fileName
-        if not self.fileName.lower().endswith('csv'):
+        if not self.fileName.lower().endswith(('csv', 'csv.gz')):
             self.fileName += '.csv'
 
         self.encoding = encoding
         if self.encoding is None or encoding == 'System':
             self.encoding = 'utf-8'
 
-        with open(self.fileName, 'wb') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
-            if len(fields) != 0:
-                self.writer.writerow(fields)
+        if self.fileName.lower().endswith('.gz'):
+            self.csvFile = gzip.open(self.fileName, 'wb')
+        else:
+            self.csvFile = open(self.fileName, 'wb')
+        self.writer = UnicodeWriter(self.csvFile, encoding=self.encoding)
+        if len(fields) != 0:
+            self.writer.writerow(fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
 
     def addRecord(self, values):
-        with open(self.fileName, 'ab') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
-            self.writer.writerow(values)
+        self.writer.writerow(values)
 
     def addRecords(self, records):
-        with open(self.fileName, 'ab') as csvFile:
-            self.writer = UnicodeWriter(csvFile, encoding=self.encoding)
-            self.writer.writerows(records)
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == self.BATCH_SIZE:
+                self.writer.writerows(batch)
+                batch = []
+        if batch:
+            self.writer.writerows(batch)
+
+    def close(self):
+        """Flushes all pending records and closes the file. No more
+        records can be added after calling this method.
+        """
+        csvFile = getattr(self, 'csvFile', None)
+        if csvFile is not None and not csvFile.closed:
+            csvFile.close()
 
 
 class UnicodeWriter:
@@ -65,18 +102,26 @@ class UnicodeWriter:
         self.stream = f
         self.encoder = codecs.getincrementalencoder(encoding)()
 
-    def writerow(self, row):
+    def _writerow(self, row):
         row = map(unicode, row)
         try:
             self.writer.writerow([s.encode('utf-8') for s in row])
         except:
             self.writer.writerow(row)
+
+    def _flush(self):
         data = self.queue.getvalue()
         data = data.decode('utf-8')
         data = self.encoder.encode(data)
         self.stream.write(data)
         self.queue.truncate(0)
 
+    def writerow(self, row):
+        self._writerow(row)
+        self._flush()
+
     def writerows(self, rows):
+        # Encode and write all rows at once, instead of one by one
         for row in rows:
-            self.writerow(row)
+            self._writerow(row)
+        self._flush()
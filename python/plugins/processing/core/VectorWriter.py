@@ -25,11 +25,28 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import time
 from PyQt4.QtCore import *
 from qgis.core import *
+from processing.core.ProcessingLog import ProcessingLog
 
 
 class VectorWriter:
+    """Writes features to a vector file or to a memory layer.
+
+    Features added to memory layers are buffered and added in batches of
+    batchSize features, with a single call to the data provider for each
+    of them, since adding them one by one is much slower. Features added
+    to files are passed directly to QgsVectorFileWriter, which already
+    buffers them.
+
+    close() writes all pending features and closes the file. It is also
+    called when the writer is deleted, or used as a context manager,
+    and it adds the number of features written per second to the log.
+    """
+
+    # Default number of features added at once to memory layers
+    BATCH_SIZE = 1000
 
     MEMORY_LAYER_PREFIX = 'memory:'
 
@@ -42,12 +59,22 @@ class VectorWriter:
         QGis.WKBMultiPolygon: 'MultiPolygon',
         }
 
+    MEMORY_FIELD_TYPES = {
+        QVariant.Int: 'integer',
+        QVariant.LongLong: 'integer',
+        QVariant.Double: 'double',
+        }
+
     def __init__(self, fileName, encoding, fields, geometryType,
-                 crs, options=None):
+                 crs, options=None, batchSize=None):
         self.fileName = fileName
         self.isMemory = False
         self.memLayer = None
         self.writer = None
+        self.batchSize = max(1, batchSize or self.BATCH_SIZE)
+        self.pending = []
+        self.count = 0
+        self.writingTime = 0
 
         if encoding is None:
             settings = QSettings()
@@ -59,7 +86,7 @@ class VectorWriter:
             uri = self.TYPE_MAP[geometryType]
             if crs.isValid():
                 uri += '?crs=' + crs.authid() + '&'
-            fieldsdesc = ['field=' + str(f.name()) for f in fields]
+            fieldsdesc = ['field=' + self.fieldDescription(f) for f in fields]
 
             fieldsstring = '&'.join(fieldsdesc)
             uri += fieldsstring
@@ -86,8 +113,72 @@ class VectorWriter:
             self.writer = QgsVectorFileWriter(self.fileName, encoding,
                 qgsfields, geometryType, crs, OGRCodes[extension])
 
+    def fieldDescription(self, field):
+        """Returns the description of a field used in the uri of memory
+        layers, so its type is kept.
+        """
+        fieldType = self.MEMORY_FIELD_TYPES.get(field.type(), 'string')
+        desc = str(field.name()) + ':' + fieldType
+        if field.length() > 0:
+            desc += '(%i,%i)' % (field.length(), max(0, field.precision()))
+        return desc
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
     def addFeature(self, feature):
+        t0 = time.time()
         if self.isMemory:
-            self.writer.addFeatures([feature])
+            # Algorithms usually reuse the same feature object, so a
+            # copy has to be kept until it is written
+            self.pending.append(QgsFeature(feature))
+            if len(self.pending) >= self.batchSize:
+                self.flush()
         else:
             self.writer.addFeature(feature)
+        self.count += 1
+        self.writingTime += time.time() - t0
+
+    def addFeatures(self, features):
+        """Adds all the features in an iterable."""
+        for feature in features:
+            self.addFeature(feature)
+
+    def flush(self):
+        """Writes the features added to a memory layer that are still
+        pending.
+        """
+        if self.pending:
+            t0 = time.time()
+            self.writer.addFeatures(self.pending)
+            self.pending = []
+            self.writingTime += time.time() - t0
+
+    def close(self):
+        """Writes all pending features and closes the file. No more
+        features can be added after calling this method.
+        """
+        if getattr(self, 'writer', None) is None:
+            return
+        t0 = time.time()
+        self.flush()
+        if self.isMemory:
+            self.memLayer.updateExtents()
+        self.writer = None
+        self.writingTime += time.time() - t0
+        if self.count:
+            try:
+                ProcessingLog.addToLog(ProcessingLog.LOG_INFO,
+                        'Wrote %i features to %s in %0.3f s (%i features/s)'
+                        % (self.count, self.fileName, self.writingTime,
+                           self.count / max(self.writingTime, 1e-6)))
+            except:
+                # The log might not be available when the writer is
+                # deleted while closing the application
+                pass
@@ -38,8 +38,7 @@ from processing.core.ProcessingLog import ProcessingLog
 from processing.core.ProcessingConfig import ProcessingConfig
 from processing.core.WrongHelpFileException import WrongHelpFileException
 from processing.gui.Postprocessing import handleAlgorithmResults
-from processing.gui.UnthreadedAlgorithmExecutor import \
-        UnthreadedAlgorithmExecutor
+from processing.gui.AlgorithmExecutor import AlgorithmExecutor
 from processing.parameters.ParameterRaster import ParameterRaster
 from processing.parameters.ParameterVector import ParameterVector
 from processing.parameters.ParameterBoolean import ParameterBoolean
@@ -82,6 +81,13 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
         self.buttonBox.addButton(self.runButton,
                                  QtGui.QDialogButtonBox.ActionRole)
         self.runButton.clicked.connect(self.accept)
+        self.cancelButton = QtGui.QPushButton()
+        self.cancelButton.setText('Cancel')
+        self.cancelButton.setEnabled(False)
+        self.buttonBox.addButton(self.cancelButton,
+                                 QtGui.QDialogButtonBox.ActionRole)
+        self.cancelButton.clicked.connect(self.cancel)
+        self.canceled = False
         self.setWindowTitle(self.alg.name)
         self.progressLabel = QtGui.QLabel()
         self.progress = QtGui.QProgressBar()
@@ -225,7 +231,9 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
             if msg:
                 QMessageBox.warning(self, 'Unable to execute algorithm', msg)
                 return
+            self.canceled = False
             self.runButton.setEnabled(False)
+            self.cancelButton.setEnabled(True)
             self.buttonBox.button(
                     QtGui.QDialogButtonBox.Close).setEnabled(False)
             buttons = self.paramTable.iterateButtons
@@ -249,7 +257,7 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
             except:
                 pass
             if self.iterateParam:
-                if UnthreadedAlgorithmExecutor.runalgIterating(self.alg,
+                if AlgorithmExecutor.runalgIterating(self.alg,
                         self.iterateParam, self):
                     self.finish()
                 else:
@@ -260,7 +268,7 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
                 if command:
                     ProcessingLog.addToLog(ProcessingLog.LOG_ALGORITHM,
                             command)
-                if UnthreadedAlgorithmExecutor.runalg(self.alg, self):
+                if AlgorithmExecutor.runalg(self.alg, self, True):
                     self.finish()
                 else:
                     QApplication.restoreOverrideCursor()
@@ -307,8 +315,16 @@ class AlgorithmExecutionDialog(QtGui.QDialog):
         self.progress.setMaximum(100)
         self.progress.setValue(0)
         self.runButton.setEnabled(True)
+        self.cancelButton.setEnabled(False)
         self.buttonBox.button(QtGui.QDialogButtonBox.Close).setEnabled(True)
 
+    def cancel(self):
+        self.canceled = True
+        self.cancelButton.setEnabled(False)
+
+    def isCanceled(self):
+        return self.canceled
+
     def setInfo(self, msg, error=False):
         if error:
             self.logText.append('<span style="color:red">' + msg + '</span>')
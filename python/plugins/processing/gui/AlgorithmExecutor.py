@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    AlgorithmExecutor.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import itertools
+from PyQt4.QtCore import *
+from qgis.core import *
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.SilentProgress import SilentProgress
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+from processing.gui.Postprocessing import handleAlgorithmResults
+from processing.gui.UnthreadedAlgorithmExecutor import \
+        UnthreadedAlgorithmExecutor
+from processing.tools import dataobjects
+from processing.tools.system import *
+from processing.tools import vector
+
+
+def isCanceled(progress):
+    """Returns True if the user has asked to cancel the execution that
+    is reported to the passed progress object.
+
+    Progress objects that support cancellation implement an
+    isCanceled() method.
+    """
+    return hasattr(progress, 'isCanceled') and progress.isCanceled()
+
+
+class CancelableProgress(QObject):
+    """Forwards calls to a progress object, raising a
+    GeoAlgorithmExecutionException when the execution has been canceled,
+    so algorithms stop the next time they report their progress.
+
+    If threaded is True, the algorithm runs in a worker thread. Calls
+    are then forwarded through a signal, so they are handled in the
+    thread of the progress object, which is usually the main one.
+    """
+
+    called = pyqtSignal(str, object)
+
+    def __init__(self, progress, threaded=False):
+        QObject.__init__(self)
+        self.progress = progress
+        self.threaded = threaded
+        self.called.connect(self.call)
+
+    def call(self, method, value):
+        getattr(self.progress, unicode(method))(value)
+
+    def forward(self, method, value):
+        if self.threaded:
+            self.called.emit(method, value)
+        else:
+            self.call(method, value)
+
+    def checkCanceled(self):
+        if isCanceled(self.progress):
+            raise GeoAlgorithmExecutionException(
+                    'Execution canceled by the user')
+
+    def isCanceled(self):
+        return isCanceled(self.progress)
+
+    def error(self, msg):
+        self.forward('error', msg)
+
+    def setText(self, text):
+        self.checkCanceled()
+        self.forward('setText', text)
+
+    def setPercentage(self, i):
+        self.checkCanceled()
+        self.forward('setPercentage', i)
+
+    def setInfo(self, msg):
+        self.checkCanceled()
+        self.forward('setInfo', msg)
+
+    def setCommand(self, cmd):
+        self.checkCanceled()
+        self.forward('setCommand', cmd)
+
+    def setDebugInfo(self, msg):
+        self.checkCanceled()
+        self.forward('setDebugInfo', msg)
+
+    def setConsoleInfo(self, msg):
+        self.checkCanceled()
+        self.forward('setConsoleInfo', msg)
+
+    def close(self):
+        pass
+
+
+class AlgorithmProgress(CancelableProgress):
+    """Progress object for one of several algorithms executed at the
+    same time.
+
+    Texts and percentages are not forwarded, since they would be mixed
+    with those of the other algorithms. Errors are kept instead of being
+    forwarded, so they can be reported along with the algorithm that
+    caused them.
+    """
+
+    def __init__(self, progress, threaded=False):
+        CancelableProgress.__init__(self, progress, threaded)
+        self.errorMessage = None
+
+    def error(self, msg):
+        self.errorMessage = msg
+
+    def setText(self, text):
+        self.checkCanceled()
+
+    def setPercentage(self, i):
+        self.checkCanceled()
+
+
+class AlgorithmThread(QThread):
+
+    def __init__(self, alg, progress):
+        QThread.__init__(self)
+        self.alg = alg
+        self.progress = progress
+        self.result = False
+        alg.loadInputLayers()
+
+    def run(self):
+        self.result = UnthreadedAlgorithmExecutor.runalg(self.alg,
+                                                         self.progress)
+
+
+class AlgorithmExecutor:
+
+    # True while events are processed in a local event loop waiting for
+    # worker threads, so no other local loop is started from it
+    loopRunning = False
+
+    @staticmethod
+    def runalg(alg, progress, threaded=False):
+        """Executes a given algorithm, showing its progress in the
+        progress object passed along.
+
+        If threaded is True, thread safe algorithms are executed in a
+        worker thread, while the main thread keeps processing events,
+        so the application does not freeze. This should only be used
+        from dialogs that block the rest of the interface meanwhile,
+        since any other action, such as running another algorithm,
+        would be handled while waiting for the worker thread. The rest
+        of algorithms, and those started while waiting, are executed in
+        the calling thread. In both cases, the execution can be
+        canceled through the progress object, if it has an isCanceled()
+        method.
+
+        Return true if everything went OK, false if the algorithm
+        could not be completed.
+        """
+
+        app = QCoreApplication.instance()
+        if not threaded or not alg.isThreadSafe() or app is None \
+                or QThread.currentThread() != app.thread() \
+                or AlgorithmExecutor.loopRunning:
+            return UnthreadedAlgorithmExecutor.runalg(alg,
+                    CancelableProgress(progress))
+
+        thread = AlgorithmThread(alg, CancelableProgress(progress, True))
+        loop = QEventLoop()
+        thread.finished.connect(loop.quit)
+        thread.start()
+        AlgorithmExecutor.loopRunning = True
+        try:
+            loop.exec_()
+        finally:
+            AlgorithmExecutor.loopRunning = False
+        thread.wait()
+        # Deliver the progress calls that are still queued
+        QCoreApplication.processEvents()
+        return thread.result
+
+    @staticmethod
+    def runalgs(algs, progress, onFinished, maxThreads=None):
+        """Executes a list of independent algorithms, running up to
+        maxThreads of them at the same time (by default, as many as set
+        in the MAX_THREADS setting).
+
+        Thread safe algorithms are run in worker threads, and the rest
+        of them in the calling thread, one by one. As in runalg(),
+        worker threads are not used if this is called while waiting for
+        other ones, and this should only be called from dialogs that
+        block the rest of the interface. An algorithm that fails does
+        not stop the rest of them. Each time an algorithm
+        finishes, onFinished(i, msg) is called from the calling thread,
+        where i is the index of the algorithm and msg is None if it was
+        correctly executed, or an error message otherwise.
+
+        If the execution is canceled through the progress object, no
+        more algorithms are started, and those already running stop the
+        next time they report their progress.
+        """
+
+        if maxThreads is None:
+            maxThreads = ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_THREADS)
+        try:
+            maxThreads = max(1, int(maxThreads))
+        except (TypeError, ValueError):
+            maxThreads = 1
+        app = QCoreApplication.instance()
+        threaded = maxThreads > 1 and app is not None \
+            and QThread.currentThread() == app.thread() \
+            and not AlgorithmExecutor.loopRunning
+
+        # Algorithms from the same provider might share data, as
+        # in a batch process run on the same input layers
+        providers = set([alg.provider for alg in algs])
+        providers.discard(None)
+        for provider in providers:
+            provider.startSession()
+        dataobjects.startExecution()
+        try:
+            pending = range(len(algs))
+            running = {}
+            loop = QEventLoop()
+            while pending or running:
+                for (i, thread) in running.items():
+                    if thread.isFinished():
+                        thread.wait()
+                        del running[i]
+                        # Deliver the progress calls that are still queued
+                        QCoreApplication.processEvents()
+                        onFinished(i, thread.progress.errorMessage)
+
+                if isCanceled(progress):
+                    pending = []
+                unthreaded = []
+                for i in list(pending):
+                    if not threaded or not algs[i].isThreadSafe():
+                        unthreaded.append(i)
+                    elif len(running) < maxThreads:
+                        pending.remove(i)
+                        thread = AlgorithmThread(algs[i],
+                                AlgorithmProgress(progress, True))
+                        thread.finished.connect(loop.quit)
+                        running[i] = thread
+                        thread.start()
+
+                if unthreaded:
+                    i = unthreaded[0]
+                    pending.remove(i)
+                    algProgress = AlgorithmProgress(progress)
+                    UnthreadedAlgorithmExecutor.runalg(algs[i], algProgress)
+                    onFinished(i, algProgress.errorMessage)
+                elif running and not [t for t in running.values()
+                                      if t.isFinished()]:
+                    AlgorithmExecutor.loopRunning = True
+                    try:
+                        loop.exec_()
+                    finally:
+                        AlgorithmExecutor.loopRunning = False
+        finally:
+            dataobjects.endExecution()
+            for provider in providers:
+                provider.endSession()
+
+    @staticmethod
+    def runalgIterating(alg, paramToIter, progress):
+        """Executes an algorithm once for each feature of the layer in
+        the passed parameter, adding the index of the feature to the
+        names of the outputs.
+
+        Single-feature layers are written right before the iterations
+        that use them, and deleted once they are done. For thread safe
+        algorithms, as many iterations as set in the MAX_THREADS
+        setting are run at the same time.
+        """
+        settings = QSettings()
+        systemEncoding = settings.value('/UI/encoding', 'System')
+        layerfile = alg.getParameterValue(paramToIter)
+        layer = dataobjects.getObjectFromUri(layerfile, False)
+        provider = layer.dataProvider()
+        features = vector.features(layer)
+        total = len(features)
+
+        # store output values to use them later as basenames for all outputs
+        outputs = {}
+        for out in alg.outputs:
+            outputs[out.name] = out.value
+
+        chunkSize = 1
+        if alg.isThreadSafe():
+            try:
+                chunkSize = max(1, int(ProcessingConfig.getSetting(
+                        ProcessingConfig.MAX_THREADS)))
+            except (TypeError, ValueError):
+                pass
+
+        i = 0
+        featuresIter = iter(features)
+        while True:
+            chunk = list(itertools.islice(featuresIter, chunkSize))
+            if not chunk:
+                break
+            progress.setText('Executing iteration ' + str(i) + '/'
+                             + str(total) + '...')
+            progress.setPercentage(i * 100 / total)
+            if isCanceled(progress):
+                return False
+
+            # Generate the single-feature layers for this chunk
+            filelist = []
+            algs = []
+            for feat in chunk:
+                output = getTempFilename('shp')
+                filelist.append(output)
+                writer = QgsVectorFileWriter(output, systemEncoding,
+                        provider.fields(), provider.geometryType(),
+                        layer.crs())
+                writer.addFeature(feat)
+                del writer
+
+                iterAlg = alg.getCopy()
+                iterAlg.setParameterValue(paramToIter, output)
+                for out in iterAlg.outputs:
+                    filename = outputs[out.name]
+                    if filename:
+                        filename = filename[:filename.rfind('.')] + '_' \
+                            + str(i) + filename[filename.rfind('.'):]
+                    out.value = filename
+                algs.append(iterAlg)
+                i += 1
+
+            results = {}
+            AlgorithmExecutor.runalgs(algs, progress,
+                    lambda j, msg: results.update({j: msg}))
+            for f in filelist:
+                QgsVectorFileWriter.deleteShapeFile(f)
+            for (j, iterAlg) in enumerate(algs):
+                if j in results and results[j] is None:
+                    handleAlgorithmResults(iterAlg, SilentProgress(), False)
+            errors = [msg for msg in results.values() if msg is not None]
+            if errors:
+                progress.error('\n'.join(errors))
+                return False
+            if len(results) < len(algs):
+                # Canceled before running all of them
+                return False
+
+        return True
@@ -37,8 +37,7 @@ from processing.gui.CrsSelectionPanel import CrsSelectionPanel
 from processing.gui.ExtentSelectionPanel import ExtentSelectionPanel
 from processing.gui.FixedTablePanel import FixedTablePanel
 from processing.gui.BatchOutputSelectionPanel import BatchOutputSelectionPanel
-from processing.gui.UnthreadedAlgorithmExecutor import \
-        UnthreadedAlgorithmExecutor
+from processing.gui.AlgorithmExecutor import AlgorithmExecutor
 from processing.parameters.ParameterFile import ParameterFile
 from processing.parameters.ParameterRaster import ParameterRaster
 from processing.parameters.ParameterTable import ParameterTable
@@ -199,27 +198,46 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
 
         QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
         self.table.setEnabled(False)
+        self.runButton.setEnabled(False)
+        self.cancelButton.setEnabled(True)
         self.tabWidget.setCurrentIndex(1)
         self.progress.setMaximum(len(self.algs))
+        self.progress.setValue(0)
         # make sure the log tab is visible before executing the algorithm
         try:
             self.repaint()
         except:
             pass
+        self.setBaseText('Processing %i algorithms...' % len(self.algs))
+        self.setInfo('<b>Algorithm %s starting...</b>' % self.alg.name)
+        self.errors = {}
+        self.executed = set()
+        AlgorithmExecutor.runalgs(self.algs, self, self.rowFinished)
+
+        # Rows not started before the execution was canceled
+        self.notExecuted = set(range(len(self.algs))) - self.executed
+        if self.canceled:
+            self.setInfo('Batch processing canceled, %i of %i algorithms '
+                         'were not executed'
+                         % (len(self.notExecuted), len(self.algs)), True)
+
         for (i, alg) in enumerate(self.algs):
-            self.setBaseText('Processing algorithm ' + str(i + 1) + '/'
-                             + str(len(self.algs)) + '...')
-            self.setInfo('<b>Algorithm %s starting...</b>' % alg.name)
-            if UnthreadedAlgorithmExecutor.runalg(alg, self) and not self.canceled:
-                if self.load[i]:
-                    handleAlgorithmResults(alg, self, False)
-                self.setInfo('Algorithm %s correctly executed...' % alg.name)
-            else:
-                QApplication.restoreOverrideCursor()
-                return
+            if self.load[i] and i in self.executed and i not in self.errors:
+                handleAlgorithmResults(alg, self, False)
 
         self.finishAll()
 
+    def rowFinished(self, i, msg):
+        self.executed.add(i)
+        if msg is None:
+            self.setInfo('Algorithm %s correctly executed (row %i)...'
+                         % (self.algs[i].name, i + 1))
+        else:
+            self.errors[i] = msg
+            self.setInfo('Algorithm %s failed (row %i): %s'
+                         % (self.algs[i].name, i + 1, msg), True)
+        self.progress.setValue(self.progress.value() + 1)
+
     def loadHTMLResults(self, alg, i):
         for out in alg.outputs:
             if out.hidden or not out.open:
@@ -229,11 +247,11 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
                         + ']', out.value)
 
     def cancel(self):
-        self.canceled = True
+        AlgorithmExecutionDialog.cancel(self)
         self.table.setEnabled(True)
 
     def createSummaryTable(self):
-        createTable = False
+        createTable = bool(self.errors) or bool(self.notExecuted)
         for out in self.algs[0].outputs:
             if isinstance(out, (OutputNumber, OutputString)):
                 createTable = True
@@ -242,8 +260,15 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
             return
         outputFile = getTempFilename('html')
         f = open(outputFile, 'w')
-        for alg in self.algs:
+        for (i, alg) in enumerate(self.algs):
             f.write('<hr>\n')
+            if i in self.notExecuted:
+                f.write('<p>Row %i canceled</p>\n' % (i + 1))
+                continue
+            if i in self.errors:
+                f.write('<p>Row %i failed: %s</p>\n' % (i + 1,
+                        self.errors[i]))
+                continue
             for out in alg.outputs:
                 if isinstance(out, (OutputNumber, OutputString)):
                     f.write('<p>' + out.description + ': ' + str(out.value)
@@ -256,13 +281,31 @@ class BatchProcessingDialog(AlgorithmExecutionDialog):
     def finishAll(self):
         i = 0
         for alg in self.algs:
-            self.loadHTMLResults(alg, i)
+            if i in self.executed and i not in self.errors:
+                self.loadHTMLResults(alg, i)
             i = i + 1
         self.createSummaryTable()
         QApplication.restoreOverrideCursor()
         self.table.setEnabled(True)
-        QMessageBox.information(self, 'Batch processing',
-                                'Batch processing successfully completed!')
+        self.runButton.setEnabled(True)
+        self.cancelButton.setEnabled(False)
+        if self.notExecuted:
+            QMessageBox.warning(self, 'Batch processing',
+                                'Batch processing canceled. %i of %i '
+                                'algorithms were executed, and %i of them '
+                                'failed. Check the log for more information.'
+                                % (len(self.executed), len(self.algs),
+                                   len(self.errors)))
+        elif self.errors:
+            QMessageBox.warning(self, 'Batch processing',
+                                'Batch processing completed, but %i of %i '
+                                'algorithms failed. Check the log for more '
+                                'information.'
+                                % (len(self.errors), len(self.algs)))
+        else:
+            QMessageBox.information(self, 'Batch processing',
+                                    'Batch processing successfully '
+                                    'completed!')
 
     def setParameterValueFromWidget(self, param, widget, alg=None):
         if isinstance(param, (ParameterRaster, ParameterVector,
@@ -28,14 +28,10 @@ __revision__ = '$Format:%H$'
 from PyQt4.QtGui import *
 from PyQt4.QtCore import *
 from qgis.core import *
-from processing.core.SilentProgress import SilentProgress
 from processing.core.ProcessingLog import ProcessingLog
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
-from processing.gui.Postprocessing import handleAlgorithmResults
-from processing.tools import dataobjects
 from processing.tools.system import *
-from processing.tools import vector
 
 
 class UnthreadedAlgorithmExecutor:
@@ -65,43 +61,9 @@ class UnthreadedAlgorithmExecutor:
 
     @staticmethod
     def runalgIterating(alg, paramToIter, progress):
-        # Generate all single-feature layers
-        settings = QSettings()
-        systemEncoding = settings.value('/UI/encoding', 'System')
-        layerfile = alg.getParameterValue(paramToIter)
-        layer = dataobjects.getObjectFromUri(layerfile, False)
-        feat = QgsFeature()
-        filelist = []
-        outputs = {}
-        provider = layer.dataProvider()
-        features = vector.features(layer)
-        for feat in features:
-            output = getTempFilename('shp')
-            filelist.append(output)
-            writer = QgsVectorFileWriter(output, systemEncoding,
-                    provider.fields(), provider.geometryType(), layer.crs())
-            writer.addFeature(feat)
-            del writer
-
-        # store output values to use them later as basenames for all outputs
-        for out in alg.outputs:
-            outputs[out.name] = out.value
-
-        # now run all the algorithms
-        for i,f in enumerate(filelist):
-            alg.setParameterValue(paramToIter, f)
-            for out in alg.outputs:
-                filename = outputs[out.name]
-                if filename:
-                    filename = filename[:filename.rfind('.')] + '_' + str(i) \
-                        + filename[filename.rfind('.'):]
-                out.value = filename
-            progress.setText('Executing iteration ' + str(i) + '/'
-                             + str(len(filelist)) + '...')
-            progress.setPercentage(i * 100 / len(filelist))
-            if UnthreadedAlgorithmExecutor.runalg(alg, SilentProgress()):
-                handleAlgorithmResults(alg, SilentProgress(), False)
-            else:
-                return False
-
-        return True
+        """Kept for compatibility with existing scripts. Use
+        AlgorithmExecutor.runalgIterating() instead.
+        """
+        # Imported here, since AlgorithmExecutor imports this module
+        from processing.gui.AlgorithmExecutor import AlgorithmExecutor
+        return AlgorithmExecutor.runalgIterating(alg, paramToIter, progress)
@@ -29,22 +29,30 @@ __revision__ = '$Format:%H$'
 import os.path
 import sys
 import copy
-import time
 import json
+import uuid
+from osgeo import gdal
 from PyQt4 import QtCore, QtGui
 from qgis.core import *
 from processing.core.GeoAlgorithm import GeoAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.VectorWriter import VectorWriter
 from processing.modeler.WrongModelException import WrongModelException
 from processing.core.GeoAlgorithmExecutionException import \
         GeoAlgorithmExecutionException
 from processing.gui.Help2Html import  getHtmlFromHelpFile
 from processing.modeler.ModelerUtils import ModelerUtils
+from processing.modeler.ModelerScheduler import ModelerScheduler
 from processing.parameters.ParameterRaster import ParameterRaster
 from processing.parameters.ParameterDataObject import ParameterDataObject
 from processing.parameters.ParameterExtent import ParameterExtent
 from processing.parameters.ParameterMultipleInput import ParameterMultipleInput
 from processing.parameters.ParameterVector import ParameterVector
+from processing.parameters.ParameterTable import ParameterTable
+from processing.outputs.OutputVector import OutputVector
+from processing.outputs.OutputRaster import OutputRaster
 from processing.tools import dataobjects
+from processing.tools.system import getTempFilenameInTempFolder
 
 
 class Input():
@@ -182,6 +190,11 @@ class ModelerAlgorithm(GeoAlgorithm):
 
         #Input parameters. A dict of Input objects, with names as keys
         self.inputs = {}
+
+        # Intermediate outputs kept in memory while the model is run. A
+        # dict of (output, names of the algorithms using it), with the
+        # output values as keys
+        self.intermediates = {}
         GeoAlgorithm.__init__(self)
 
     def getIcon(self):
@@ -341,10 +354,164 @@ class ModelerAlgorithm(GeoAlgorithm):
                     if modelOut:
                         out.value = modelOut.value
                 else:
-                    out.value = None
+                    out.value = self.getIntermediateValue(alg, out)
+        algInstance.sessionOutputs = self.getSessionOutputs(alg)
 
         return algInstance
 
+    def getSessionOutputs(self, alg):
+        """Returns the names of the outputs of an algorithm that are
+        not final outputs of the model, and are only used as input
+        layers by active algorithms from the same provider.
+        """
+        algInstance = alg.algorithm
+        outputs = set()
+        for out in algInstance.outputs:
+            if out.hidden or out.name in alg.outputs:
+                continue
+            sameProvider = True
+            for (other, param) in self.getConsumers(alg, out.name):
+                if other.algorithm.provider is not algInstance.provider \
+                        or not isinstance(param, (ParameterRaster,
+                            ParameterVector, ParameterMultipleInput)):
+                    sameProvider = False
+            if sameProvider:
+                outputs.add(out.name)
+        return outputs
+
+    def getConsumers(self, alg, outName):
+        """Returns a list of tuples (algorithm, parameter) with the
+        active algorithms that use an output of another one, and the
+        parameters that take it.
+        """
+        consumers = []
+        for other in self.algs.values():
+            if not other.active or other.name == alg.name:
+                continue
+            for param in other.algorithm.parameters:
+                value = other.params.get(param.name)
+                values = value if isinstance(value, list) else [value]
+                if ValueFromOutput(alg.name, outName) in values:
+                    consumers.append((other, param))
+        return consumers
+
+    def getMaxIntermediateSize(self):
+        """Returns the max. size in bytes of the intermediate results
+        kept in memory.
+        """
+        try:
+            return float(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_INTERMEDIATE_SIZE)) * 1024 * 1024
+        except (TypeError, ValueError):
+            return 0
+
+    def getIntermediateValue(self, alg, out):
+        """Returns the value for an output of an algorithm that is not
+        a final output of the model.
+
+        If the algorithm and all the ones using that output are based
+        on the QGIS API, the output is kept in memory, as a memory layer
+        or as a raster in the /vsimem/ GDAL virtual file system, until
+        the last of them has been executed. Otherwise, None is returned,
+        so the output is written to a temporary file.
+
+        Results kept in memory are released once the model has been
+        executed, so they cannot be reused when it is run again. The
+        model result cache skips the algorithms producing and using
+        them, while the rest of the model can still be taken from it.
+        """
+        provider = alg.algorithm.provider
+        if self.getMaxIntermediateSize() <= 0 \
+                or provider is None \
+                or not provider.supportsNonFileBasedOutput():
+            return None
+        consumers = self.getConsumers(alg, out.name)
+        if not consumers:
+            return None
+        for (other, param) in consumers:
+            otherProvider = other.algorithm.provider
+            if otherProvider is None \
+                    or not otherProvider.supportsNonFileBasedOutput() \
+                    or not isinstance(param, (ParameterRaster,
+                        ParameterVector, ParameterTable,
+                        ParameterMultipleInput)):
+                return None
+        name = uuid.uuid4().hex
+        if isinstance(out, OutputVector):
+            uri = VectorWriter.MEMORY_LAYER_PREFIX + name
+        elif isinstance(out, OutputRaster):
+            uri = '/vsimem/%s/%s.tif' % (name, out.name)
+        else:
+            return None
+        self.intermediates[uri] = (out, set([other.name for (other, param)
+                                             in consumers]))
+        return uri
+
+    def algorithmFinished(self, alg):
+        """Called once an algorithm of the model has been executed, to
+        keep its intermediate outputs and release the ones that are not
+        needed anymore.
+        """
+        for out in alg.algorithm.outputs:
+            if out.value in self.intermediates:
+                self.storeIntermediate(out)
+        for uri in self.intermediates.keys():
+            (out, consumers) = self.intermediates[uri]
+            consumers.discard(alg.name)
+            if not consumers:
+                self.releaseIntermediate(uri)
+
+    def storeIntermediate(self, out):
+        """Makes an intermediate output kept in memory available for
+        the algorithms using it, or writes it to a temporary file if it
+        is larger than the MAX_INTERMEDIATE_SIZE setting.
+        """
+        uri = out.value
+        maxSize = self.getMaxIntermediateSize()
+        if isinstance(out, OutputVector):
+            layer = getattr(out, 'memoryLayer', None)
+            if layer is None:
+                self.releaseIntermediate(uri)
+                return
+            size = 0
+            for feat in layer.getFeatures():
+                geom = feat.geometry()
+                if geom is not None:
+                    size += geom.wkbSize()
+                size += 8 * len(feat.attributes())
+                if size > maxSize:
+                    break
+            if size <= maxSize:
+                dataobjects.addMemoryLayer(uri, layer)
+                return
+            filename = getTempFilenameInTempFolder(out.name + '.shp')
+            QgsVectorFileWriter.writeAsVectorFormat(layer, filename,
+                    'utf-8', layer.crs(), 'ESRI Shapefile')
+        else:
+            dataset = gdal.Open(uri)
+            if dataset is None:
+                self.releaseIntermediate(uri)
+                return
+            band = dataset.GetRasterBand(1)
+            size = dataset.RasterXSize * dataset.RasterYSize \
+                * dataset.RasterCount * gdal.GetDataTypeSize(band.DataType) / 8
+            if size <= maxSize:
+                return
+            filename = getTempFilenameInTempFolder(out.name + '.tif')
+            gdal.GetDriverByName('GTiff').CreateCopy(filename, dataset)
+            dataset = None
+        self.releaseIntermediate(uri)
+        out.value = filename
+
+    def releaseIntermediate(self, uri):
+        (out, consumers) = self.intermediates.pop(uri)
+        dataobjects.removeMemoryLayer(uri)
+        if isinstance(out, OutputVector):
+            out.memoryLayer = None
+        else:
+            gdal.Unlink(uri)
+            gdal.Unlink(uri + '.aux.xml')
+
     def deactivateAlgorithm(self, algName):
         dependent = self.getDependentAlgorithms(algName)
         for alg in dependent:
@@ -412,39 +579,24 @@ class ModelerAlgorithm(GeoAlgorithm):
 
 
     def processAlgorithm(self, progress):
-        executed = []
-        toExecute = [alg for alg in self.algs.values() if alg.active]
-        while len(executed) < len(toExecute):
-            for alg in toExecute:
-                if alg.name not in executed:
-                    canExecute = True
-                    required = self.getDependsOnAlgorithms(alg.name)
-                    for requiredAlg in required:
-                        if requiredAlg != alg.name and requiredAlg not in executed:
-                            canExecute = False
-                            break
-                    if canExecute:
-                        try:
-                            progress.setDebugInfo('Prepare algorithm: ' + alg.name)
-                            self.prepareAlgorithm(alg)
-                            progress.setText('Running %s [%i/%i]' % ( alg.description, len(executed) + 1 ,len(toExecute)))
-                            progress.setDebugInfo('Parameters: ' + ', '.join([unicode(p).strip()
-                                                + '=' + unicode(p.value) for p in alg.algorithm.parameters]))
-                            t0 = time.time()
-                            alg.algorithm.execute(progress, self)
-                            dt = time.time() - t0
-                            executed.append(alg.name)
-                            progress.setDebugInfo(
-                                    'OK. Execution took %0.3f ms (%i outputs).'
-                                    % (dt, len(alg.algorithm.outputs)))
-                        except GeoAlgorithmExecutionException, e:
-                            progress.setDebugInfo('Failed')
-                            raise GeoAlgorithmExecutionException(
-                                    'Error executing algorithm %s\n%s' % (alg.description, e.msg))
-
+        toExecute = [alg.name for alg in self.algs.values() if alg.active]
+        self.intermediates = {}
+        scheduler = ModelerScheduler(self, toExecute, progress)
+        try:
+            executed = scheduler.run()
+        finally:
+            for uri in self.intermediates.keys():
+                self.releaseIntermediate(uri)
+        cached = scheduler.status.values().count('cached')
         progress.setDebugInfo(
-                'Model processed ok. Executed %i algorithms total' % len(executed))
+                'Model processed ok. Executed %i algorithms total (%i '
+                'results reused from previous runs)'
+                % (len(executed) - cached, cached))
+
 
+    def isCacheable(self):
+        return all(alg.algorithm.isCacheable() for alg in self.algs.values()
+                   if alg.active)
 
     def getAsCommand(self):
         if self.descriptionFile:
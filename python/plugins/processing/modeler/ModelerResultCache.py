@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ModelerResultCache.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import os
+import threading
+from collections import OrderedDict
+from qgis.core import *
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.parameters.ParameterDataObject import ParameterDataObject
+from processing.outputs.OutputDirectory import OutputDirectory
+from processing.outputs.OutputFile import OutputFile
+from processing.outputs.OutputHTML import OutputHTML
+from processing.outputs.OutputRaster import OutputRaster
+from processing.outputs.OutputTable import OutputTable
+from processing.outputs.OutputVector import OutputVector
+from processing.tools import dataobjects
+from processing.tools.system import fileStamp
+
+
+class ModelerResultCache:
+    """Keeps the results of the algorithms executed in models, so they
+    can be reused when a model is run again.
+
+    Results are identified by the command line name of the algorithm
+    and the values of its parameters, along with the size and
+    modification time of the files they refer to. Only results written
+    to files are kept, and they are reused only if those files have not
+    changed since. Layers being edited, and layers that are not files,
+    such as database layers, memory layers or the intermediate results
+    that models keep in memory, are never considered unchanged, so the
+    algorithms using them are always executed. So are algorithms whose
+    isCacheable() method returns False, such as those with random
+    results.
+
+    Files are never removed by the cache. Once the total size of the
+    cached results exceeds the MAX_MODEL_CACHE_SIZE setting, the least
+    recently used ones are forgotten.
+    """
+
+    FILE_OUTPUTS = (OutputVector, OutputRaster, OutputTable, OutputHTML,
+                    OutputFile)
+
+    results = OrderedDict()
+    stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    lock = threading.RLock()
+
+    @staticmethod
+    def getKey(alg):
+        """Returns the key identifying the result that an algorithm
+        would produce with the current values of its parameters, or
+        None if it cannot be known.
+        """
+        key = [alg.commandLineName()]
+        if not key[0] or not alg.isCacheable():
+            return None
+        for param in alg.parameters:
+            value = param.value
+            if isinstance(param, ParameterDataObject) and value:
+                stamps = []
+                for uri in unicode(value).split(';'):
+                    stamp = ModelerResultCache.layerStamp(uri)
+                    if stamp is None:
+                        return None
+                    stamps.append(stamp)
+                key.append((param.name, unicode(value), tuple(stamps)))
+            else:
+                # Other parameters, such as ParameterFile, might also
+                # take paths
+                stamp = ModelerResultCache.fileStamp(value)
+                key.append((param.name, unicode(value), stamp))
+        return tuple(key)
+
+    @staticmethod
+    def layerStamp(uri):
+        layer = dataobjects.getObjectFromUri(uri, False)
+        selection = None
+        if isinstance(layer, QgsVectorLayer):
+            if layer.isEditable():
+                return None
+            useSelection = ProcessingConfig.getSetting(
+                    ProcessingConfig.USE_SELECTED)
+            if useSelection and layer.selectedFeatureCount() != 0:
+                selection = tuple(sorted(layer.selectedFeaturesIds()))
+        path = uri.split('|')[0]
+        if not os.path.isfile(path):
+            return None
+        return (ModelerResultCache.fileStamp(path), selection)
+
+    @staticmethod
+    def fileStamp(filename):
+        return fileStamp(filename)
+
+    @staticmethod
+    def get(key):
+        """Returns a dict with the values of the outputs of a cached
+        result, by output name, or None if there is no such result or
+        its files have changed.
+        """
+        if key is None or ModelerResultCache.getMaxSize() <= 0:
+            return None
+        with ModelerResultCache.lock:
+            result = ModelerResultCache.results.pop(key, None)
+            if result is not None and all(
+                    ModelerResultCache.fileStamp(value) == stamp
+                    for (value, stamp, size) in result.values()
+                    if stamp is not None):
+                ModelerResultCache.results[key] = result
+                ModelerResultCache.stats['hits'] += 1
+                return dict((name, value) for (name, (value, stamp, size))
+                            in result.iteritems())
+            ModelerResultCache.stats['misses'] += 1
+        return None
+
+    @staticmethod
+    def add(key, alg):
+        """Keeps the result of an algorithm that has just been executed
+        with the parameters identified by key.
+        """
+        maxSize = ModelerResultCache.getMaxSize()
+        if key is None or maxSize <= 0:
+            return
+        result = {}
+        for out in alg.outputs:
+            if isinstance(out, OutputDirectory):
+                return
+            elif isinstance(out, ModelerResultCache.FILE_OUTPUTS):
+                stamp = ModelerResultCache.fileStamp(out.value)
+                if stamp is None:
+                    return
+                result[out.name] = (out.value, stamp,
+                                    sum(s for (f, s, t) in stamp))
+            else:
+                result[out.name] = (out.value, None, 0)
+        with ModelerResultCache.lock:
+            results = ModelerResultCache.results
+            results.pop(key, None)
+            results[key] = result
+            size = ModelerResultCache.getSize()
+            while len(results) > 1 and size > maxSize:
+                (oldKey, oldResult) = results.popitem(last=False)
+                size -= sum(s for (v, t, s) in oldResult.values())
+                ModelerResultCache.stats['evictions'] += 1
+
+    @staticmethod
+    def invalidate(commandLineName=None):
+        """Forgets the cached results of an algorithm, given its command
+        line name, or all of them if no name is passed, so they are not
+        reused anymore.
+        """
+        with ModelerResultCache.lock:
+            results = ModelerResultCache.results
+            for key in results.keys():
+                if commandLineName is None or key[0] == commandLineName:
+                    del results[key]
+
+    @staticmethod
+    def getMaxSize():
+        try:
+            return float(ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_MODEL_CACHE_SIZE)) * 1024 * 1024
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def getSize():
+        with ModelerResultCache.lock:
+            return sum(s for result in ModelerResultCache.results.values()
+                       for (v, t, s) in result.values())
+
+    @staticmethod
+    def getStats():
+        """Returns a dict with the number of cached results reused
+        ('hits'), the number of lookups that found no valid result
+        ('misses'), the number of results forgotten to keep the cache
+        within its maximum size ('evictions'), and the number of cached
+        results and their size in bytes ('results' and 'size').
+        """
+        with ModelerResultCache.lock:
+            stats = dict(ModelerResultCache.stats)
+            stats['results'] = len(ModelerResultCache.results)
+            stats['size'] = ModelerResultCache.getSize()
+        return stats
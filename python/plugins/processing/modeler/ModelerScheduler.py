@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    ModelerScheduler.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import sys
+import time
+import Queue
+import threading
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.modeler.ModelerResultCache import ModelerResultCache
+from processing.tools import dataobjects
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+
+
+class QueuedProgress:
+    """A progress object for algorithms run in a worker thread.
+
+    Progress objects usually update GUI elements, which can only be
+    done from the main thread, so calls are queued and forwarded later
+    to the actual progress object by the scheduler, from the main
+    thread. Percentages of individual algorithms are not forwarded,
+    since the scheduler reports the progress of the whole model.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def _put(self, method, value):
+        self.queue.put(('progress', method, value))
+
+    def error(self, msg):
+        self._put('error', msg)
+
+    def setText(self, text):
+        self._put('setText', text)
+
+    def setPercentage(self, i):
+        pass
+
+    def setInfo(self, msg):
+        self._put('setInfo', msg)
+
+    def setCommand(self, cmd):
+        self._put('setCommand', cmd)
+
+    def setDebugInfo(self, msg):
+        self._put('setDebugInfo', msg)
+
+    def setConsoleInfo(self, msg):
+        self._put('setConsoleInfo', msg)
+
+    def close(self):
+        pass
+
+
+class ModelerScheduler:
+    """Runs the child algorithms of a model, following the dependency
+    graph between them.
+
+    Algorithms are sorted topologically once, and then every algorithm
+    whose dependencies have already been executed is run. Algorithms
+    that are thread safe (usually, those calling external applications)
+    are run in worker threads, up to MAX_THREADS of them at the same
+    time, while the remaining ones are run in the main thread, one at a
+    time. With MAX_THREADS set to 1, all algorithms are run in the main
+    thread, in topological order.
+
+    Algorithms are not executed if a result of a previous run with the
+    same parameters and inputs can be found in the ModelerResultCache,
+    unless they depend on an algorithm that has been executed.
+    """
+
+    def __init__(self, model, names, progress, maxThreads=None):
+        self.model = model
+        self.progress = progress
+        if maxThreads is None:
+            maxThreads = ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_THREADS)
+        try:
+            self.maxThreads = max(1, int(maxThreads))
+        except (TypeError, ValueError):
+            self.maxThreads = 1
+
+        self.dependencies = {}
+        for name in names:
+            required = set(model.getDependsOnAlgorithms(name))
+            required.discard(name)
+            for requiredAlg in required:
+                if requiredAlg not in names:
+                    raise GeoAlgorithmExecutionException(
+                            'Algorithm %s depends on %s, which is not active'
+                            % (model.algs[name].description,
+                               model.algs[requiredAlg].description))
+            self.dependencies[name] = required
+
+        # getDependsOnAlgorithms() returns all the ancestors of an
+        # algorithm, so an algorithm always has more of them than any of
+        # its ancestors, and sorting by their number gives a valid
+        # topological order.
+        self.order = sorted(names, key=lambda n: (len(self.dependencies[n]),
+                                                  n))
+        self.timings = {}
+        # 'cached' or 'executed', for every algorithm that has finished
+        self.status = {}
+        # Cache keys of the algorithms being executed
+        self.keys = {}
+        # Algorithms depending on others that have been executed
+        self.invalidated = set()
+
+    def run(self):
+        """Executes all algorithms and returns the list of their names,
+        in the order they finished.
+
+        Raises a GeoAlgorithmExecutionException if any of them fails.
+        Algorithms already running in worker threads are allowed to
+        finish before that, but no new ones are started.
+        """
+        providers = set([self.model.algs[name].algorithm.provider
+                         for name in self.order])
+        providers.discard(None)
+        for provider in providers:
+            provider.startSession()
+        dataobjects.startExecution()
+        try:
+            return self.runAlgorithms()
+        finally:
+            dataobjects.endExecution()
+            for provider in providers:
+                provider.endSession()
+
+    def runAlgorithms(self):
+        queue = Queue.Queue()
+        pending = list(self.order)
+        executed = []
+        running = set()
+        error = None
+        total = len(pending)
+
+        while True:
+            if error is None:
+                ready = [name for name in pending
+                         if self.dependencies[name] <= set(executed)]
+                mainThreadAlgs = []
+                for name in ready:
+                    alg = self.model.algs[name]
+                    if self.maxThreads == 1 \
+                            or not alg.algorithm.isThreadSafe():
+                        mainThreadAlgs.append(name)
+                    elif len(running) < self.maxThreads:
+                        pending.remove(name)
+                        self.prepare(alg, len(executed) + len(running), total)
+                        if self.reuseCachedResult(alg):
+                            self.finished(name, 0, executed, total, True)
+                            continue
+                        running.add(name)
+                        alg.algorithm.loadInputLayers()
+                        thread = threading.Thread(target=self.runInThread,
+                                args=(alg, QueuedProgress(queue), queue),
+                                name='Processing-' + name)
+                        thread.daemon = True
+                        thread.start()
+
+                if mainThreadAlgs:
+                    # Run one of them and check again, since other
+                    # algorithms might have been finished meanwhile
+                    name = mainThreadAlgs[0]
+                    pending.remove(name)
+                    alg = self.model.algs[name]
+                    self.prepare(alg, len(executed) + len(running), total)
+                    if self.reuseCachedResult(alg):
+                        self.finished(name, 0, executed, total, True)
+                        continue
+                    try:
+                        t0 = time.time()
+                        alg.algorithm.execute(self.progress, self.model)
+                        self.finished(name, time.time() - t0, executed, total)
+                    except GeoAlgorithmExecutionException, e:
+                        self.progress.setDebugInfo('Failed')
+                        error = (name, e)
+                    error = self.processMessages(queue, executed, running,
+                                                 total, False) or error
+                    continue
+
+            if running:
+                error = self.processMessages(queue, executed, running,
+                                             total, True) or error
+            elif pending and error is None:
+                raise GeoAlgorithmExecutionException(
+                        'Could not resolve dependencies between algorithms '
+                        'in the model')
+            else:
+                break
+
+        if error is not None:
+            (name, e) = error
+            raise GeoAlgorithmExecutionException(
+                    'Error executing algorithm %s\n%s'
+                    % (self.model.algs[name].description, e.msg))
+
+        return executed
+
+    def prepare(self, alg, current, total):
+        self.progress.setDebugInfo('Prepare algorithm: ' + alg.name)
+        self.model.prepareAlgorithm(alg)
+        self.progress.setText('Running %s [%i/%i]' % (alg.description,
+                              current + 1, total))
+        self.progress.setDebugInfo('Parameters: ' + ', '.join(
+                [unicode(p).strip() + '=' + unicode(p.value)
+                 for p in alg.algorithm.parameters]))
+
+    def reuseCachedResult(self, alg):
+        """Sets the output values of a prepared algorithm to those of
+        a cached result, if there is a valid one, and returns True in
+        that case.
+
+        Final outputs of the model are only taken from the cache if it
+        has them in the same files requested for the model.
+        """
+        key = ModelerResultCache.getKey(alg.algorithm)
+        self.keys[alg.name] = key
+        if alg.name in self.invalidated:
+            return False
+        values = ModelerResultCache.get(key)
+        if values is None:
+            return False
+        for out in alg.algorithm.outputs:
+            if out.name not in values or (out.name in alg.outputs
+                                          and out.value != values[out.name]):
+                return False
+        for out in alg.algorithm.outputs:
+            if out.value in self.model.intermediates:
+                self.model.releaseIntermediate(out.value)
+            out.value = values[out.name]
+        return True
+
+    def runInThread(self, alg, progress, queue):
+        t0 = time.time()
+        try:
+            alg.algorithm.execute(progress, self.model)
+            queue.put(('finished', alg.name, time.time() - t0))
+        except GeoAlgorithmExecutionException, e:
+            queue.put(('failed', alg.name, e))
+        except:
+            queue.put(('failed', alg.name, GeoAlgorithmExecutionException(
+                    unicode(sys.exc_info()[1]))))
+
+    def processMessages(self, queue, executed, running, total, wait):
+        """Processes the messages sent by worker threads. If wait is
+        True, it waits until there is at least one of them.
+
+        Returns a tuple (name, exception) for the first algorithm that
+        failed, or None if all of them finished correctly.
+        """
+        error = None
+        while True:
+            try:
+                message = queue.get(wait)
+            except Queue.Empty:
+                return error
+            wait = False
+            if message[0] == 'progress':
+                (method, value) = message[1:]
+                getattr(self.progress, method)(value)
+            elif message[0] == 'finished':
+                (name, dt) = message[1:]
+                running.discard(name)
+                self.finished(name, dt, executed, total)
+            elif message[0] == 'failed':
+                (name, e) = message[1:]
+                running.discard(name)
+                self.progress.setDebugInfo('Failed')
+                error = error or (name, e)
+
+    def finished(self, name, dt, executed, total, cached=False):
+        executed.append(name)
+        alg = self.model.algs[name]
+        self.model.algorithmFinished(alg)
+        if cached:
+            self.status[name] = 'cached'
+        else:
+            self.status[name] = 'executed'
+            ModelerResultCache.add(self.keys.pop(name, None), alg.algorithm)
+            self.invalidated.update(self.model.getDependentAlgorithms(name))
+        self.timings[name] = dt
+        self.progress.setPercentage(int(100 * len(executed) / total))
+        self.progress.setInfo('%s: %s' % (alg.description, self.status[name]))
+        self.progress.setDebugInfo('OK. %s took %0.3f ms (%i outputs).'
+                % (name, dt * 1000,
+                   len(self.model.algs[name].algorithm.outputs)))
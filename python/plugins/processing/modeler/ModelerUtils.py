@@ -49,7 +49,13 @@ class ModelerUtils:
 
     @staticmethod
     def getAlgorithm(name):
-        for provider in ModelerUtils.allAlgs.values():
+        # As in Processing.getAlgorithm(), the provider named in the
+        # prefix is checked first, so the rest are not loaded
+        prefix = name.split(':')[0].lower()
+        providerNames = sorted(ModelerUtils.allAlgs.keys(),
+                               key=lambda n: n.lower() != prefix)
+        for providerName in providerNames:
+            provider = ModelerUtils.allAlgs[providerName]
             if name in provider:
                 return provider[name]
         return None
@@ -29,6 +29,7 @@ from PyQt4.QtCore import *
 
 from processing.core.TableWriter import TableWriter
 from processing.outputs.Output import Output
+from processing.tools import dataobjects
 from processing.tools.system import *
 
 
@@ -38,7 +39,7 @@ class OutputTable(Output):
     compatible = None
 
     def getFileFilter(self, alg):
-        exts = ['csv']
+        exts = dataobjects.getSupportedOutputTableExtensions()
         for i in range(len(exts)):
             exts[i] = exts[i].upper() + ' files(*.' + exts[i].lower() + ')'
         return ';;'.join(exts)
@@ -56,8 +57,8 @@ class OutputTable(Output):
         generate the output result.
         """
 
-        ext = self.value[self.value.rfind('.') + 1:]
-        if ext in alg.provider.getSupportedOutputTableExtensions():
+        exts = alg.provider.getSupportedOutputTableExtensions()
+        if [ext for ext in exts if self.value.endswith('.' + ext)]:
             return self.value
         else:
             if self.compatible is None:
@@ -25,6 +25,7 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import weakref
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.VectorWriter import VectorWriter
@@ -37,6 +38,7 @@ class OutputVector(Output):
 
     encoding = None
     compatible = None
+    writer = None
 
     def getFileFilter(self, alg):
         exts = dataobjects.getSupportedOutputVectorLayerExtensions()
@@ -92,4 +94,14 @@ class OutputVector(Output):
         w = VectorWriter(self.value, self.encoding, fields, geomType,
                          crs, options)
         self.memoryLayer = w.memLayer
+        self.writer = weakref.ref(w)
         return w
+
+    def closeWriter(self):
+        """Closes the writer returned by getVectorWriter(), if the
+        algorithm has not deleted it yet, so all its features are
+        written.
+        """
+        w = self.writer() if self.writer is not None else None
+        if w is not None:
+            w.close()
@@ -32,9 +32,13 @@ from osgeo.gdalconst import GA_ReadOnly
 
 import processing
 from processing.modeler import ModelerAlgorithmProvider
-from processing.modeler.ModelerAlgorithm import ModelerAlgorithm
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.modeler.ModelerAlgorithm import ModelerAlgorithm, \
+    Algorithm, Output, ValueFromOutput
+from processing.modeler.ModelerResultCache import ModelerResultCache
 from processing.modeler.Providers import Providers
 from processing.tools import dataobjects
+from processing.tools.system import getTempFilename
 
 from processing.tests.TestData import points, points2, polygons, polygons2, \
     lines, union, table, raster
@@ -222,6 +226,81 @@ class ModelerAlgorithmTest(unittest.TestCase):
         wkt = 'POLYGON((270807.08580285 4458940.1594565,270798.42294527 4458914.62661676,270780.81854858 4458914.21983449,270763.52289518 4458920.715993,270760.3449542 4458926.6570575,270763.78234766 4458958.22561242,270794.30290024 4458942.16424502,270807.08580285 4458940.1594565))'
         self.assertEqual(wkt, str(feature.geometry().exportToWkt()))
 
+    def createCentroidsCountModel(self):
+        model = ModelerAlgorithm()
+        model.provider = Providers.providers['model']
+        centroids = Algorithm('qgis:polygoncentroids')
+        centroids.params['INPUT_LAYER'] = polygons()
+        model.addAlgorithm(centroids)
+        count = Algorithm('qgis:countpointsinpolygon')
+        count.params['POLYGONS'] = polygons()
+        count.params['POINTS'] = ValueFromOutput(centroids.name,
+                                                 'OUTPUT_LAYER')
+        count.params['FIELD'] = 'NUMPOINTS'
+        count.outputs['OUTPUT'] = Output('Counts')
+        model.addAlgorithm(count)
+        model.defineCharacteristics()
+        output = model.getOutputFromName(
+                model.getSafeNameForOutput(count.name, 'OUTPUT'))
+        output.value = getTempFilename('shp')
+        return (model, output)
+
+    def test_modelercachedrerun(self):
+        ProcessingConfig.setSettingValue(
+                ProcessingConfig.MAX_MODEL_CACHE_SIZE, 512)
+        ProcessingConfig.setSettingValue(
+                ProcessingConfig.MAX_INTERMEDIATE_SIZE, 0)
+        (model, output) = self.createCentroidsCountModel()
+
+        model.execute(None)
+        self.assertTrue(os.path.exists(output.value))
+        hits = ModelerResultCache.getStats()['hits']
+        model.execute(None)
+        self.assertEqual(hits + 2, ModelerResultCache.getStats()['hits'])
+        layer = dataobjects.getObjectFromUri(output.value, True)
+        source = dataobjects.getObjectFromUri(polygons(), True)
+        self.assertEqual(source.featureCount(), layer.featureCount())
+        self.assertTrue(layer.fieldNameIndex('NUMPOINTS') >= 0)
+
+    def test_modelercachedintermediates(self):
+        # Memory intermediates are used along with the cache, and the
+        # algorithms producing and using them are always executed
+        ProcessingConfig.setSettingValue(
+                ProcessingConfig.MAX_MODEL_CACHE_SIZE, 512)
+        ProcessingConfig.setSettingValue(
+                ProcessingConfig.MAX_INTERMEDIATE_SIZE, 64)
+        (model, output) = self.createCentroidsCountModel()
+
+        model.execute(None)
+        hits = ModelerResultCache.getStats()['hits']
+        model.execute(None)
+        self.assertEqual(hits, ModelerResultCache.getStats()['hits'])
+        layer = dataobjects.getObjectFromUri(output.value, True)
+        source = dataobjects.getObjectFromUri(polygons(), True)
+        self.assertEqual(source.featureCount(), layer.featureCount())
+
+    def test_modelerrandomnotcached(self):
+        ProcessingConfig.setSettingValue(
+                ProcessingConfig.MAX_MODEL_CACHE_SIZE, 512)
+        model = ModelerAlgorithm()
+        model.provider = Providers.providers['model']
+        randomPoints = Algorithm('qgis:randompointsinextent')
+        randomPoints.params['EXTENT'] = '0,10,0,10'
+        randomPoints.params['POINT_NUMBER'] = 10
+        randomPoints.params['MIN_DISTANCE'] = 0
+        randomPoints.outputs['OUTPUT'] = Output('Points')
+        model.addAlgorithm(randomPoints)
+        model.defineCharacteristics()
+        self.assertFalse(model.isCacheable())
+        output = model.getOutputFromName(
+                model.getSafeNameForOutput(randomPoints.name, 'OUTPUT'))
+        output.value = getTempFilename('shp')
+
+        model.execute(None)
+        hits = ModelerResultCache.getStats()['hits']
+        model.execute(None)
+        self.assertEqual(hits, ModelerResultCache.getStats()['hits'])
+
 
 def suite():
     suite = unittest.makeSuite(ModelerAlgorithmTest, 'test')
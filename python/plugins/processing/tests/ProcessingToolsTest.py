@@ -25,17 +25,51 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import math
+import os
+import time
+import threading
 import unittest
 
+from qgis.core import QgsGeometry, QgsPoint, QgsVectorLayer, QgsFeature
+
 import processing
 from processing.core import Processing
-from processing.tools.vector import values
+from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.ProcessRunner import ProcessRunner, gdalParser
+from processing.core.SilentProgress import SilentProgress
+from processing.core.GeoAlgorithmExecutionException import \
+        GeoAlgorithmExecutionException
+from processing.tools.vector import values, columns, getUniqueValues, \
+        IndexedFeatureSource, PointIndex, layerPoints, containsPoints
+from processing.tools.predicates import PreparedGeometry
+from processing.tools.triangulation import uniquePoints, delaunay, \
+        voronoiCells
 from processing.tools.dataobjects import *
 
 from processing.tests.TestData import points, points2, polygons, polygons2, \
     lines, union, table, polygonsGeoJson, raster
 
 
+class RecordingProgress(SilentProgress):
+    """Records the percentages set, along with the time they were set
+    since the progress was created, and cancels the execution after a
+    given number of seconds.
+    """
+
+    def __init__(self, cancelAfter=None):
+        self.t0 = time.time()
+        self.cancelAfter = cancelAfter
+        self.percentages = []
+
+    def setPercentage(self, i):
+        self.percentages.append((i, time.time() - self.t0))
+
+    def isCanceled(self):
+        return self.cancelAfter is not None \
+            and time.time() - self.t0 > self.cancelAfter
+
+
 class ProcessingToolsTest(unittest.TestCase):
     '''Tests the method imported when doing an "import processing", and
     also in processing.tools. They are mostly convenience tools.
@@ -67,6 +101,23 @@ class ProcessingToolsTest(unittest.TestCase):
         self.assertEqual(1, len(features))
         layer.setSelectedFeatures([])
 
+    def test_featuresWithFilters(self):
+        layer = processing.getObject(points())
+        feats = list(processing.features(layer, attributes=['ID'],
+                                         geometry=False))
+        self.assertEqual(12, len(feats))
+        first = layer.getFeatures().next()
+        rect = first.geometry().boundingBox()
+        fids = [f.id() for f in processing.features(layer, filterRect=rect)]
+        self.assertIn(first.id(), fids)
+        feats = processing.features(layer, expression='"ID" <= 3')
+        self.assertEqual(3, len(list(feats)))
+        layer.setSelectedFeatures([first.id()])
+        feats = processing.features(layer, filterRect=rect,
+                                    expression='"ID" > 12')
+        self.assertEqual(0, len(list(feats)))
+        layer.setSelectedFeatures([])
+
     def test_attributeValues(self):
         layer = processing.getObject(points())
         attributeValues = values(layer, 'ID')
@@ -76,9 +127,211 @@ class ProcessingToolsTest(unittest.TestCase):
             i += 1
         self.assertEquals(13, i)
 
+    def test_columns(self):
+        layer = processing.getObject(points())
+        cols = columns(layer, 'ID', 0)
+        (ids, invalid) = cols['ID'].array()
+        self.assertEqual(range(1, 13), ids.tolist())
+        self.assertFalse(invalid.any())
+        self.assertEqual(12, len(cols[0]))
+        feats = list(layer.getFeatures())
+        self.assertEqual([f.attributes()[0] for f in feats], cols[0].tolist())
+        self.assertEqual(12, len(getUniqueValues(layer, 0)))
+
+        layer.setSelectedFeatures([feats[0].id(), feats[1].id()])
+        self.assertEqual(2, len(columns(layer, 'ID')['ID']))
+        layer.setSelectedFeatures([])
+
+    def test_indexedFeatureSource(self):
+        layer = processing.getObject(points())
+        for maxCached in [0, 5]:
+            source = IndexedFeatureSource(layer, maxCached)
+            fids = source.intersects(layer.extent())
+            self.assertEqual(12, len(fids))
+            feats = source.features(fids)
+            self.assertEqual(fids, [f.id() for f in feats])
+            for feat in layer.getFeatures():
+                self.assertEqual(feat.attributes(),
+                                 source.feature(feat.id()).attributes())
+
+    def test_pointIndex(self):
+        layer = processing.getObject(points())
+        (coords, fids) = layerPoints(layer)
+        index = PointIndex(coords)
+        (dists, ids) = index.nearest(coords, 3)
+        for (point, pointDists, pointIds) in zip(coords, dists, ids):
+            allDists = sorted(math.hypot(x - point[0], y - point[1])
+                              for (x, y) in coords)
+            for i in xrange(3):
+                self.assertAlmostEqual(allDists[i], pointDists[i])
+                self.assertAlmostEqual(pointDists[i], math.hypot(
+                        coords[pointIds[i]][0] - point[0],
+                        coords[pointIds[i]][1] - point[1]))
+            self.assertEqual(set(pointIds[:2]), set(index.pointsInRadius(
+                    point[0], point[1], (allDists[1] + allDists[2]) / 2)))
+        index.addPoint(0, 0)
+        self.assertEqual(len(coords), index.pointsInRadius(0, 0, 0)[-1])
+
+    def test_layerPointsNullGeometry(self):
+        layer = QgsVectorLayer('Point?field=id:integer', 'points', 'memory')
+        feats = []
+        for (i, point) in enumerate([(1, 2), None, (3, 4)]):
+            feat = QgsFeature()
+            feat.setAttributes([i])
+            if point is not None:
+                feat.setGeometry(QgsGeometry.fromPoint(QgsPoint(*point)))
+            feats.append(feat)
+        layer.dataProvider().addFeatures(feats)
+        (coords, values) = layerPoints(layer, 0)
+        self.assertEqual([[1, 2], [3, 4]], coords.tolist())
+        self.assertEqual([0, 2], values)
+
+    def test_exportCacheExecutionScope(self):
+        layer = QgsVectorLayer('Point?field=id:integer', 'points', 'memory')
+        feat = QgsFeature()
+        feat.setAttributes([1])
+        feat.setGeometry(QgsGeometry.fromPoint(QgsPoint(1, 2)))
+        layer.dataProvider().addFeatures([feat])
+        # Memory layers are not files, so their exports are only reused
+        # within an execution
+        self.assertNotEqual(exportVectorLayer(layer),
+                            exportVectorLayer(layer))
+        startExecution()
+        try:
+            output = exportVectorLayer(layer)
+            self.assertEqual(output, exportVectorLayer(layer))
+        finally:
+            endExecution()
+        self.assertFalse(os.path.exists(output))
+
+    def test_preparedGeometry(self):
+        polygonLayer = processing.getObject(polygons())
+        pointLayer = processing.getObject(points())
+        pointFeats = list(pointLayer.getFeatures())
+        for polygon in polygonLayer.getFeatures():
+            geom = polygon.geometry()
+            prepared = PreparedGeometry(geom)
+            for predicate in ['intersects', 'contains', 'touches',
+                              'disjoint']:
+                expected = [f.id() for f in pointFeats
+                            if getattr(geom, predicate)(f.geometry())]
+                self.assertEqual(expected, [f.id() for f in prepared.filter(
+                        pointFeats, predicate)])
+            flags = PreparedGeometry.TOUCHES | PreparedGeometry.WITHIN
+            expected = [f.id() for f in pointFeats
+                        if geom.intersects(f.geometry())]
+            self.assertEqual(expected, [f.id() for f in prepared.filter(
+                    pointFeats, 'matches', flags)])
+
+    def test_containsPoints(self):
+        polygonLayer = processing.getObject(polygons())
+        pointLayer = processing.getObject(points())
+        (coords, fids) = layerPoints(pointLayer)
+        index = PointIndex(coords)
+        for polygon in polygonLayer.getFeatures():
+            geom = polygon.geometry()
+            expected = [geom.contains(QgsGeometry.fromPoint(QgsPoint(x, y)))
+                        for (x, y) in coords]
+            self.assertEqual(expected, containsPoints(geom, coords).tolist())
+            self.assertEqual(sum(expected),
+                             len(index.pointsInPolygon(geom)))
+
+    def test_triangulation(self):
+        layer = processing.getObject(points())
+        (coords, fids) = layerPoints(layer)
+        (coords, ids) = uniquePoints(coords)
+        (repeated, repeatedIds) = uniquePoints(list(coords) + list(coords))
+        self.assertEqual(coords.tolist(), repeated.tolist())
+        self.assertEqual(range(len(coords)), list(repeatedIds))
+        triangles = delaunay(coords)
+        for (a, b, c) in coords[triangles].tolist():
+            # Counter-clockwise, with no other point in the circumcircle
+            self.assertTrue((b[0] - a[0]) * (c[1] - a[1])
+                            > (b[1] - a[1]) * (c[0] - a[0]))
+            d = 2 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1])
+                     + c[0] * (a[1] - b[1]))
+            x = ((a[0] ** 2 + a[1] ** 2) * (b[1] - c[1])
+                 + (b[0] ** 2 + b[1] ** 2) * (c[1] - a[1])
+                 + (c[0] ** 2 + c[1] ** 2) * (a[1] - b[1])) / d
+            y = ((a[0] ** 2 + a[1] ** 2) * (c[0] - b[0])
+                 + (b[0] ** 2 + b[1] ** 2) * (a[0] - c[0])
+                 + (c[0] ** 2 + c[1] ** 2) * (b[0] - a[0])) / d
+            radius = math.hypot(a[0] - x, a[1] - y)
+            for point in coords:
+                self.assertTrue(math.hypot(point[0] - x, point[1] - y)
+                                > radius - 1e-9)
+        (xMin, yMin) = coords.min(axis=0) - 1
+        (xMax, yMax) = coords.max(axis=0) + 1
+        cells = voronoiCells(coords, triangles, xMin, yMin, xMax, yMax)
+        area = 0
+        for (i, cell) in enumerate(cells):
+            for (x, y) in cell:
+                dists = [math.hypot(x - px, y - py) for (px, py) in coords]
+                self.assertAlmostEqual(min(dists), dists[i])
+            area += sum(x0 * y1 - x1 * y0 for ((x0, y0), (x1, y1))
+                        in zip(cell, cell[1:] + cell[:1])) / 2.0
+        self.assertAlmostEqual((xMax - xMin) * (yMax - yMin), area)
+
     def test_extent(self):
         pass
 
+    def test_processRunnerOutput(self):
+        command = 'echo first; echo second'
+        self.assertEqual(['first\n', 'second\n'],
+                         ProcessRunner.run(command, None))
+        stats = ProcessRunner.getStats()[-1]
+        self.assertEqual(command, stats['command'])
+        self.assertEqual(0, stats['returncode'])
+        self.assertFalse(stats['canceled'])
+        ProcessRunner.run('exit 3', None)
+        self.assertEqual(3, ProcessRunner.getStats()[-1]['returncode'])
+
+    def test_processRunnerProgress(self):
+        progress = RecordingProgress()
+        lines = ProcessRunner.run("printf '0...10...'; sleep 1; "
+                                  "printf '20...100 - done.\\n'",
+                                  progress, gdalParser,
+                                  universal_newlines=False, separator='...')
+        self.assertEqual(['0...10...20...100 - done.\n'], lines)
+        self.assertEqual([0, 10, 20, 100],
+                         [p for (p, t) in progress.percentages])
+        # Reported before the line is finished
+        self.assertTrue(progress.percentages[1][1] < 0.9)
+
+    def test_processRunnerCancel(self):
+        t0 = time.time()
+        self.assertRaises(GeoAlgorithmExecutionException, ProcessRunner.run,
+                          'sleep 10', RecordingProgress(0.2))
+        self.assertTrue(time.time() - t0 < 5)
+        self.assertTrue(ProcessRunner.getStats()[-1]['canceled'])
+
+    def test_processRunnerTimeout(self):
+        t0 = time.time()
+        self.assertRaises(GeoAlgorithmExecutionException, ProcessRunner.run,
+                          'sleep 10', None, timeout=0.2)
+        self.assertTrue(time.time() - t0 < 5)
+        self.assertTrue(ProcessRunner.getStats()[-1]['canceled'])
+
+    def test_processRunnerMaxProcesses(self):
+        maxThreads = ProcessingConfig.getSetting(ProcessingConfig.MAX_THREADS)
+        ProcessingConfig.setSettingValue(ProcessingConfig.MAX_THREADS, 2)
+        try:
+            threads = [threading.Thread(target=ProcessRunner.run,
+                                        args=('sleep 0.5', None))
+                       for i in range(4)]
+            t0 = time.time()
+            for thread in threads:
+                thread.start()
+            maxRunning = 0
+            while [thread for thread in threads if thread.isAlive()]:
+                maxRunning = max(maxRunning, ProcessRunner.running)
+                time.sleep(0.05)
+            self.assertEqual(2, maxRunning)
+            self.assertTrue(time.time() - t0 >= 1)
+        finally:
+            ProcessingConfig.setSettingValue(ProcessingConfig.MAX_THREADS,
+                                             maxThreads)
+
 
 def suite():
     suite = unittest.makeSuite(ProcessingToolsTest, 'test')
@@ -25,9 +25,11 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import gzip
 import unittest
 import processing
 from processing.tools import dataobjects
+from processing.tools.system import getTempFilename
 
 from processing.tests.TestData import points, points2, polygons, polygons2, \
     lines, union, table
@@ -1207,6 +1209,18 @@ class QgisAlgsTest(unittest.TestCase):
         values = [str(attr) for attr in attrs]
         self.assertEqual(expectedvalues, values)
 
+    def test_qgisdistancematrixcompressed(self):
+        filename = getTempFilename('csv.gz')
+        outputs = processing.runalg('qgis:distancematrix', points(), 'ID',
+                                    points(), 'ID', 0, 0, filename)
+        output = outputs['DISTANCE_MATRIX']
+        self.assertEqual(filename, output)
+        f = gzip.open(output, 'rb')
+        lines = f.read().splitlines()
+        f.close()
+        self.assertEqual('InputID,TargetID,Distance', lines[0].strip())
+        self.assertEqual(12 * 12 + 1, len(lines))
+
 
 def suite():
     suite = unittest.makeSuite(QgisAlgsTest, 'test')
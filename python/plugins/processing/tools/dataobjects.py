@@ -25,7 +25,11 @@ __copyright__ = '(C) 2012, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import os
+import itertools
 from os import path
+import threading
+from collections import OrderedDict
 from qgis.core import *
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
@@ -36,11 +40,89 @@ from processing.tools.system import *
 
 ALL_TYPES = [-1]
 
-_loadedLayers = {}
+# Max. number of layers opened by getObjectFromUri() that are kept open
+# to be reused. The least recently used ones are closed first. Layers
+# are stored by the uri used to open them and by their source, if it is
+# different, but each of them is counted once
+MAX_LOADED_LAYERS = 32
+
+_loadedLayers = OrderedDict()
+
+# Layers kept in memory that are not in the registry, such as the
+# intermediate results of models, by the uri used to refer to them
+_memoryLayers = {}
+
+# Layers in the registry indexed by source. It is built when needed and
+# discarded whenever layers are added to or removed from the registry
+_layersBySource = None
+_registryConnected = False
+_lock = threading.RLock()
+
 
 def resetLoadedLayers():
     global _loadedLayers
-    _loadedLayers = {}
+    with _lock:
+        _loadedLayers = OrderedDict()
+
+
+def addMemoryLayer(uri, layer):
+    """Makes a layer that is not in the registry and cannot be opened
+    from its source, such as a memory layer, available through
+    getObjectFromUri(uri) until removeMemoryLayer(uri) is called.
+    """
+    with _lock:
+        _memoryLayers[uri] = layer
+
+
+def removeMemoryLayer(uri):
+    """Forgets a layer added with addMemoryLayer(), or opened from a
+    uri that is about to be deleted, so it can be released.
+    """
+    with _lock:
+        _memoryLayers.pop(uri, None)
+        layer = _loadedLayers.pop(uri, None)
+        if layer is not None and layer.source() != uri:
+            _loadedLayers.pop(layer.source(), None)
+
+
+def _resetLayersIndex(*args):
+    global _layersBySource
+    _layersBySource = None
+
+
+def _layersIndex():
+    """Returns a dict with the sources of the layers in the registry as
+    keys. If several layers have the same source, raster layers are
+    preferred over vector ones, and layers are sorted by name, as in
+    the lists returned by getRasterLayers() and getVectorLayers().
+    """
+    global _layersBySource, _registryConnected
+    with _lock:
+        if not _registryConnected:
+            app = QCoreApplication.instance()
+            if app is None or QThread.currentThread() != app.thread():
+                # Signals have to be connected from the main thread.
+                # Until then, the index cannot be reused
+                return _createLayersIndex()
+            registry = QgsMapLayerRegistry.instance()
+            registry.layersAdded.connect(_resetLayersIndex)
+            # The index might be created again between these two
+            # signals, while the layers are still in the registry
+            registry.layersWillBeRemoved.connect(_resetLayersIndex)
+            registry.layersRemoved.connect(_resetLayersIndex)
+            registry.removeAll.connect(_resetLayersIndex)
+            _registryConnected = True
+        if _layersBySource is None:
+            _layersBySource = _createLayersIndex()
+        return _layersBySource
+
+
+def _createLayersIndex():
+    index = {}
+    for layer in getRasterLayers() + getTables():
+        index.setdefault(layer.source(), layer)
+    return index
+
 
 def getSupportedOutputVectorLayerExtensions():
     formats = QgsVectorFileWriter.supportedFiltersAndFormats()
@@ -64,7 +146,8 @@ def getSupportedOutputRasterLayerExtensions():
 
 
 def getSupportedOutputTableExtensions():
-    exts = ['csv']
+    # Tables written by TableWriter can also be compressed with gzip
+    exts = ['csv', 'csv.gz']
     return exts
 
 
@@ -211,44 +294,62 @@ def getObjectFromUri(uri, forceLoad=True):
 
     if uri is None:
         return None
-    if uri in _loadedLayers:
-        return _loadedLayers[uri]
-    layers = getRasterLayers()
-    for layer in layers:
-        if layer.source() == uri:
+    layer = _layersIndex().get(uri)
+    if layer is not None:
+        return layer
+    with _lock:
+        if uri in _memoryLayers:
+            return _memoryLayers[uri]
+        if uri in _loadedLayers:
+            layer = _loadedLayers[uri]
+            _touchLoadedLayer(layer)
             return layer
-    layers = getVectorLayers()
-    for layer in layers:
-        if layer.source() == uri:
-            return layer
-    tables = getTables()
-    for table in tables:
-        if table.source() == uri:
-            return table
     if forceLoad:
-        settings = QSettings()
-        prjSetting = settings.value('/Projections/defaultBehaviour')
-        settings.setValue('/Projections/defaultBehaviour', '')
-
-        # If is not opened, we open it
-        layer = QgsVectorLayer(uri, uri, 'ogr')
-        if layer.isValid():
+        # The projection setting is changed while loading the layer, so
+        # layers are loaded one at a time
+        with _lock:
+            if uri in _loadedLayers:
+                return _loadedLayers[uri]
+            settings = QSettings()
+            prjSetting = settings.value('/Projections/defaultBehaviour')
+            settings.setValue('/Projections/defaultBehaviour', '')
+
+            # If is not opened, we open it
+            layer = QgsVectorLayer(uri, uri, 'ogr')
+            if not layer.isValid():
+                layer = QgsRasterLayer(uri, uri)
             if prjSetting:
-                settings.setValue('/Projections/defaultBehaviour', prjSetting)
-            _loadedLayers[layer.source()] = layer
-            return layer
-        layer = QgsRasterLayer(uri, uri)
-        if layer.isValid():
-            if prjSetting:
-                settings.setValue('/Projections/defaultBehaviour', prjSetting)
-            _loadedLayers[layer.source()] = layer
-            return layer
-        if prjSetting:
-            settings.setValue('/Projections/defaultBehaviour', prjSetting)
+                settings.setValue('/Projections/defaultBehaviour',
+                                  prjSetting)
+            if layer.isValid():
+                _addLoadedLayer(uri, layer)
+                return layer
     else:
         return None
 
 
+def _addLoadedLayer(uri, layer):
+    with _lock:
+        _loadedLayers[uri] = layer
+        if layer.source() != uri:
+            _loadedLayers[layer.source()] = layer
+        while len(set(id(l) for l in _loadedLayers.values())) \
+                > MAX_LOADED_LAYERS:
+            (key, oldest) = _loadedLayers.popitem(last=False)
+            for key in _loadedLayerKeys(oldest):
+                del _loadedLayers[key]
+
+
+def _loadedLayerKeys(layer):
+    return [key for (key, l) in _loadedLayers.items() if l is layer]
+
+
+def _touchLoadedLayer(layer):
+    """Moves all the keys of a loaded layer to the end of the LRU."""
+    for key in _loadedLayerKeys(layer):
+        _loadedLayers[key] = _loadedLayers.pop(key)
+
+
 def exportVectorLayer(layer):
     """Takes a QgsVectorLayer and returns the filename to refer to it,
     which allows external apps which support only file-based layers to
@@ -261,50 +362,66 @@ def exportVectorLayer(layer):
     Currently, the output is restricted to shapefiles, so anything
     that is not in a shapefile will get exported. It also export to
     a new file if the original one contains non-ascii characters.
+
+    Exported files are cached and reused while the layer does not
+    change (see exportCacheStats()). Exports of layers that are not
+    files, such as database or remote layers, are only reused within
+    the same execution, between startExecution() and endExecution(),
+    since there is no way to know if they have changed meanwhile.
+    Exports are run one at a time, since algorithms running in worker
+    threads might call this at the same time.
     """
 
-    settings = QSettings()
-    systemEncoding = settings.value('/UI/encoding', 'System')
-
-    filename = os.path.basename(unicode(layer.source()))
-    idx = filename.rfind('.')
-    if idx != -1:
-        filename = filename[:idx]
-
-    filename = unicode(layer.name())
-    validChars = \
-        'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789:'
-    filename = ''.join(c for c in filename if c in validChars)
-    if len(filename) == 0:
-        filename = 'layer'
-    output = getTempFilenameInTempFolder(filename + '.shp')
-    provider = layer.dataProvider()
-    useSelection = ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED)
-    if useSelection and layer.selectedFeatureCount() != 0:
-        writer = QgsVectorFileWriter(output, systemEncoding,
-                                     layer.pendingFields(),
-                                     provider.geometryType(), layer.crs())
-        selection = layer.selectedFeatures()
-        for feat in selection:
-            writer.addFeature(feat)
-        del writer
-        return output
-    else:
-        isASCII = True
-        try:
-            unicode(layer.source()).decode('ascii')
-        except UnicodeEncodeError:
-            isASCII = False
-        if not unicode(layer.source()).endswith('shp') or not isASCII:
+    with _lock:
+        settings = QSettings()
+        systemEncoding = settings.value('/UI/encoding', 'System')
+
+        filename = unicode(layer.name())
+        validChars = \
+            'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789:'
+        filename = ''.join(c for c in filename if c in validChars)
+        if len(filename) == 0:
+            filename = 'layer'
+        provider = layer.dataProvider()
+        useSelection = ProcessingConfig.getSetting(
+                ProcessingConfig.USE_SELECTED)
+        if useSelection and layer.selectedFeatureCount() != 0:
+            key = _exportKey('vector', layer, True)
+            output = _cachedExport(key)
+            if output is not None:
+                return output
+            output = getTempFilenameInTempFolder(filename + '.shp')
             writer = QgsVectorFileWriter(output, systemEncoding,
-                    layer.pendingFields(), provider.geometryType(),
-                    layer.crs())
-            for feat in layer.getFeatures():
+                                         layer.pendingFields(),
+                                         provider.geometryType(), layer.crs())
+            selection = layer.selectedFeatures()
+            for feat in selection:
                 writer.addFeature(feat)
             del writer
+            _addCachedExport(key, output)
             return output
         else:
-            return unicode(layer.source())
+            isASCII = True
+            try:
+                unicode(layer.source()).decode('ascii')
+            except UnicodeEncodeError:
+                isASCII = False
+            if not unicode(layer.source()).endswith('shp') or not isASCII:
+                key = _exportKey('vector', layer, False)
+                output = _cachedExport(key)
+                if output is not None:
+                    return output
+                output = getTempFilenameInTempFolder(filename + '.shp')
+                writer = QgsVectorFileWriter(output, systemEncoding,
+                        layer.pendingFields(), provider.geometryType(),
+                        layer.crs())
+                for feat in layer.getFeatures():
+                    writer.addFeature(feat)
+                del writer
+                _addCachedExport(key, output)
+                return output
+            else:
+                return unicode(layer.source())
 
 
 def exportRasterLayer(layer):
@@ -335,30 +452,205 @@ def exportTable(table):
 
     Currently, the output is restricted to DBF. It also export to a new
     file if the original one contains non-ascii characters.
+
+    Exported files are cached, as in exportVectorLayer().
     """
 
-    settings = QSettings()
-    systemEncoding = settings.value('/UI/encoding', 'System')
-    output = getTempFilename('dbf')
-    provider = table.dataProvider()
-    isASCII = True
-    try:
-        unicode(table.source()).decode('ascii')
-    except UnicodeEncodeError:
-        isASCII = False
-    isDbf = unicode(table.source()).endswith('dbf') \
-        or unicode(table.source()).endswith('shp')
-    if not isDbf or not isASCII:
-        writer = QgsVectorFileWriter(output, systemEncoding,
-                                     provider.fields(), QGis.WKBNoGeometry,
-                                     QgsCoordinateReferenceSystem('4326'))
-        for feat in table.getFeatures():
-            writer.addFeature(feat)
-        del writer
-        return output
-    else:
-        filename = unicode(table.source())
-        if unicode(table.source()).endswith('shp'):
-            return filename[:-3] + 'dbf'
+    with _lock:
+        settings = QSettings()
+        systemEncoding = settings.value('/UI/encoding', 'System')
+        provider = table.dataProvider()
+        isASCII = True
+        try:
+            unicode(table.source()).decode('ascii')
+        except UnicodeEncodeError:
+            isASCII = False
+        isDbf = unicode(table.source()).endswith('dbf') \
+            or unicode(table.source()).endswith('shp')
+        if not isDbf or not isASCII:
+            key = _exportKey('table', table, False)
+            output = _cachedExport(key)
+            if output is not None:
+                return output
+            output = getTempFilename('dbf')
+            writer = QgsVectorFileWriter(output, systemEncoding,
+                                         provider.fields(), QGis.WKBNoGeometry,
+                                         QgsCoordinateReferenceSystem('4326'))
+            for feat in table.getFeatures():
+                writer.addFeature(feat)
+            del writer
+            _addCachedExport(key, output)
+            return output
         else:
-            return filename
+            filename = unicode(table.source())
+            if unicode(table.source()).endswith('shp'):
+                return filename[:-3] + 'dbf'
+            else:
+                return filename
+
+
+# Files exported by exportVectorLayer() and exportTable(), as an LRU
+# with the keys created by _exportKey() and lists of (filename, size)
+# as values
+_exports = OrderedDict()
+_exportStats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+# Number of executions running, and files of evicted exports that are
+# not removed until all of them have finished, since they might still
+# be reading those files
+_executions = 0
+_pendingRemovals = []
+# Identifies the outermost execution running, for the exports that are
+# only valid within it
+_executionId = 0
+
+
+def startExecution():
+    """Called before running algorithms, so the files of the exports
+    evicted from the cache meanwhile are kept until endExecution() is
+    called. Calls can be nested.
+
+    Exports of database and remote layers are cached until the
+    outermost execution ends, and then removed.
+    """
+    global _executions, _executionId
+    with _lock:
+        if _executions == 0:
+            _executionId += 1
+        _executions += 1
+
+
+def endExecution():
+    global _executions
+    with _lock:
+        _executions -= 1
+        if _executions > 0:
+            return
+        scope = _executionScope()
+        for key in [k for k in _exports if k[-1] == scope]:
+            _pendingRemovals.extend(f for (f, s) in _exports.pop(key))
+        files = list(_pendingRemovals)
+        del _pendingRemovals[:]
+    for f in files:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def _executionScope():
+    return ('execution', _executionId)
+
+
+def _exportKey(kind, layer, useSelection):
+    """Returns a key identifying the content that an export of the
+    layer would have, or None if it cannot be known, such as for
+    layers being edited, or layers not stored in files when no
+    execution is running.
+    """
+    if layer.isEditable():
+        return None
+    source = unicode(layer.source())
+    provider = layer.dataProvider()
+    # Files next to the layer file, such as the .dbf of a shapefile,
+    # are considered. There is no cheap way to know if database or
+    # remote layers have changed, so their exports are only reused
+    # within the current execution.
+    stamp = fileStamp(source.split('|')[0])
+    if stamp is None:
+        with _lock:
+            if _executions == 0:
+                return None
+            stamp = _executionScope()
+    selection = None
+    if useSelection:
+        selection = hash(tuple(sorted(layer.selectedFeaturesIds())))
+    return (kind, source, layer.providerType(), provider.subsetString(),
+            layer.name(), selection, stamp)
+
+
+def _exportFiles(filename):
+    """Returns the files written when exporting to the given filename,
+    with their sizes.
+    """
+    if filename.lower().endswith('.shp'):
+        base = os.path.splitext(filename)[0]
+        folder = os.path.dirname(filename)
+        names = [os.path.join(folder, f) for f in os.listdir(folder)
+                 if os.path.splitext(os.path.join(folder, f))[0] == base]
+    else:
+        names = [filename]
+    return [(f, os.path.getsize(f)) for f in names if os.path.isfile(f)]
+
+
+def _cachedExport(key):
+    if key is None:
+        return None
+    with _lock:
+        if key in _exports:
+            files = _exports.pop(key)
+            if all(os.path.isfile(f) for (f, size) in files):
+                _exports[key] = files
+                _exportStats['hits'] += 1
+                return files[0][0]
+        _exportStats['misses'] += 1
+    return None
+
+
+def _addCachedExport(key, filename):
+    if key is None:
+        return
+    try:
+        files = _exportFiles(filename)
+    except OSError:
+        return
+    files.sort(key=lambda f: f[0] != filename)
+    maxSize = ProcessingConfig.getSetting(
+            ProcessingConfig.MAX_EXPORT_CACHE_SIZE)
+    try:
+        maxSize = float(maxSize) * 1024 * 1024
+    except (TypeError, ValueError):
+        maxSize = 0
+    if sum(s for (f, s) in files) > maxSize:
+        return
+    with _lock:
+        _exports[key] = files
+        size = sum(s for (f, s) in itertools.chain(*_exports.values()))
+        removed = []
+        while len(_exports) > 1 and size > maxSize:
+            (oldKey, oldFiles) = _exports.popitem(last=False)
+            _exportStats['evictions'] += 1
+            for (f, s) in oldFiles:
+                size -= s
+                removed.append(f)
+        if _executions > 0:
+            _pendingRemovals.extend(removed)
+            return
+    for f in removed:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+def exportCacheStats():
+    """Returns a dict with the number of exports reused ('hits'), the
+    number of layers that had to be exported ('misses'), the number of
+    exports removed from the cache to keep it within its maximum size
+    ('evictions'), and the number of cached exports and their size in
+    bytes ('exports' and 'size').
+    """
+    with _lock:
+        stats = dict(_exportStats)
+        stats['exports'] = len(_exports)
+        stats['size'] = sum(s for (f, s)
+                            in itertools.chain(*_exports.values()))
+    return stats
+
+
+def resetExportCache():
+    """Forgets all cached exports, without removing their files."""
+    with _lock:
+        _exports.clear()
+        for k in _exportStats:
+            _exportStats[k] = 0
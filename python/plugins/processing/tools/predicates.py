@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    predicates.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+from qgis.core import *
+
+
+class PreparedGeometry:
+    """A geometry to be tested against many others with spatial
+    predicates.
+
+    The bounding box of the geometry is computed once, and compared
+    with the bounding box of every other geometry before running the
+    actual test, which is skipped if they do not intersect. If the
+    QGIS version in use supports it (2.10 and later), the geometry is
+    converted to a prepared GEOS geometry once as well. Otherwise, the
+    GEOS geometry that QgsGeometry builds for the first test is reused
+    for the rest of them.
+
+    Geometries passed to the predicates are not copied, so they should
+    not be wrapped in a new QgsGeometry by the caller, since that would
+    discard the GEOS geometry they might have already built.
+    """
+
+    # Flags for matches()
+    TOUCHES = 1
+    OVERLAPS = 2
+    WITHIN = 4
+
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.rect = geometry.boundingBox()
+        self.engine = None
+        if hasattr(QgsGeometry, 'createGeometryEngine'):
+            self.engine = QgsGeometry.createGeometryEngine(
+                    geometry.geometry())
+            self.engine.prepareGeometry()
+
+    def _test(self, predicate, geom):
+        if self.engine is not None:
+            return getattr(self.engine, predicate)(geom.geometry())
+        return getattr(self.geometry, predicate)(geom)
+
+    def _mightIntersect(self, geom):
+        return geom is not None and self.rect.intersects(geom.boundingBox())
+
+    def intersects(self, geom):
+        return self._mightIntersect(geom) and self._test('intersects', geom)
+
+    def disjoint(self, geom):
+        return not self.intersects(geom)
+
+    def contains(self, geom):
+        return self._mightIntersect(geom) and self._test('contains', geom)
+
+    def within(self, geom):
+        return self._mightIntersect(geom) and self._test('within', geom)
+
+    def touches(self, geom):
+        return self._mightIntersect(geom) and self._test('touches', geom)
+
+    def overlaps(self, geom):
+        return self._mightIntersect(geom) and self._test('overlaps', geom)
+
+    def crosses(self, geom):
+        return self._mightIntersect(geom) and self._test('crosses', geom)
+
+    def matches(self, geom, flags):
+        """Tests a geometry with the predicates selected by the passed
+        flags, as the location based selection and extraction
+        algorithms do.
+
+        Points match if they intersect this geometry. Other geometries
+        match if they are not disjoint from this geometry and touch it
+        (TOUCHES), overlap it or cross it if any of them is a line
+        (OVERLAPS), or are contained by it (WITHIN).
+        """
+        if not self._mightIntersect(geom):
+            return False
+        if geom.type() == QGis.Point:
+            return self._test('intersects', geom)
+        if not self._test('intersects', geom):
+            return False
+        if flags & PreparedGeometry.TOUCHES and self._test('touches', geom):
+            return True
+        if flags & PreparedGeometry.OVERLAPS:
+            if geom.type() == QGis.Line \
+                    or self.geometry.type() == QGis.Line:
+                if self._test('crosses', geom):
+                    return True
+            elif self._test('overlaps', geom):
+                return True
+        if flags & PreparedGeometry.WITHIN and self._test('contains', geom):
+            return True
+        return False
+
+    def filter(self, features, predicate, *args):
+        """Returns a list with the passed features whose geometry
+        satisfies a predicate, given the name of the method of this
+        class that tests it, and any additional arguments it takes.
+        """
+        test = getattr(self, predicate)
+        return [feat for feat in features if test(feat.geometry(), *args)]
@@ -25,25 +25,246 @@ __copyright__ = '(C) 2013, Victor Olaya  and Alexander Bruy'
 
 __revision__ = '$Format:%H$'
 
-import struct
+import numpy
 from osgeo import gdal
 from osgeo.gdalconst import *
 
+# Minimum number of cells to read at once when the natural block of a
+# band is a single scanline (or a few of them), to avoid the overhead
+# of a read call per line.
+MIN_BLOCK_CELLS = 1024 * 1024
 
-def scanraster(layer, progress):
+
+def scanraster(layer, progress, band=1):
+    """Iterates over all the cells of a band of a raster layer, row by
+    row. No-data cells are returned as None.
+
+    This yields a Python value per cell, so algorithms that can work
+    with whole arrays should use scanrasterblocks() instead.
+    """
+    for (x, y, block) in scanrasterblocks(layer, progress, band,
+                                          fullRows=True):
+        for row in block.tolist(None):
+            for value in row:
+                yield value
+
+
+def scanrasterblocks(layer, progress=None, band=1,
+                     minCells=MIN_BLOCK_CELLS, fullRows=False):
+    """Iterates over a band of a raster layer, block by block.
+
+    Blocks follow the natural block size of the band, so each of them
+    is read with a single I/O operation. Bands stored in scanlines,
+    strips or tiles smaller than minCells cells are read in whole rows
+    of blocks, grouping as many consecutive rows as needed to hold at
+    least minCells cells. Tiled bands are read in whole rows of tiles
+    too if fullRows is True, so blocks span the full width of the band
+    and cells are returned row by row.
+
+    For each block, a tuple (xOffset, yOffset, array) is returned, with
+    the pixel offsets of the block and a NumPy masked array with its
+    values, in the data type of the band. No-data cells (and NaN cells
+    in floating point bands) are masked.
+    """
     filename = unicode(layer.source())
     dataset = gdal.Open(filename, GA_ReadOnly)
-    band = dataset.GetRasterBand(1)
-    nodata = band.GetNoDataValue()
-    for y in xrange(band.YSize):
-        progress.setPercentage(y / float(band.YSize) * 100)
-        scanline = band.ReadRaster(0, y, band.XSize, 1, band.XSize, 1,
-                                   band.DataType)
-        values = struct.unpack('f' * band.XSize, scanline)
-        for value in values:
-            if value == nodata:
-                value = None
-            yield value
+    rasterBand = dataset.GetRasterBand(band)
+    nodata = rasterBand.GetNoDataValue()
+    xSize = rasterBand.XSize
+    ySize = rasterBand.YSize
+    (blockXSize, blockYSize) = rasterBand.GetBlockSize()
+    if fullRows or blockXSize >= xSize \
+            or blockXSize * blockYSize < minCells:
+        blockXSize = xSize
+        blocksPerRead = max(1, minCells // (xSize * blockYSize))
+        blockYSize = min(ySize, blockYSize * blocksPerRead)
+
+    for y in xrange(0, ySize, blockYSize):
+        if progress is not None:
+            progress.setPercentage(y / float(ySize) * 100)
+        rows = min(blockYSize, ySize - y)
+        for x in xrange(0, xSize, blockXSize):
+            cols = min(blockXSize, xSize - x)
+            data = rasterBand.ReadAsArray(x, y, cols, rows)
+            mask = numpy.zeros(data.shape, dtype=bool)
+            if nodata is not None:
+                mask |= data == nodata
+            if data.dtype.kind == 'f':
+                mask |= numpy.isnan(data)
+            yield (x, y, numpy.ma.MaskedArray(data, mask=mask))
+
+    dataset = None
+
+
+class RasterStatistics:
+    """Statistics of a set of raster values, computed incrementally.
+
+    Blocks are added one by one with the update() method, so memory use
+    does not depend on the size of the raster. Variance is computed
+    with the Welford/Chan algorithm, combining the partial results of
+    each block, to avoid the precision issues of the naive formula.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nodata = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, block):
+        """Adds the valid values of a masked array."""
+        values = block.compressed().astype(numpy.float64)
+        n = values.size
+        self.nodata += block.size - n
+        if n == 0:
+            return
+        blockMean = values.mean()
+        blockM2 = ((values - blockMean) ** 2).sum()
+        total = self.count + n
+        delta = blockMean - self.mean
+        self.mean += delta * n / total
+        self.M2 += blockM2 + delta * delta * self.count * n / total
+        self.count = total
+        self.sum += values.sum()
+        blockMin = values.min()
+        blockMax = values.max()
+        if self.min is None:
+            self.min = blockMin
+            self.max = blockMax
+        else:
+            self.min = min(self.min, blockMin)
+            self.max = max(self.max, blockMax)
+
+    def variance(self):
+        """Returns the sample variance, or None if there are less
+        than two values.
+        """
+        if self.count < 2:
+            return None
+        return self.M2 / (self.count - 1)
+
+
+class RasterHistogram:
+    """Histogram of a set of raster values, with a fixed number of
+    equal-width bins between the given minimum and maximum values.
+
+    Like RasterStatistics, it is filled block by block.
+    """
+
+    def __init__(self, bins, minValue, maxValue):
+        if minValue == maxValue:
+            minValue -= 0.5
+            maxValue += 0.5
+        self.edges = numpy.linspace(minValue, maxValue, bins + 1)
+        self.counts = numpy.zeros(bins, dtype=numpy.int64)
+
+    def update(self, block):
+        """Adds the valid values of a masked array."""
+        values = block.compressed()
+        if values.size == 0:
+            return
+        (counts, edges) = numpy.histogram(values, self.edges)
+        self.counts += counts
+
+
+class GroupedStatistics:
+    """Statistics of raster values grouped by an integer key, such as
+    the id of the zone each cell belongs to.
+
+    Like RasterStatistics, it is filled block by block, passing for
+    each block an array of group ids and an array with the values,
+    both with the same shape. Groups are numbered from 0 to groups-1,
+    and results are available as arrays indexed by group id. All
+    reductions are done with NumPy grouped operations, so there are no
+    per-cell or per-group Python loops.
+    """
+
+    def __init__(self, groups):
+        self.groups = groups
+        self.count = numpy.zeros(groups, dtype=numpy.int64)
+        self.sum = numpy.zeros(groups)
+        self.mean = numpy.zeros(groups)
+        self.M2 = numpy.zeros(groups)
+        self.min = numpy.empty(groups)
+        self.min.fill(numpy.inf)
+        self.max = numpy.empty(groups)
+        self.max.fill(-numpy.inf)
+        self._pairs = []
+        self._pairsSize = 0
+
+    def update(self, ids, values):
+        """Adds a block of values, with the group id of each of them."""
+        ids = numpy.asarray(ids).ravel()
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()
+        if ids.size == 0:
+            return
+
+        n = numpy.bincount(ids, minlength=self.groups)
+        sums = numpy.bincount(ids, weights=values, minlength=self.groups)
+        present = n > 0
+        blockMean = numpy.zeros(self.groups)
+        blockMean[present] = sums[present] / n[present]
+        blockM2 = numpy.bincount(ids, weights=(values - blockMean[ids]) ** 2,
+                                 minlength=self.groups)
+
+        total = self.count + n
+        delta = blockMean - self.mean
+        self.mean[present] += delta[present] * n[present] / total[present]
+        self.M2[present] += blockM2[present] + delta[present] ** 2 \
+            * self.count[present] * n[present] / total[present]
+        self.count = total
+        self.sum += sums
+
+        (ids, values) = self._uniquePairs(ids, values)
+        starts = numpy.flatnonzero(numpy.r_[True, ids[1:] != ids[:-1]])
+        groupIds = ids[starts]
+        self.min[groupIds] = numpy.minimum(self.min[groupIds],
+                numpy.minimum.reduceat(values, starts))
+        self.max[groupIds] = numpy.maximum(self.max[groupIds],
+                numpy.maximum.reduceat(values, starts))
+
+        self._pairs.append((ids, values))
+        self._pairsSize += ids.size
+        if len(self._pairs) > 1 and self._pairsSize > MIN_BLOCK_CELLS:
+            self._mergePairs()
+
+    def std(self):
+        """Returns the population standard deviation of each group."""
+        return numpy.sqrt(self.variance())
+
+    def variance(self):
+        """Returns the population variance of each group."""
+        variance = numpy.zeros(self.groups)
+        present = self.count > 0
+        variance[present] = self.M2[present] / self.count[present]
+        return variance
+
+    def unique(self):
+        """Returns the number of distinct values in each group."""
+        self._mergePairs()
+        if not self._pairs:
+            return numpy.zeros(self.groups, dtype=numpy.int64)
+        return numpy.bincount(self._pairs[0][0], minlength=self.groups)
+
+    def _mergePairs(self):
+        if len(self._pairs) < 2:
+            return
+        ids = numpy.concatenate([p[0] for p in self._pairs])
+        values = numpy.concatenate([p[1] for p in self._pairs])
+        self._pairs = [self._uniquePairs(ids, values)]
+        self._pairsSize = self._pairs[0][0].size
+
+    def _uniquePairs(self, ids, values):
+        # Distinct (id, value) pairs, sorted by id and then by value
+        order = numpy.lexsort((values, ids))
+        ids = ids[order]
+        values = values[order]
+        keep = numpy.r_[True, (ids[1:] != ids[:-1])
+                        | (values[1:] != values[:-1])]
+        return (ids[keep], values[keep])
 
 
 def mapToPixel(mX, mY, geoTransform):
@@ -29,12 +29,14 @@ import os
 import time
 import sys
 import uuid
+import threading
 
 from PyQt4.QtCore import *
 
 from qgis.core import *
 
 numExported = 1
+numExportedLock = threading.Lock()
 
 
 def userFolder():
@@ -73,11 +75,9 @@ def setTempOutput(out, alg):
 def getTempFilename(ext):
     path = tempFolder()
     if ext is None:
-        filename = path + os.sep + str(time.time()) \
-            + str(getNumExportedLayers())
+        filename = path + os.sep + uuid.uuid4().hex
     else:
-        filename = path + os.sep + str(time.time()) \
-            + str(getNumExportedLayers()) + '.' + ext
+        filename = path + os.sep + uuid.uuid4().hex + '.' + ext
     return filename
 
 
@@ -113,8 +113,27 @@ def removeInvalidChars(string):
 
 def getNumExportedLayers():
     global numExported
-    numExported += 1
-    return numExported
+    with numExportedLock:
+        numExported += 1
+        return numExported
+
+
+def fileStamp(filename):
+    """Returns a tuple with the name, size and modification time of a
+    file and the ones next to it with the same base name, such as the
+    .dbf and .prj files of a shapefile, or None if it does not exist.
+    """
+    if not isinstance(filename, basestring) or not os.path.isfile(filename):
+        return None
+    base = os.path.splitext(filename)[0]
+    folder = os.path.dirname(filename)
+    try:
+        names = [os.path.join(folder, f) for f in os.listdir(folder)
+                 if os.path.splitext(os.path.join(folder, f))[0] == base]
+        return tuple(sorted((f, os.path.getsize(f), os.path.getmtime(f))
+                            for f in names if os.path.isfile(f)))
+    except OSError:
+        return None
 
 
 def mkdir(newdir):
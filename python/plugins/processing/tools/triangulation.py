@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    triangulation.py
+    ---------------------
+    Date                 : October 2014
+    Copyright            : (C) 2014 by Victor Olaya
+    Email                : volayaf at gmail dot com
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+
+__author__ = 'Victor Olaya'
+__date__ = 'October 2014'
+__copyright__ = '(C) 2014, Victor Olaya'
+
+# This will get replaced with a git SHA1 when you do a git archive
+
+__revision__ = '$Format:%H$'
+
+import math
+
+import numpy
+
+
+def uniquePoints(points):
+    """Removes repeated points.
+
+    Returns a tuple with an array with the unique points, in the order
+    they first appear, and an array with the position of that first
+    appearance in the passed points.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return (points, numpy.zeros(0, dtype=numpy.intp))
+    # lexsort is stable, so the first point of each group of equal
+    # points is the one that appears first
+    order = numpy.lexsort((points[:, 1], points[:, 0]))
+    sortedPoints = points[order]
+    first = numpy.ones(len(points), dtype=bool)
+    first[1:] = numpy.any(sortedPoints[1:] != sortedPoints[:-1], axis=1)
+    ids = numpy.sort(order[first])
+    return (points[ids], ids)
+
+
+def delaunay(points):
+    """Computes the Delaunay triangulation of a set of unique points.
+
+    It uses a sweep-hull algorithm: points are added in order of their
+    distance to a seed triangle, connecting each of them to the visible
+    edges of the convex hull found so far, which is indexed by angle,
+    and then restoring the Delaunay condition by flipping edges. This
+    takes O(n log n) time in practice.
+
+    Points are passed as an (n, 2) array, and triangles are returned as
+    an (m, 3) array with the positions of their vertices in it, in
+    counter-clockwise order. If all points are collinear, there are no
+    triangles.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    n = len(points)
+    noTriangles = numpy.zeros((0, 3), dtype=numpy.intp)
+    if n < 3:
+        return noTriangles
+
+    # Center points around the origin, for better precision of the
+    # geometric predicates
+    local = points - (points.min(axis=0) + points.max(axis=0)) / 2.0
+
+    # Seed triangle: the point closest to the center, the point closest
+    # to it, and the point making the smallest circumcircle with them
+    i0 = int(numpy.argmin((local ** 2).sum(axis=1)))
+    dists = ((local - local[i0]) ** 2).sum(axis=1)
+    dists[i0] = numpy.inf
+    i1 = int(numpy.argmin(dists))
+    radii = _circumradii(local[i0], local[i1], local)
+    radii[[i0, i1]] = numpy.inf
+    i2 = int(numpy.argmin(radii))
+    if not numpy.isfinite(radii[i2]):
+        return noTriangles
+
+    xs = local[:, 0].tolist()
+    ys = local[:, 1].tolist()
+
+    if _orient(xs[i0], ys[i0], xs[i1], ys[i1], xs[i2], ys[i2]):
+        (i1, i2) = (i2, i1)
+    (cx, cy) = _circumcenter(xs[i0], ys[i0], xs[i1], ys[i1], xs[i2], ys[i2])
+
+    dists = (local[:, 0] - cx) ** 2 + (local[:, 1] - cy) ** 2
+    ids = numpy.argsort(dists, kind='mergesort').tolist()
+
+    hashSize = int(math.ceil(math.sqrt(n)))
+    hullPrev = [0] * n
+    hullNext = [0] * n
+    hullTri = [0] * n
+    hullHash = [-1] * hashSize
+
+    def hashKey(x, y):
+        dx = x - cx
+        dy = y - cy
+        p = dx / (abs(dx) + abs(dy))
+        if dy > 0:
+            angle = (3 - p) / 4.0
+        else:
+            angle = (1 + p) / 4.0
+        return int(math.floor(angle * hashSize)) % hashSize
+
+    # Triangles are stored as consecutive vertex ids, and each half-edge
+    # (triangles[e], triangles[next(e)]) knows the position of its twin
+    # half-edge in the adjacent triangle, or -1 if it is on the hull
+    triangles = []
+    halfedges = []
+
+    def link(a, b):
+        halfedges[a] = b
+        if b != -1:
+            halfedges[b] = a
+
+    def addTriangle(p0, p1, p2, a, b, c):
+        t = len(triangles)
+        triangles.extend((p0, p1, p2))
+        halfedges.extend((-1, -1, -1))
+        link(t, a)
+        link(t + 1, b)
+        link(t + 2, c)
+        return t
+
+    def legalize(a):
+        stack = []
+        while True:
+            b = halfedges[a]
+            a0 = a - a % 3
+            ar = a0 + (a + 2) % 3
+            if b == -1:
+                if not stack:
+                    break
+                a = stack.pop()
+                continue
+            b0 = b - b % 3
+            al = a0 + (a + 1) % 3
+            bl = b0 + (b + 2) % 3
+            p0 = triangles[ar]
+            pr = triangles[a]
+            pl = triangles[al]
+            p1 = triangles[bl]
+            if _inCircle(xs[p0], ys[p0], xs[pr], ys[pr], xs[pl], ys[pl],
+                         xs[p1], ys[p1]):
+                triangles[a] = p1
+                triangles[b] = p0
+                hbl = halfedges[bl]
+                if hbl == -1:
+                    # The edge is on the hull, so the hull triangle
+                    # reference has to be updated
+                    e = hullStart[0]
+                    while True:
+                        if hullTri[e] == bl:
+                            hullTri[e] = a
+                            break
+                        e = hullPrev[e]
+                        if e == hullStart[0]:
+                            break
+                link(a, hbl)
+                link(b, halfedges[ar])
+                link(ar, bl)
+                stack.append(b0 + (b + 1) % 3)
+            else:
+                if not stack:
+                    break
+                a = stack.pop()
+        return ar
+
+    hullStart = [i0]
+    hullNext[i0] = hullPrev[i2] = i1
+    hullNext[i1] = hullPrev[i0] = i2
+    hullNext[i2] = hullPrev[i1] = i0
+    hullTri[i0] = 0
+    hullTri[i1] = 1
+    hullTri[i2] = 2
+    hullHash[hashKey(xs[i0], ys[i0])] = i0
+    hullHash[hashKey(xs[i1], ys[i1])] = i1
+    hullHash[hashKey(xs[i2], ys[i2])] = i2
+    addTriangle(i0, i1, i2, -1, -1, -1)
+
+    for i in ids:
+        if i == i0 or i == i1 or i == i2:
+            continue
+        x = xs[i]
+        y = ys[i]
+
+        # Find a visible edge of the hull, starting from the hull point
+        # with the closest angle
+        key = hashKey(x, y)
+        start = 0
+        for j in xrange(hashSize):
+            start = hullHash[(key + j) % hashSize]
+            if start != -1 and start != hullNext[start]:
+                break
+        start = hullPrev[start]
+        e = start
+        while True:
+            q = hullNext[e]
+            if _orient(x, y, xs[e], ys[e], xs[q], ys[q]):
+                break
+            e = q
+            if e == start:
+                e = -1
+                break
+        if e == -1:
+            # Almost a duplicate of an existing point
+            continue
+
+        t = addTriangle(e, i, hullNext[e], -1, -1, hullTri[e])
+        hullTri[i] = legalize(t + 2)
+        hullTri[e] = t
+
+        # Walk forward through the hull, adding more triangles
+        nxt = hullNext[e]
+        while True:
+            q = hullNext[nxt]
+            if not _orient(x, y, xs[nxt], ys[nxt], xs[q], ys[q]):
+                break
+            t = addTriangle(nxt, i, q, hullTri[i], -1, hullTri[nxt])
+            hullTri[i] = legalize(t + 2)
+            hullNext[nxt] = nxt
+            nxt = q
+
+        # Walk backward from the other side
+        if e == start:
+            while True:
+                q = hullPrev[e]
+                if not _orient(x, y, xs[q], ys[q], xs[e], ys[e]):
+                    break
+                t = addTriangle(q, i, e, -1, hullTri[e], hullTri[q])
+                legalize(t + 2)
+                hullTri[q] = t
+                hullNext[e] = e
+                e = q
+
+        hullStart[0] = hullPrev[i] = e
+        hullNext[e] = hullPrev[nxt] = i
+        hullNext[i] = nxt
+        hullHash[hashKey(x, y)] = i
+        hullHash[hashKey(xs[e], ys[e])] = e
+
+    triangles = numpy.array(triangles, dtype=numpy.intp).reshape(-1, 3)
+    a = local[triangles[:, 0]]
+    b = local[triangles[:, 1]]
+    c = local[triangles[:, 2]]
+    clockwise = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1])
+                 - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) < 0
+    triangles[clockwise] = triangles[clockwise][:, ::-1]
+    return triangles
+
+
+def edgeLengths(points, triangles):
+    """Returns an (m, 3) array with the lengths of the edges of the
+    triangles, starting with the one from their first to their second
+    vertex.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    a = points[triangles]
+    b = points[numpy.roll(triangles, -1, axis=1)]
+    return numpy.hypot(b[:, :, 0] - a[:, :, 0], b[:, :, 1] - a[:, :, 1])
+
+
+def neighbours(points, triangles):
+    """Returns the neighbours of every point in a Delaunay triangulation
+    as a tuple (ids, starts), where the neighbours of point i are
+    ids[starts[i]:starts[i + 1]].
+
+    If there are no triangles, since all points are collinear, every
+    point is connected to the points next to it in the line.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    n = len(points)
+    if len(triangles):
+        src = numpy.asarray(triangles).ravel()
+        dst = numpy.roll(triangles, -1, axis=1).ravel()
+    else:
+        order = numpy.lexsort((points[:, 1], points[:, 0]))
+        src = order[:-1]
+        dst = order[1:]
+    (src, dst) = (numpy.concatenate([src, dst]),
+                  numpy.concatenate([dst, src]))
+    order = numpy.lexsort((dst, src))
+    src = src[order]
+    dst = dst[order]
+    keep = numpy.ones(len(src), dtype=bool)
+    keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src = src[keep]
+    dst = dst[keep]
+    starts = numpy.searchsorted(src, numpy.arange(n + 1))
+    return (dst, starts)
+
+
+def voronoiCells(points, triangles, xMin, yMin, xMax, yMax):
+    """Computes the Voronoi cells of a set of unique points, clipped to
+    a rectangle that should contain all of them.
+
+    Each cell is the intersection of the rectangle with the half-planes
+    closer to its point than to each of its neighbours in the Delaunay
+    triangulation, which are the only ones that can bound it.
+
+    Returns a list with a counter-clockwise ring of (x, y) tuples for
+    every point, without repeating the first vertex at the end.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    (ids, starts) = neighbours(points, triangles)
+    ids = ids.tolist()
+    starts = starts.tolist()
+    xs = points[:, 0].tolist()
+    ys = points[:, 1].tolist()
+    box = [(xMin, yMin), (xMax, yMin), (xMax, yMax), (xMin, yMax)]
+
+    cells = []
+    for i in xrange(len(xs)):
+        x = xs[i]
+        y = ys[i]
+        cell = box
+        for j in ids[starts[i]:starts[i + 1]]:
+            # Keep the points p where (p - mid) . (q - p) <= 0, being q
+            # the neighbour and mid the middle point between them
+            nx = xs[j] - x
+            ny = ys[j] - y
+            c = (nx * (xs[j] + x) + ny * (ys[j] + y)) / 2.0
+            cell = _clip(cell, nx, ny, c)
+            if not cell:
+                break
+        cells.append(cell)
+    return cells
+
+
+def _clip(ring, nx, ny, c):
+    """Clips a convex ring, keeping the points where nx * x + ny * y is
+    not greater than c.
+    """
+    dists = [nx * x + ny * y - c for (x, y) in ring]
+    if max(dists) <= 0:
+        return ring
+    clipped = []
+    (px, py) = ring[-1]
+    pd = dists[-1]
+    for ((x, y), d) in zip(ring, dists):
+        if (d <= 0) != (pd <= 0):
+            t = pd / (pd - d)
+            clipped.append((px + t * (x - px), py + t * (y - py)))
+        if d <= 0:
+            clipped.append((x, y))
+        (px, py, pd) = (x, y, d)
+    return clipped
+
+
+def _orient(px, py, qx, qy, rx, ry):
+    return (qy - py) * (rx - qx) - (qx - px) * (ry - qy) < 0
+
+
+def _inCircle(ax, ay, bx, by, cx, cy, px, py):
+    dx = ax - px
+    dy = ay - py
+    ex = bx - px
+    ey = by - py
+    fx = cx - px
+    fy = cy - py
+    ap = dx * dx + dy * dy
+    bp = ex * ex + ey * ey
+    cp = fx * fx + fy * fy
+    return dx * (ey * cp - bp * fy) - dy * (ex * cp - bp * fx) \
+        + ap * (ex * fy - ey * fx) < 0
+
+
+def _circumcenter(ax, ay, bx, by, cx, cy):
+    dx = bx - ax
+    dy = by - ay
+    ex = cx - ax
+    ey = cy - ay
+    bl = dx * dx + dy * dy
+    cl = ex * ex + ey * ey
+    d = 0.5 / (dx * ey - dy * ex)
+    return (ax + (ey * bl - dy * cl) * d, ay + (dx * cl - ex * bl) * d)
+
+
+def _circumradii(a, b, points):
+    """Returns the squared radii of the circles through a, b and each of
+    the passed points, or infinity if they are collinear.
+    """
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    ex = points[:, 0] - a[0]
+    ey = points[:, 1] - a[1]
+    bl = dx * dx + dy * dy
+    cl = ex * ex + ey * ey
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        d = 0.5 / (dx * ey - dy * ex)
+        x = (ey * bl - dy * cl) * d
+        y = (dx * cl - ex * bl) * d
+        radii = x * x + y * y
+    radii[~numpy.isfinite(radii)] = numpy.inf
+    return radii
@@ -25,14 +25,27 @@ __copyright__ = '(C) 2013, Victor Olaya'
 
 __revision__ = '$Format:%H$'
 
+import math
 import uuid
 
+import numpy
+
 from PyQt4.QtCore import *
 from qgis.core import *
 from processing.core.ProcessingConfig import ProcessingConfig
+from processing.core.VectorWriter import VectorWriter
+
+# Max. number of point/edge pairs tested at once by containsPoints()
+MAX_CONTAINS_CELLS = 1024 * 1024
 
+# Returned by QgsExpression.referencedColumns() for expressions that
+# might use any attribute
+ALL_ATTRIBUTES = getattr(QgsFeatureRequest, 'AllAttributes',
+                         '#!allattributes!#')
 
-def features(layer):
+
+def features(layer, attributes=None, geometry=True, filterRect=None,
+             expression=None):
     """This returns an iterator over features in a vector layer,
     considering the selection that might exist in the layer, and the
     configuration that indicates whether to use only selected feature
@@ -40,18 +53,74 @@ def features(layer):
 
     This should be used by algorithms instead of calling the QGis API
     directly, to ensure a consistent behaviour across algorithms.
+
+    Features can be filtered before they are fetched, so the provider
+    does not have to read the ones that are not needed:
+
+    - attributes: a list of field names or indices. Only those
+      attributes are read, and the rest are null.
+    - geometry: if False, features are returned without geometry.
+    - filterRect: a QgsRectangle. Only features whose bounding box
+      intersects it are returned.
+    - expression: a QGIS expression. Only features for which it is true
+      are returned.
+
+    The rectangle is passed to the provider, which turns it into a
+    spatial filter (an OGR spatial filter, or a SQL condition for
+    database providers). The expression is passed to the provider
+    unless there is also a rectangle or a selection, which QGIS cannot
+    combine in a single request. It is then evaluated here, after
+    fetching the features.
+
+    len() returns the number of features in the layer, or in the
+    selection. When there are filters, fewer features might be
+    returned.
     """
     class Features:
 
         def __init__(self, layer):
             self.layer = layer
             self.selection = False
-            self.iter = layer.getFeatures()
-            if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED):
-                selected = layer.selectedFeatures()
-                if len(selected) > 0:
-                    self.selection = True
-                    self.iter = iter(selected)
+            request = QgsFeatureRequest()
+            parsed = None
+            if expression is not None:
+                parsed = QgsExpression(expression)
+                if parsed.hasParserError():
+                    raise ValueError('Wrong expression: '
+                                     + parsed.parserErrorString())
+            # Filters that have to be applied here, after fetching the
+            # features
+            rect = None
+            exp = None
+            if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED) \
+                    and layer.selectedFeatureCount() > 0:
+                self.selection = True
+                request.setFilterFids(layer.selectedFeaturesIds())
+                rect = filterRect
+                exp = parsed
+            elif filterRect is not None:
+                request.setFilterRect(filterRect)
+                exp = parsed
+            elif expression is not None:
+                request.setFilterExpression(expression)
+
+            referenced = []
+            if parsed is not None:
+                referenced = parsed.referencedColumns()
+            if attributes is not None and ALL_ATTRIBUTES not in referenced:
+                indices = set(resolveFieldIndex(layer, attr)
+                              for attr in attributes)
+                indices.update(layer.fieldNameIndex(name)
+                               for name in referenced)
+                indices.discard(-1)
+                request.setSubsetOfAttributes(sorted(indices))
+            if not geometry and rect is None \
+                    and (parsed is None or not parsed.needsGeometry()):
+                request.setFlags(QgsFeatureRequest.NoGeometry)
+
+            self.iter = layer.getFeatures(request)
+            if rect is not None or exp is not None:
+                self.iter = filterFeatures(self.iter, layer, rect, exp)
 
         def __iter__(self):
             return self.iter
@@ -65,19 +134,41 @@ def features(layer):
     return Features(layer)
 
 
+def filterFeatures(feats, layer, rect=None, expression=None):
+    """Returns an iterator over the passed features of a layer whose
+    bounding box intersects the passed rectangle and for which the
+    passed expression is true. The expression can be a string or a
+    QgsExpression.
+    """
+    if expression is not None:
+        if not isinstance(expression, QgsExpression):
+            expression = QgsExpression(expression)
+            if expression.hasParserError():
+                raise ValueError('Wrong expression: '
+                                 + expression.parserErrorString())
+        expression.prepare(layer.pendingFields())
+    for feat in feats:
+        if rect is not None:
+            geom = feat.geometry()
+            if geom is None or not geom.boundingBox().intersects(rect):
+                continue
+        if expression is not None:
+            value = expression.evaluate(feat)
+            if expression.hasEvalError():
+                raise ValueError('Wrong expression: '
+                                 + expression.evalErrorString())
+            if not value or isinstance(value, QPyNullVariant):
+                continue
+        yield feat
+
+
 def uniqueValues(layer, attribute):
     """Returns a list of unique values for a given attribute.
 
     Attribute can be defined using a field names or a zero-based
     field index. It considers the existing selection.
     """
-    values = []
-    fieldIndex = resolveFieldIndex(layer, attribute)
-    feats = features(layer)
-    for feat in feats:
-        if feat.attributes()[fieldIndex] not in values:
-            values.append(feat.attributes()[fieldIndex])
-    return values
+    return getUniqueValues(layer, resolveFieldIndex(layer, attribute))
 
 
 def resolveFieldIndex(layer, attr):
@@ -109,22 +200,142 @@ def values(layer, *attributes):
     It considers the existing selection.
 
     It assummes fields are numeric or contain values that can be parsed
-    to a number.
+    to a number. Values that cannot be parsed are returned as None.
     """
+    cols = columns(layer, *attributes)
     ret = {}
     for attr in attributes:
-        index = resolveFieldIndex(layer, attr)
-        values = []
-        feats = features(layer)
-        for feature in feats:
-            try:
-                v = float(feature.attributes()[index])
-                values.append(v)
-            except:
-                values.append(None)
-        ret[attr] = values
+        (array, mask) = cols[attr].array(numpy.float64)
+        ret[attr] = [None if m else v for (v, m) in zip(array.tolist(),
+                                                        mask.tolist())]
     return ret
 
+
+class Column:
+    """The values of a field of a vector layer, as returned by
+    columns().
+
+    Values are dictionary encoded: categories is a list with the
+    distinct non-null values of the field, in the order they first
+    appear, and codes is an array with the position in that list of the
+    value of each feature, or -1 for null values. nulls is a boolean
+    array which is True for features with a null value, and null is the
+    first null value read, as returned by the provider, or None if
+    there is none.
+    """
+
+    INTEGER_TYPES = (QVariant.Int, QVariant.UInt, QVariant.LongLong,
+                     QVariant.ULongLong)
+    NUMERIC_TYPES = INTEGER_TYPES + (QVariant.Double, )
+
+    def __init__(self, field, codes, categories, null=None):
+        self.field = field
+        self.codes = codes
+        self.categories = categories
+        self.null = null
+        self.nulls = codes < 0
+
+    def __len__(self):
+        return len(self.codes)
+
+    def isNumeric(self):
+        return self.field.type() in Column.NUMERIC_TYPES
+
+    def array(self, dtype=None):
+        """Returns a tuple with a NumPy array with the values of the
+        field and a boolean array which is True for the features whose
+        value is null or cannot be converted to the type of the array.
+
+        Unless a dtype is passed, integer fields are returned as int64
+        arrays and the rest as float64 arrays. Masked values are 0 in
+        integer arrays and nan in float arrays.
+        """
+        if dtype is None:
+            if self.field.type() in Column.INTEGER_TYPES:
+                dtype = numpy.int64
+            else:
+                dtype = numpy.float64
+        dtype = numpy.dtype(dtype)
+        missing = numpy.nan if dtype.kind == 'f' else 0
+        lookup = numpy.zeros(len(self.categories) + 1, dtype)
+        invalid = numpy.zeros(len(self.categories) + 1, bool)
+        for (i, value) in enumerate(self.categories):
+            try:
+                lookup[i] = value
+            except (TypeError, ValueError, OverflowError):
+                lookup[i] = missing
+                invalid[i] = True
+        lookup[-1] = missing
+        invalid[-1] = True
+        return (lookup[self.codes], invalid[self.codes])
+
+    def unique(self):
+        """Returns a list with the distinct non-null values of the
+        field, in the order they first appear.
+        """
+        return list(self.categories)
+
+    def tolist(self):
+        """Returns a list with the value of each feature, with None for
+        null values.
+        """
+        lookup = self.categories + [None]
+        return [lookup[code] for code in self.codes.tolist()]
+
+
+def columns(layer, *attributes):
+    """Reads the values of the passed fields of a vector layer in a
+    single pass, and returns a dict of Column objects, with the passed
+    field identifiers as keys.
+
+    Field can be passed as field names or as zero-based field indices.
+    Only the passed fields are requested to the provider, and geometries
+    are not read at all. It considers the existing selection.
+    """
+    indices = [resolveFieldIndex(layer, attr) for attr in attributes]
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(sorted(set(indices)))
+    if ProcessingConfig.getSetting(ProcessingConfig.USE_SELECTED) \
+            and layer.selectedFeatureCount() > 0:
+        request.setFilterFids(layer.selectedFeaturesIds())
+
+    encodings = dict((index, {}) for index in indices)
+    codes = dict((index, []) for index in indices)
+    nulls = {}
+    for feat in layer.getFeatures(request):
+        attrs = feat.attributes()
+        for index in encodings:
+            value = attrs[index]
+            if value is None or isinstance(value, QPyNullVariant):
+                codes[index].append(-1)
+                nulls.setdefault(index, value)
+                continue
+            encoding = encodings[index]
+            try:
+                code = encoding.get(value)
+            except TypeError:
+                # Unhashable values are encoded by their string
+                # representation
+                value = unicode(value)
+                code = encoding.get(value)
+            if code is None:
+                code = len(encoding)
+                encoding[value] = code
+            codes[index].append(code)
+
+    fields = layer.pendingFields()
+    cols = {}
+    for (attr, index) in zip(attributes, indices):
+        encoding = encodings[index]
+        categories = [None] * len(encoding)
+        for (value, code) in encoding.iteritems():
+            categories[code] = value
+        cols[attr] = Column(fields[index], numpy.array(codes[index],
+                            numpy.int32), categories, nulls.get(index))
+    return cols
+
+
 def testForUniqueness( fieldList1, fieldList2 ):
     '''Returns a modified version of fieldList2, removing naming
     collisions with fieldList1.'''
@@ -150,6 +361,449 @@ def spatialindex(layer):
     return idx
 
 
+class IndexedFeatureSource:
+    """A spatial index over a vector layer that also keeps the indexed
+    features in memory.
+
+    The index and the feature cache are built in a single pass over the
+    layer, considering the selection just like features() does. Spatial
+    queries return ids, as QgsSpatialIndex does, and the corresponding
+    features are taken from the cache instead of being requested one
+    by one to the provider.
+
+    If maxCachedFeatures is not set, the MAX_CACHED_FEATURES setting is
+    used. When the limit is reached, the rest of the features are only
+    indexed, and they are fetched from the provider when needed, using
+    a single request for all the missing ids of each query.
+    """
+
+    def __init__(self, layer, maxCachedFeatures=None):
+        self.layer = layer
+        if maxCachedFeatures is None:
+            maxCachedFeatures = ProcessingConfig.getSetting(
+                    ProcessingConfig.MAX_CACHED_FEATURES)
+        try:
+            self.maxCachedFeatures = int(maxCachedFeatures)
+        except (TypeError, ValueError):
+            self.maxCachedFeatures = 0
+        self.index = QgsSpatialIndex()
+        self.cache = {}
+        self.bounds = None
+        for ft in features(layer):
+            self.index.insertFeature(ft)
+            geom = ft.geometry()
+            if geom is not None:
+                if self.bounds is None:
+                    self.bounds = QgsRectangle(geom.boundingBox())
+                else:
+                    self.bounds.combineExtentWith(geom.boundingBox())
+            if self.maxCachedFeatures <= 0 \
+                    or len(self.cache) < self.maxCachedFeatures:
+                self.cache[ft.id()] = ft
+
+    def extent(self):
+        """Returns the extent of the indexed features, or None if there
+        are no features with geometry.
+        """
+        return self.bounds
+
+    def intersects(self, rect):
+        """Returns the ids of the features whose bounding box
+        intersects the passed rectangle.
+        """
+        return self.index.intersects(rect)
+
+    def nearestNeighbor(self, point, neighbors):
+        """Returns the ids of the n features nearest to the passed
+        point.
+        """
+        return self.index.nearestNeighbor(point, neighbors)
+
+    def feature(self, fid):
+        """Returns the feature with the passed id, or None if it does
+        not exist in the layer.
+        """
+        if fid in self.cache:
+            return self.cache[fid]
+        request = QgsFeatureRequest().setFilterFid(fid)
+        for ft in self.layer.getFeatures(request):
+            return ft
+        return None
+
+    def features(self, fids):
+        """Returns a list with the features with the passed ids, in the
+        same order. Ids not found in the layer are skipped.
+        """
+        missing = [fid for fid in fids if fid not in self.cache]
+        fetched = {}
+        if missing:
+            request = QgsFeatureRequest().setFilterFids(missing)
+            for ft in self.layer.getFeatures(request):
+                fetched[ft.id()] = ft
+        feats = []
+        for fid in fids:
+            if fid in self.cache:
+                feats.append(self.cache[fid])
+            elif fid in fetched:
+                feats.append(fetched[fid])
+        return feats
+
+    def intersectingFeatures(self, rect):
+        """Returns a list with the features whose bounding box
+        intersects the passed rectangle.
+        """
+        return self.features(self.index.intersects(rect))
+
+    def nearestFeatures(self, point, neighbors):
+        """Returns a list with the n features nearest to the passed
+        point, sorted by distance to it.
+        """
+        return self.features(self.index.nearestNeighbor(point, neighbors))
+
+
+class PointIndex:
+    """A spatial index for points, answering nearest neighbour and
+    radius queries.
+
+    Point coordinates are stored in a contiguous NumPy array and
+    bucketed in a uniform grid, with about CELL_POINTS points per cell.
+    Nearest neighbour queries are answered for all the query points at
+    once, visiting growing rings of cells around them until their k
+    nearest points are known, so there is no Python code run for each
+    query point or for each indexed point.
+
+    Points can also be added after creating the index, which is useful
+    to check minimum distances while generating points. Those points
+    are checked with a linear scan until there are enough of them to
+    rebuild the grid.
+
+    Points are identified by their position, in the order they were
+    added.
+    """
+
+    CELL_POINTS = 2
+
+    # Number of points that can be added before the grid is rebuilt.
+    MIN_PENDING_POINTS = 256
+    MAX_PENDING_POINTS = 4096
+
+    def __init__(self, points=None):
+        if points is None:
+            points = []
+        self.coords = numpy.array(points, dtype=numpy.float64).reshape(-1, 2)
+        self.count = len(self.coords)
+        self.build()
+
+    def __len__(self):
+        return self.count
+
+    def point(self, i):
+        """Returns the coordinates of the point at the passed position.
+        """
+        return tuple(self.coords[i])
+
+    def addPoint(self, x, y):
+        """Adds a point to the index and returns its position.
+        """
+        if self.count == len(self.coords):
+            coords = numpy.empty((max(16, 2 * self.count), 2))
+            coords[:self.count] = self.coords[:self.count]
+            self.coords = coords
+        self.coords[self.count] = (x, y)
+        self.count += 1
+        maxPending = min(max(self.indexed, self.MIN_PENDING_POINTS),
+                         self.MAX_PENDING_POINTS)
+        if self.count - self.indexed > maxPending:
+            self.build()
+        return self.count - 1
+
+    def build(self):
+        """Buckets all the points in a new grid.
+        """
+        coords = self.coords[:self.count]
+        self.indexed = self.count
+        if self.count == 0:
+            (self.xMin, self.yMin) = (0.0, 0.0)
+            self.cellSize = 1.0
+            (self.cols, self.rows) = (1, 1)
+            self.order = numpy.zeros(0, dtype=numpy.intp)
+            self.sortedCoords = coords
+            self.starts = numpy.zeros(2, dtype=numpy.intp)
+            return
+
+        (self.xMin, self.yMin) = coords.min(0)
+        (xMax, yMax) = coords.max(0)
+        width = xMax - self.xMin
+        height = yMax - self.yMin
+        # The second term keeps the number of cells proportional to the
+        # number of points when they are (almost) aligned
+        cells = float(self.count) / self.CELL_POINTS
+        self.cellSize = max(math.sqrt(width * height / cells),
+                            max(width, height) / cells)
+        if not self.cellSize > 0:
+            self.cellSize = 1.0
+        self.cols = int(width / self.cellSize) + 1
+        self.rows = int(height / self.cellSize) + 1
+
+        (cols, rows) = self.cells(coords)
+        cellIds = rows * self.cols + cols
+        self.order = numpy.argsort(cellIds, kind='mergesort')
+        self.sortedCoords = coords[self.order]
+        self.starts = numpy.searchsorted(cellIds[self.order],
+                numpy.arange(self.cols * self.rows + 1))
+
+    def cells(self, coords):
+        """Returns the columns and rows of the cells containing the
+        passed coordinates, clipped to the grid.
+        """
+        cols = numpy.floor((coords[:, 0] - self.xMin) / self.cellSize)
+        rows = numpy.floor((coords[:, 1] - self.yMin) / self.cellSize)
+        cols = cols.clip(0, self.cols - 1).astype(numpy.intp)
+        rows = rows.clip(0, self.rows - 1).astype(numpy.intp)
+        return (cols, rows)
+
+    def ring(self, r):
+        """Returns the column and row offsets of the cells at a
+        distance of r cells from a given one.
+        """
+        if r == 0:
+            return (numpy.zeros(1, dtype=numpy.intp),
+                    numpy.zeros(1, dtype=numpy.intp))
+        side = numpy.arange(-r, r + 1)
+        inner = numpy.arange(-r + 1, r)
+        dc = numpy.concatenate([side, side, numpy.repeat(-r, len(inner)),
+                                numpy.repeat(r, len(inner))])
+        dr = numpy.concatenate([numpy.repeat(-r, len(side)),
+                                numpy.repeat(r, len(side)), inner, inner])
+        return (dc, dr)
+
+    def nearest(self, points, k=1):
+        """Returns the k indexed points nearest to each of the passed
+        ones.
+
+        The result is a tuple with two (m, k) arrays, with the distances
+        to the neighbours and their positions, sorted by distance. If
+        there are less than k points in the index, missing neighbours
+        have an infinite distance and a position of -1.
+        """
+        if self.indexed < self.count:
+            self.build()
+        queries = numpy.array(points, dtype=numpy.float64).reshape(-1, 2)
+        m = len(queries)
+        dists = numpy.empty((m, k))
+        dists.fill(numpy.inf)
+        ids = numpy.empty((m, k), dtype=numpy.intp)
+        ids.fill(-1)
+        if m == 0 or k == 0 or self.count == 0:
+            return (dists, ids)
+
+        (qcols, qrows) = self.cells(queries)
+        active = numpy.arange(m)
+        r = 0
+        while len(active):
+            a = len(active)
+            q = queries[active]
+            (c, rw) = (qcols[active], qrows[active])
+            (dc, dr) = self.ring(r)
+            cc = c[:, None] + dc
+            rr = rw[:, None] + dr
+            valid = (cc >= 0) & (cc < self.cols) & (rr >= 0) \
+                & (rr < self.rows)
+            (owner, j) = valid.nonzero()
+            cellIds = rr[owner, j] * self.cols + cc[owner, j]
+            first = self.starts[cellIds]
+            counts = self.starts[cellIds + 1] - first
+            total = counts.sum()
+            if total:
+                # Positions of all the points in the visited cells
+                offsets = numpy.cumsum(counts) - counts
+                pos = numpy.arange(total) + numpy.repeat(first - offsets,
+                                                         counts)
+                owner = numpy.repeat(owner, counts)
+                d = numpy.hypot(self.sortedCoords[pos, 0] - q[owner, 0],
+                                self.sortedCoords[pos, 1] - q[owner, 1])
+
+                # Merge them with the current neighbours, keeping the k
+                # nearest ones of each query point
+                allOwners = numpy.concatenate([numpy.repeat(numpy.arange(a),
+                                               k), owner])
+                allDists = numpy.concatenate([dists[active].ravel(), d])
+                allIds = numpy.concatenate([ids[active].ravel(),
+                                            self.order[pos]])
+                s = numpy.argsort(allDists)
+                s = s[numpy.argsort(allOwners[s], kind='mergesort')]
+                allOwners = allOwners[s]
+                groupStarts = numpy.searchsorted(allOwners, numpy.arange(a))
+                keep = numpy.arange(len(s)) - groupStarts[allOwners] < k
+                dists[active] = allDists[s][keep].reshape(a, k)
+                ids[active] = allIds[s][keep].reshape(a, k)
+
+            # Points closer than the nearest border of the visited block
+            # of cells are already known. Borders of the grid do not
+            # count, since there are no points beyond them.
+            x0 = self.xMin + (c - r) * self.cellSize
+            x1 = self.xMin + (c + r + 1) * self.cellSize
+            y0 = self.yMin + (rw - r) * self.cellSize
+            y1 = self.yMin + (rw + r + 1) * self.cellSize
+            covered = numpy.minimum(
+                    numpy.minimum(numpy.where(c - r > 0, q[:, 0] - x0,
+                                              numpy.inf),
+                                  numpy.where(c + r < self.cols - 1,
+                                              x1 - q[:, 0], numpy.inf)),
+                    numpy.minimum(numpy.where(rw - r > 0, q[:, 1] - y0,
+                                              numpy.inf),
+                                  numpy.where(rw + r < self.rows - 1,
+                                              y1 - q[:, 1], numpy.inf)))
+            active = active[dists[active, k - 1] > covered]
+            r += 1
+
+        return (dists, ids)
+
+    def pointsInRadius(self, x, y, radius):
+        """Returns an array with the positions of the points whose
+        distance to the passed coordinates is not greater than radius.
+        """
+        found = []
+        r2 = radius * radius
+        if self.indexed:
+            (cols, rows) = self.cells(numpy.array([[x - radius, y - radius],
+                                                   [x + radius, y + radius]]))
+            pos = numpy.concatenate([numpy.arange(
+                    self.starts[row * self.cols + cols[0]],
+                    self.starts[row * self.cols + cols[1] + 1])
+                    for row in xrange(rows[0], rows[1] + 1)])
+            coords = self.sortedCoords[pos]
+            d2 = (coords[:, 0] - x) ** 2 + (coords[:, 1] - y) ** 2
+            found.append(self.order[pos[d2 <= r2]])
+        if self.count > self.indexed:
+            coords = self.coords[self.indexed:self.count]
+            d2 = (coords[:, 0] - x) ** 2 + (coords[:, 1] - y) ** 2
+            found.append(self.indexed + numpy.nonzero(d2 <= r2)[0])
+        if not found:
+            return numpy.zeros(0, dtype=numpy.intp)
+        return numpy.concatenate(found)
+
+    def pointsInRect(self, xMin, yMin, xMax, yMax):
+        """Returns an array with the positions of the points inside the
+        passed rectangle or on its border.
+        """
+        found = []
+        if self.indexed:
+            (cols, rows) = self.cells(numpy.array([[xMin, yMin],
+                                                   [xMax, yMax]]))
+            pos = numpy.concatenate([numpy.arange(
+                    self.starts[row * self.cols + cols[0]],
+                    self.starts[row * self.cols + cols[1] + 1])
+                    for row in xrange(rows[0], rows[1] + 1)])
+            coords = self.sortedCoords[pos]
+            inside = (coords[:, 0] >= xMin) & (coords[:, 0] <= xMax) \
+                & (coords[:, 1] >= yMin) & (coords[:, 1] <= yMax)
+            found.append(self.order[pos[inside]])
+        if self.count > self.indexed:
+            coords = self.coords[self.indexed:self.count]
+            inside = (coords[:, 0] >= xMin) & (coords[:, 0] <= xMax) \
+                & (coords[:, 1] >= yMin) & (coords[:, 1] <= yMax)
+            found.append(self.indexed + numpy.nonzero(inside)[0])
+        if not found:
+            return numpy.zeros(0, dtype=numpy.intp)
+        return numpy.concatenate(found)
+
+    def pointsInPolygon(self, geom):
+        """Returns an array with the positions of the points contained
+        by a polygon geometry, as defined by containsPoints().
+        """
+        rect = geom.boundingBox()
+        pos = self.pointsInRect(rect.xMinimum(), rect.yMinimum(),
+                                rect.xMaximum(), rect.yMaximum())
+        return pos[containsPoints(geom, self.coords[pos])]
+
+
+def containsPoints(geom, coords):
+    """Returns a boolean array telling which of the passed points, given
+    as an (n, 2) NumPy array, are contained by a polygon geometry.
+
+    As with QgsGeometry.contains(), points on the boundary of the
+    polygon are not contained by it. The test is done for all the
+    points and all the edges of the polygon at once, counting how many
+    edges are crossed by a ray cast from every point, in batches of
+    points so no more than MAX_CONTAINS_CELLS point/edge pairs are
+    tested at a time.
+    """
+    coords = numpy.asarray(coords, dtype=numpy.float64).reshape(-1, 2)
+    contained = numpy.zeros(len(coords), dtype=bool)
+    if geom is None or geom.type() != QGis.Polygon or len(coords) == 0:
+        return contained
+    if geom.isMultipart():
+        polygons = geom.asMultiPolygon()
+    else:
+        polygons = [geom.asPolygon()]
+    edges = []
+    for polygon in polygons:
+        for ring in polygon:
+            if len(ring) < 3:
+                continue
+            vertices = numpy.array([(p.x(), p.y()) for p in ring] +
+                                   [(ring[0].x(), ring[0].y())])
+            edges.append(numpy.hstack([vertices[:-1], vertices[1:]]))
+    if not edges:
+        return contained
+    (x1, y1, x2, y2) = numpy.vstack(edges).T
+
+    batch = max(1, MAX_CONTAINS_CELLS // len(x1))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for start in xrange(0, len(coords), batch):
+            px = coords[start:start + batch, 0][:, None]
+            py = coords[start:start + batch, 1][:, None]
+            # Edges crossed by a horizontal ray going right from the
+            # point. Horizontal edges are never crossed.
+            spans = (y1 > py) != (y2 > py)
+            crossX = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            crossings = (spans & (px < crossX)).sum(1)
+            onBoundary = ((x2 - x1) * (py - y1) == (y2 - y1) * (px - x1)) \
+                & (px >= numpy.minimum(x1, x2)) \
+                & (px <= numpy.maximum(x1, x2)) \
+                & (py >= numpy.minimum(y1, y2)) \
+                & (py <= numpy.maximum(y1, y2))
+            contained[start:start + batch] = (crossings % 2 == 1) \
+                & ~onBoundary.any(1)
+    return contained
+
+
+def layerPoints(layer, fieldIndex=None):
+    """Returns the coordinates of the features of a layer, as an (n, 2)
+    NumPy array, and a list with the values of the passed field for
+    them (or their ids, if no field index is passed).
+
+    The centre of the bounding box is used for geometries other than
+    points. Features with a null or empty geometry are skipped, so the
+    values stay aligned with the coordinates. The selection is
+    considered, just like features() does.
+    """
+    if fieldIndex is None:
+        attributes = []
+    else:
+        attributes = [fieldIndex]
+    feats = features(layer, attributes=attributes)
+    # The array is allocated for the reported feature count, and only
+    # grown if the provider returns more features than it reported
+    coords = numpy.empty((max(len(feats), 0), 2), dtype=numpy.float64)
+    values = []
+    for ft in feats:
+        geom = ft.geometry()
+        if geom is None or geom.isGeosEmpty():
+            continue
+        n = len(values)
+        if n == len(coords):
+            coords = numpy.resize(coords, (max(2 * n, 1024), 2))
+        point = geom.boundingBox().center()
+        coords[n] = (point.x(), point.y())
+        if fieldIndex is None:
+            values.append(ft.id())
+        else:
+            values.append(ft.attributes()[fieldIndex])
+    return (coords[:len(values)], values)
+
+
 def createUniqueFieldName(fieldName, fieldList):
     def nextname(name):
         num = 1
@@ -244,14 +898,100 @@ def simpleMeasure(geom, method=0, ellips=None, crs=None):
 
 
 def getUniqueValues(layer, fieldIndex):
-    values = []
-    feats = features(layer)
-    for feat in feats:
-        if feat.attributes()[fieldIndex] not in values:
-            values.append(feat.attributes()[fieldIndex])
+    """Returns a list with the distinct values of a field, including a
+    null value if the field has any, in the order they first appear.
+    It considers the existing selection.
+    """
+    column = columns(layer, fieldIndex)[fieldIndex]
+    values = column.unique()
+    if column.nulls.any():
+        # Categories are numbered as they first appear, so the ones
+        # before the first null are those with a lower code
+        first = int(column.nulls.argmax())
+        position = int(column.codes[:first].max()) + 1 if first > 0 else 0
+        values.insert(position, column.null)
     return values
 
 
+def unionGeometries(geometries):
+    """Returns the union of a list of geometries, or None if the list
+    is empty.
+
+    Geometries are merged using a cascaded union, instead of combining
+    them one by one into a growing result, which is much slower for
+    large number of geometries.
+    """
+    geometries = [QgsGeometry(g) for g in geometries if g is not None]
+    if len(geometries) == 0:
+        return None
+    if len(geometries) == 1:
+        return geometries[0]
+    try:
+        geom = QgsGeometry.unaryUnion(geometries)
+        if geom is not None:
+            return geom
+    except AttributeError:
+        pass
+    # Fall back to a tree union, combining geometries by pairs
+    while len(geometries) > 1:
+        merged = []
+        for i in xrange(0, len(geometries) - 1, 2):
+            merged.append(QgsGeometry(geometries[i].combine(geometries[i + 1])))
+        if len(geometries) % 2 == 1:
+            merged.append(geometries[-1])
+        geometries = merged
+    return geometries[0]
+
+
+def dissolveFeatures(features, fieldIndex=None, geometry=None,
+                     progress=None):
+    """Dissolves the geometries of an iterable of features, grouping
+    them by the value of a field.
+
+    Features are grouped in a single pass, and then the geometries of
+    each group are merged with unionGeometries(). If fieldIndex is None,
+    all features are dissolved together. Values are compared using
+    their string representation, with leading and trailing whitespace
+    removed.
+
+    geometry can be a function taking a feature and returning the
+    geometry to use for it (for instance, a buffer of the feature
+    geometry). If it is None, the feature geometry is used.
+
+    Returns a list of (attributes, geometry) tuples, one per group, in
+    the order in which each group first appears. The attributes are
+    those of the first feature in the group.
+    """
+    keys = []
+    groups = {}
+    total = 0
+    if progress is not None:
+        total = 50.0 / max(1, len(features))
+    for (current, feat) in enumerate(features):
+        if fieldIndex is None:
+            key = None
+        else:
+            key = unicode(feat.attributes()[fieldIndex]).strip()
+        if geometry is None:
+            geom = QgsGeometry(feat.geometry())
+        else:
+            geom = geometry(feat)
+        if key not in groups:
+            keys.append(key)
+            groups[key] = (feat.attributes(), [])
+        groups[key][1].append(geom)
+        if progress is not None:
+            progress.setPercentage(int(current * total))
+
+    dissolved = []
+    for (current, key) in enumerate(keys):
+        (attrs, geoms) = groups.pop(key)
+        dissolved.append((attrs, unionGeometries(geoms)))
+        if progress is not None:
+            progress.setPercentage(50 + int(current * 50.0 / len(keys)))
+    return dissolved
+
+
 def getUniqueValuesCount(layer, fieldIndex):
     return len(getUniqueValues(layer, fieldIndex))
 
@@ -314,8 +1054,15 @@ def duplicateInMemory(layer, newName='', addToRegistry=False):
     memProvider.addAttributes(fields)
     memLayer.updateFields()
 
+    batch = []
     for ft in provider.getFeatures():
-        memProvider.addFeatures([ft])
+        batch.append(ft)
+        if len(batch) == VectorWriter.BATCH_SIZE:
+            memProvider.addFeatures(batch)
+            batch = []
+    if batch:
+        memProvider.addFeatures(batch)
+    memLayer.updateExtents()
 
     if addToRegistry:
         if memLayer.isValid():
@@ -325,13 +1072,24 @@ def duplicateInMemory(layer, newName='', addToRegistry=False):
 
     return memLayer
 
-def checkMinDistance(point, index, distance, points):
+def checkMinDistance(point, index, distance, points=None):
     """Check if distance from given point to all other points is greater
     than given value.
+
+    The index can be a PointIndex, in which case the points dictionary
+    is not needed, or a QgsSpatialIndex, with the points dictionary
+    mapping the ids in the index to QgsPoints.
     """
     if distance == 0:
         return True
 
+    if isinstance(index, PointIndex):
+        # Points exactly at the minimum distance are not too close
+        coords = index.coords[index.pointsInRadius(point.x(), point.y(),
+                                                   distance)]
+        d2 = (coords[:, 0] - point.x()) ** 2 + (coords[:, 1] - point.y()) ** 2
+        return not (d2 < distance * distance).any()
+
     neighbors = index.nearestNeighbor(point, 1)
     if len(neighbors) == 0:
         return True